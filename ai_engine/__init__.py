@@ -1,5 +1,11 @@
 # AI Engine Package
 from .detector import LitterMonitor
+from .batching import BatchInferer
+from .backends import create_backend, InferenceBackend
 from .face_recog import FaceMatcher
+from .history import FrameHistory
+from .motion import MotionGate
+from .roi import RegionOfInterest
+from .replay import DetectionCache, DetectionRecorder
 
-__all__ = ['LitterMonitor', 'FaceMatcher']
+__all__ = ['LitterMonitor', 'BatchInferer', 'create_backend', 'InferenceBackend', 'FaceMatcher', 'FrameHistory', 'MotionGate', 'RegionOfInterest', 'DetectionCache', 'DetectionRecorder']
@@ -0,0 +1,337 @@
+"""
+CivicEye AI Engine - Inference Backends
+Pluggable CPU inference backends for YOLOv8. Every backend turns a list of
+BGR frames into one (N, 6) float32 array per frame with rows of
+[x1, y1, x2, y2, conf, cls] in original frame pixels - the format
+LitterMonitor.detect_frame() consumes.
+
+Backends:
+    ultralytics  - PyTorch .pt (or any format Ultralytics can load)
+    onnxruntime  - Exported .onnx model run directly with ONNX Runtime
+    openvino     - Exported OpenVINO IR (.xml or *_openvino_model/ directory)
+
+Models are exported (optionally INT8-quantized) with `export_model()` or:
+
+    python -m ai_engine.backends yolov8n.pt --format openvino --int8 --imgsz 480 --dynamic
+"""
+
+import glob
+import os
+
+import cv2
+import numpy as np
+
+
+BACKEND_TYPES = ('ultralytics', 'onnxruntime', 'openvino')
+
+
+class InferenceBackend:
+    """Base class: `predict(frames)` -> list of (N, 6) detection arrays."""
+
+    name = 'base'
+
+    def __init__(self, model_path, imgsz=640, conf=0.25, iou=0.45, threads=None):
+        """
+        Args:
+            model_path: Model file (or OpenVINO model directory)
+            imgsz: Square network input size in pixels
+            conf: Minimum confidence kept by the backend
+            iou: NMS IoU threshold
+            threads: CPU threads used by the runtime (None = runtime default)
+        """
+        self.model_path = model_path
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.threads = threads
+
+    def predict(self, frames):
+        raise NotImplementedError
+
+    def __call__(self, frames):
+        return self.predict(frames)
+
+    def describe(self):
+        return {
+            "backend": self.name,
+            "model": self.model_path,
+            "imgsz": self.imgsz,
+            "threads": self.threads
+        }
+
+
+# =============================================================================
+# ULTRALYTICS (PyTorch)
+# =============================================================================
+
+def results_to_detections(result):
+    """
+    Pull one Ultralytics result to host memory in a single copy.
+
+    Returns:
+        np.ndarray: (N, 6) float32 rows of [x1, y1, x2, y2, conf, cls]
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.empty((0, 6), dtype=np.float32)
+    data = boxes.data.cpu().numpy()
+    # boxes.data is [xyxy, (track_id), conf, cls]
+    return np.column_stack((data[:, :4], data[:, -2], data[:, -1])).astype(np.float32, copy=False)
+
+
+class UltralyticsBackend(InferenceBackend):
+    """Runs the model through Ultralytics (PyTorch eager for .pt weights)."""
+
+    name = 'ultralytics'
+
+    def __init__(self, model_path='yolov8n.pt', **kwargs):
+        super().__init__(model_path, **kwargs)
+        from ultralytics import YOLO
+
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+        self.model = YOLO(model_path)
+
+    def predict(self, frames):
+        results = self.model(frames, imgsz=self.imgsz, conf=self.conf, iou=self.iou,
+                             verbose=False)
+        return [results_to_detections(r) for r in results]
+
+
+# =============================================================================
+# EXPORTED MODELS (ONNX Runtime / OpenVINO)
+# =============================================================================
+
+class _ExportedYoloBackend(InferenceBackend):
+    """Shared letterbox pre-processing and YOLOv8 head decoding + NMS."""
+
+    MAX_WH = 7680  # class offset for batched NMS
+
+    def _set_input_shape(self, shape):
+        """Adopt a static model input shape (N, 3, H, W) if the model has one."""
+        batch, _, height, width = shape
+        self.static_batch = batch if isinstance(batch, int) and batch > 0 else None
+        if isinstance(height, int) and isinstance(width, int) and height > 0:
+            self.input_hw = (height, width)
+        else:
+            self.input_hw = (self.imgsz, self.imgsz)
+        self.imgsz = self.input_hw[0]
+
+    def _letterbox(self, frame):
+        """Resize keeping aspect ratio and pad to the network input size."""
+        h, w = frame.shape[:2]
+        in_h, in_w = self.input_hw
+        r = min(in_h / h, in_w / w)
+        new_w, new_h = int(round(w * r)), int(round(h * r))
+        dw, dh = (in_w - new_w) // 2, (in_h - new_h) // 2
+
+        canvas = np.full((in_h, in_w, 3), 114, dtype=np.uint8)
+        canvas[dh:dh + new_h, dw:dw + new_w] = cv2.resize(
+            frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+        )
+        return canvas, r, dw, dh
+
+    def _preprocess(self, frames):
+        """Frames -> (B, 3, H, W) float32 blob plus per-frame letterbox params."""
+        letterboxed = [self._letterbox(f) for f in frames]
+        blob = cv2.dnn.blobFromImages([lb[0] for lb in letterboxed], scalefactor=1 / 255.0,
+                                      swapRB=True)
+        return blob, [lb[1:] for lb in letterboxed]
+
+    def _decode(self, output, frame_shape, r, dw, dh):
+        """Decode one (4 + num_classes, anchors) YOLOv8 output to (N, 6) detections."""
+        pred = output.T
+        scores = pred[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+        keep = conf > self.conf
+        if not np.any(keep):
+            return np.empty((0, 6), dtype=np.float32)
+        pred, cls, conf = pred[keep], cls[keep], conf[keep]
+
+        # cx, cy, w, h (letterboxed) -> x1, y1, x2, y2 (original frame)
+        xy = (pred[:, :2] - np.array([dw, dh], dtype=np.float32)) / r
+        wh = pred[:, 2:4] / r
+        xyxy = np.concatenate((xy - wh / 2, xy + wh / 2), axis=1)
+        h, w = frame_shape[:2]
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+
+        # Class-aware NMS via per-class coordinate offsets
+        offset = cls[:, None].astype(np.float32) * self.MAX_WH
+        nms_boxes = np.concatenate((xyxy[:, :2] + offset, xyxy[:, 2:] - xyxy[:, :2]), axis=1)
+        idx = cv2.dnn.NMSBoxes(nms_boxes.tolist(), conf.tolist(), self.conf, self.iou)
+        idx = np.asarray(idx, dtype=np.int64).reshape(-1)
+
+        return np.column_stack((xyxy[idx], conf[idx], cls[idx])).astype(np.float32)
+
+    def _run(self, blob):
+        """Run the runtime on a (B, 3, H, W) blob -> (B, 4 + nc, anchors)."""
+        raise NotImplementedError
+
+    def predict(self, frames):
+        if not frames:
+            return []
+        blob, params = self._preprocess(frames)
+
+        if self.static_batch is None:
+            outputs = self._run(blob)
+        else:
+            # Static-batch models: run in chunks of the exported batch size
+            chunks = []
+            for i in range(0, len(blob), self.static_batch):
+                chunk = blob[i:i + self.static_batch]
+                pad = self.static_batch - len(chunk)
+                if pad:
+                    chunk = np.concatenate((chunk, np.zeros((pad,) + chunk.shape[1:], chunk.dtype)))
+                chunks.append(self._run(chunk)[:self.static_batch - pad])
+            outputs = np.concatenate(chunks)
+
+        return [self._decode(out, frame.shape, r, dw, dh)
+                for out, frame, (r, dw, dh) in zip(outputs, frames, params)]
+
+
+class OnnxRuntimeBackend(_ExportedYoloBackend):
+    """Exported YOLOv8 .onnx (FP32 or INT8-quantized) on ONNX Runtime's CPU provider."""
+
+    name = 'onnxruntime'
+
+    def __init__(self, model_path='yolov8n.onnx', **kwargs):
+        super().__init__(model_path, **kwargs)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self._set_input_shape(model_input.shape)
+
+    def _run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVINOBackend(_ExportedYoloBackend):
+    """Exported YOLOv8 OpenVINO IR (FP32/FP16 or NNCF INT8) on the CPU plugin."""
+
+    name = 'openvino'
+
+    def __init__(self, model_path='yolov8n_openvino_model', **kwargs):
+        super().__init__(model_path, **kwargs)
+        import openvino as ov
+
+        if os.path.isdir(model_path):
+            xml_files = glob.glob(os.path.join(model_path, '*.xml'))
+            if not xml_files:
+                raise FileNotFoundError(f"No OpenVINO .xml model in {model_path}")
+            model_path = xml_files[0]
+
+        core = ov.Core()
+        model = core.read_model(model_path)
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if self.threads:
+            config['INFERENCE_NUM_THREADS'] = str(self.threads)
+        self.compiled = core.compile_model(model, 'CPU', config)
+        self.output = self.compiled.output(0)
+
+        shape = self.compiled.input(0).get_partial_shape()
+        self._set_input_shape([d.get_length() if d.is_static else None for d in shape])
+
+    def _run(self, blob):
+        return self.compiled(blob)[self.output]
+
+
+# =============================================================================
+# FACTORY / EXPORT
+# =============================================================================
+
+_BACKENDS = {
+    'ultralytics': UltralyticsBackend,
+    'onnxruntime': OnnxRuntimeBackend,
+    'openvino': OpenVINOBackend,
+}
+
+
+def guess_backend_type(model_path):
+    """Infer the backend type from a model path."""
+    path = str(model_path).rstrip('/\\')
+    if path.endswith('.onnx'):
+        return 'onnxruntime'
+    if path.endswith('.xml') or path.endswith('_openvino_model'):
+        return 'openvino'
+    return 'ultralytics'
+
+
+def create_backend(config=None, **overrides):
+    """
+    Build an inference backend from a config dict.
+
+    Args:
+        config: {"backend": "ultralytics" | "onnxruntime" | "openvino",
+                 "model": path, "imgsz": 640, "threads": None,
+                 "conf": 0.25, "iou": 0.45}
+                The backend type is inferred from the model path if omitted.
+        **overrides: Keys overriding the config
+
+    Returns:
+        InferenceBackend
+    """
+    config = {**(config or {}), **overrides}
+    model_path = config.get('model', 'yolov8n.pt')
+    backend_type = config.get('backend') or guess_backend_type(model_path)
+    if backend_type not in _BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend_type} "
+                         f"(expected one of {', '.join(BACKEND_TYPES)})")
+
+    options = {k: config[k] for k in ('imgsz', 'conf', 'iou', 'threads') if config.get(k) is not None}
+    return _BACKENDS[backend_type](model_path, **options)
+
+
+def export_model(model_path='yolov8n.pt', fmt='onnx', imgsz=640, int8=False, data=None,
+                 dynamic=False):
+    """
+    Export YOLOv8 weights for a CPU backend.
+
+    Use `dynamic=True` for a dynamic batch dimension so batched multi-camera
+    inference runs as one call instead of one call per frame. ONNX INT8 uses
+    ONNX Runtime dynamic quantization of the exported model; OpenVINO INT8 uses Ultralytics' NNCF post-training quantization
+    (calibrated on `data`, the Ultralytics dataset yaml, coco8 by default).
+
+    Returns:
+        str: Path of the exported model (file or directory)
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    if fmt == 'onnx':
+        exported = model.export(format='onnx', imgsz=imgsz, dynamic=dynamic)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantized = exported.replace('.onnx', '_int8.onnx')
+            quantize_dynamic(exported, quantized, weight_type=QuantType.QUInt8)
+            exported = quantized
+    elif fmt == 'openvino':
+        kwargs = {'data': data} if data else {}
+        exported = model.export(format='openvino', imgsz=imgsz, int8=int8, dynamic=dynamic, **kwargs)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return str(exported)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export YOLOv8 weights for a CivicEye CPU backend")
+    parser.add_argument('model', nargs='?', default='yolov8n.pt')
+    parser.add_argument('--format', choices=['onnx', 'openvino'], default='onnx')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--int8', action='store_true', help="Quantize to INT8")
+    parser.add_argument('--data', help="Calibration dataset yaml (OpenVINO INT8)")
+    parser.add_argument('--dynamic', action='store_true', help="Dynamic batch dimension")
+    args = parser.parse_args()
+
+    print(export_model(args.model, args.format, args.imgsz, args.int8, args.data, args.dynamic))
@@ -0,0 +1,130 @@
+"""
+CivicEye AI Engine - Batched Inference Module
+Collects frames from several camera threads and runs them through one shared
+model in batched calls.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class _Request:
+    __slots__ = ('frame', 'result', 'error', 'done')
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchInferer:
+    """
+    Shared model front-end that batches concurrent single-frame requests.
+
+    Each camera thread calls `infer(frame)` and blocks until its detections are
+    ready. A worker thread gathers pending frames until `batch_size` frames
+    are queued (or one per expected stream), or until `max_wait` seconds have
+    passed since the first frame of the batch arrived, then runs the model
+    once for the whole batch.
+    """
+
+    def __init__(self, predict, batch_size=8, max_wait=0.01, expected_streams=1, on_batch=None):
+        """
+        Args:
+            predict: Callable(list of frames) -> list of (N, 6) detection arrays
+            batch_size: Maximum frames per model call
+            max_wait: Maximum seconds a frame waits for its batch to fill
+            expected_streams: Number of cameras feeding this inferer; a batch
+                is flushed early once it has one frame per stream
+            on_batch: Optional Callable(frames in batch) run after each model call
+        """
+        self.predict = predict
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.expected_streams = expected_streams
+        self.on_batch = on_batch
+
+        # Counters
+        self.batches = 0
+        self.frames = 0
+
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name='civiceye-batcher', daemon=True
+        )
+        self._thread.start()
+
+    def infer(self, frame):
+        """Run detection on one frame (blocks until its batch has run)."""
+        request = _Request(frame)
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("BatchInferer is stopped")
+            self._pending.append(request)
+            self._cond.notify_all()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    __call__ = infer
+
+    def stop(self):
+        """Stop the worker; pending requests fail with RuntimeError."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(2.0)
+
+    @property
+    def mean_batch_size(self):
+        return self.frames / self.batches if self.batches else 0.0
+
+    def _collect(self):
+        """Wait for the next batch of requests (empty list when stopping)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or not self._running)
+            if not self._running:
+                return []
+
+            deadline = time.monotonic() + self.max_wait
+            target = max(1, min(self.batch_size, self.expected_streams))
+            while len(self._pending) < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    break
+                self._cond.wait(remaining)
+
+            count = min(len(self._pending), self.batch_size)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                break
+            try:
+                results = self.predict([r.frame for r in batch])
+                for request, detections in zip(batch, results):
+                    request.result = detections
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                self.batches += 1
+                self.frames += len(batch)
+                for request in batch:
+                    request.done.set()
+                if self.on_batch is not None:
+                    self.on_batch(len(batch))
+
+        # Fail anything still queued at shutdown
+        with self._cond:
+            while self._pending:
+                request = self._pending.popleft()
+                request.error = RuntimeError("BatchInferer is stopped")
+                request.done.set()
@@ -5,10 +5,20 @@ Using YOLOv8 for person/object detection with velocity-based static object detec
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from collections import defaultdict, deque
 import time
 
+from .backends import create_backend
+from .history import FrameHistory
+from .motion import MotionGate
+from .roi import RegionOfInterest
+from .tracker import pairwise_distances, CentroidTracker
+
+
+def _lap(start):
+    """Return (now, seconds since start) for chaining stage timers."""
+    now = time.perf_counter()
+    return now, now - start
+
 
 class LitterMonitor:
     """
@@ -16,9 +26,29 @@ class LitterMonitor:
     Implements velocity checks and grace timer for accurate detection.
     """
     
-    def __init__(self, model_path='yolov8n.pt'):
-        """Initializing the LitterMonitor with YOLOv8 model."""
-        self.model = YOLO(model_path)
+    STAGES = ('history', 'motion', 'inference', 'parse', 'tracking', 'annotation')
+    
+    def __init__(self, model_path='yolov8n.pt', history_options=None, motion_options=None,
+                 detector=None, roi=None):
+        """
+        Initializing the LitterMonitor with YOLOv8 model.
+        
+        Args:
+            model_path: YOLOv8 model - .pt weights, exported .onnx or OpenVINO
+                model (ignored when `detector` is given)
+            history_options: Optional FrameHistory kwargs (duration, sample_fps,
+                max_width, max_bytes) for the pre-event frame buffer
+            motion_options: Optional MotionGate kwargs (enabled, width,
+                pixel_threshold, min_changed_ratio, max_interval)
+            detector: Optional shared Callable(frame) -> (N, 6) detections,
+                e.g. a BatchInferer serving several cameras
+            roi: Optional RegionOfInterest (or list of polygons); inference
+                runs on its bounding region only and litter outside it is ignored
+        """
+        if detector is None:
+            backend = create_backend({'model': model_path})
+            detector = lambda frame: backend.predict([frame])[0]
+        self.detector = detector
         
         # Detection parameters
         self.PERSON_CLASS = 0
@@ -48,7 +78,6 @@ class LitterMonitor:
         self.GRACE_PERIOD = 5.0  # seconds
         
         # Tracking state
-        self.bottle_history = defaultdict(list)  # Track object centroids over frames
         self.static_bottles = {}  # Objects confirmed as static
         self.grace_start_time = None
         self.current_state = "IDLE"
@@ -56,22 +85,37 @@ class LitterMonitor:
         self.offender_bbox = None
         self.captured_violator_frame = None  # Store the actual frame when violation detected
         
-        # Frame buffer for capturing past moments (stores last 10 seconds at ~30 fps)
-        # Each entry: (timestamp, frame_copy)
-        self.frame_buffer = deque(maxlen=300)  # 10 seconds * 30 fps = 300 frames
+        # Frame buffer for capturing past moments (last 10 seconds, sampled and
+        # downscaled into a preallocated ring instead of 300 raw frame copies)
+        self.frame_buffer = FrameHistory(**(history_options or {}))
         self.capture_delay = 7.0  # Capture from 7 seconds ago
         
-        # Simple tracking with counter
-        self.next_bottle_id = 0
-        self.tracked_bottles = {}  # id -> last_centroid
+        # Motion gate: skip YOLO on unchanged frames and reuse the last detections
+        self.motion_gate = MotionGate(**(motion_options or {}))
+        self.last_detections = None
+        
+        # Region of interest: crop inference and filter litter by polygon
+        if roi is not None and not isinstance(roi, RegionOfInterest):
+            roi = RegionOfInterest.from_config(roi)
+        self.roi = roi
+        
+        # Object tracker (tracks expire after 5s / 30 missed frames, max 256 live)
+        self.tracker = CentroidTracker(match_threshold=50, max_age=5.0,
+                                       max_misses=30, max_tracks=256,
+                                       history_size=self.VELOCITY_FRAMES)
         
         # Debug info
         self.debug_info = {
             'persons': 0,
             'litter_objects': 0,
             'static_objects': 0,
-            'nearest_distance': 0
+            'nearest_distance': 0,
+            'inference_skip_rate': 0.0
         }
+        
+        # Seconds spent in each stage of the last detect_frame() call
+        self.timings = dict.fromkeys(self.STAGES, 0.0)
+        self.last_inferred = False  # whether the last frame ran the model
     
     def _calculate_centroid(self, bbox):
         """Calculating centroid from bounding box [x1, y1, x2, y2]."""
@@ -82,178 +126,122 @@ class LitterMonitor:
         """Calculating Euclidean distance between two points."""
         return np.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
     
-    def _get_past_frame(self, seconds_ago):
-        """Get frame from N seconds ago from the buffer."""
-        if len(self.frame_buffer) == 0:
-            return None
-        
-        target_time = time.time() - seconds_ago
-        
-        # Find the frame closest to target_time
-        closest_frame = None
-        min_time_diff = float('inf')
-        
-        for timestamp, frame in self.frame_buffer:
-            time_diff = abs(timestamp - target_time)
-            if time_diff < min_time_diff:
-                min_time_diff = time_diff
-                closest_frame = frame
-        
-        return closest_frame if closest_frame is not None else self.frame_buffer[-1][1]
+    def _get_past_frame(self, seconds_ago, now=None):
+        """Get frame from N seconds ago (relative to `now`) from the buffer."""
+        if now is None:
+            now = time.time()
+        return self.frame_buffer.get_closest(now - seconds_ago)
     
-    def _match_bottle_to_track(self, centroid, threshold=50):
-        """Simple tracking: match detection to existing track or create new."""
-        best_id = None
-        best_dist = float('inf')
-        
-        for bottle_id, last_centroid in self.tracked_bottles.items():
-            dist = self._calculate_distance(centroid, last_centroid)
-            if dist < threshold and dist < best_dist:
-                best_dist = dist
-                best_id = bottle_id
-        
-        if best_id is None:
-            best_id = self.next_bottle_id
-            self.next_bottle_id += 1
-            
-        self.tracked_bottles[best_id] = centroid
-        return best_id
+    def get_history_range(self, t0, t1):
+        """Get copies of all buffered frames with timestamps in [t0, t1]."""
+        return self.frame_buffer.get_range(t0, t1)
     
-    def _is_bottle_static(self, bottle_id, centroid):
-        """Check if bottle has been static (moved < 5px over 10 frames)."""
-        self.bottle_history[bottle_id].append(centroid)
-        
-        # Keep only last VELOCITY_FRAMES
-        if len(self.bottle_history[bottle_id]) > self.VELOCITY_FRAMES:
-            self.bottle_history[bottle_id].pop(0)
-        
+    def _is_bottle_static(self, track):
+        """Check if bottle has been static (moved < VELOCITY_THRESHOLD px over VELOCITY_FRAMES frames)."""
         # Need at least VELOCITY_FRAMES to determine if static
-        if len(self.bottle_history[bottle_id]) < self.VELOCITY_FRAMES:
+        if track.points < self.VELOCITY_FRAMES:
             return False
-        
-        # Calculate total movement over the tracked frames
-        history = self.bottle_history[bottle_id]
-        total_movement = 0
-        for i in range(1, len(history)):
-            total_movement += self._calculate_distance(history[i-1], history[i])
-        
-        return total_movement < self.VELOCITY_THRESHOLD
+        return track.total_motion < self.VELOCITY_THRESHOLD
     
-    def _find_nearest_person_distance(self, bottle_centroid, person_bboxes):
-        """Find distance to nearest person."""
-        if not person_bboxes:
-            return float('inf')
-        
-        min_distance = float('inf')
-        for bbox in person_bboxes:
-            person_centroid = self._calculate_centroid(bbox)
-            dist = self._calculate_distance(bottle_centroid, person_centroid)
-            min_distance = min(min_distance, dist)
-        
-        return min_distance
+    def _nearest_person_distances(self, bottle_centroids, person_centroids):
+        """Find distance from each litter centroid to its nearest person."""
+        if len(person_centroids) == 0:
+            return np.full(len(bottle_centroids), np.inf, dtype=np.float32)
+        return pairwise_distances(bottle_centroids, person_centroids).min(axis=1)
     
-    def detect_frame(self, frame):
+    def _split_detections(self, detections):
         """
-        Process a single frame for litter detection.
+        Filter detections by class/confidence and compute centroids in bulk.
         
-        Args:
-            frame: OpenCV frame (BGR)
-            
         Returns:
-            tuple: (annotated_frame, current_state_flag)
+            tuple: (person_bboxes, person_conf, person_centroids,
+                    litter_bboxes, litter_conf, litter_cls, litter_centroids)
         """
-        if frame is None:
-            return None, self.current_state
-        
-        # Add current frame to buffer with timestamp
-        current_time = time.time()
-        self.frame_buffer.append((current_time, frame.copy()))
-        
-        # Run YOLOv8 detection
-        results = self.model(frame, verbose=False)
-        annotated_frame = frame.copy()
+        xyxy = detections[:, :4]
+        conf = detections[:, 4]
+        cls = detections[:, 5].astype(np.int64)
+        centroids = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+        
+        person_mask = (cls == self.PERSON_CLASS) & (conf > 0.5)
+        litter_ids = np.fromiter(self.LITTER_CLASSES, dtype=np.int64)
+        litter_mask = np.isin(cls, litter_ids) & (conf > 0.3)
+        if self.roi is not None:
+            # Litter outside the ROI polygons never becomes a track
+            litter_mask[litter_mask] = self.roi.contains(centroids[litter_mask])
+        
+        litter = np.flatnonzero(litter_mask)
+        if len(litter) > self.tracker.max_tracks:
+            # More litter than the tracker may hold: keep the most confident
+            keep = np.argsort(-conf[litter], kind='stable')[:self.tracker.max_tracks]
+            litter = np.sort(litter[keep])
+        
+        return (xyxy[person_mask], conf[person_mask], centroids[person_mask],
+                xyxy[litter], conf[litter], cls[litter], centroids[litter])
+    
+    def update(self, detections, timestamp):
+        """
+        Run tracking and the littering state machine on one frame's detections.
         
-        person_bboxes = []
-        bottle_detections = []
+        Needs neither the frame nor the model, so cached detections can be
+        replayed through it (see ai_engine.replay).
         
-        # Parse detections
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                bbox = box.xyxy[0].cpu().numpy()
-                conf = float(box.conf[0])
-                
-                if cls == self.PERSON_CLASS and conf > 0.5:
-                    person_bboxes.append(bbox)
-                    # Draw person box (blue)
-                    cv2.rectangle(annotated_frame, 
-                                (int(bbox[0]), int(bbox[1])), 
-                                (int(bbox[2]), int(bbox[3])), 
-                                (255, 200, 0), 2)
-                    cv2.putText(annotated_frame, f'Person {conf:.2f}', 
-                              (int(bbox[0]), int(bbox[1]-10)),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 200, 0), 2)
-                    
-                # Check if class is in our litter classes
-                elif cls in self.LITTER_CLASSES and conf > 0.3:
-                    litter_name = self.LITTER_CLASSES[cls]
-                    centroid = self._calculate_centroid(bbox)
-                    bottle_detections.append((bbox, centroid, litter_name))
-                    # Draw litter object box (cyan)
-                    cv2.rectangle(annotated_frame, 
-                                (int(bbox[0]), int(bbox[1])), 
-                                (int(bbox[2]), int(bbox[3])), 
-                                (0, 255, 255), 2)
-                    cv2.putText(annotated_frame, f'{litter_name} {conf:.2f}', 
-                              (int(bbox[0]), int(bbox[1]-10)),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+        Args:
+            detections: (N, 6) array of [x1, y1, x2, y2, conf, cls]
+            timestamp: Frame time in seconds
+            
+        Returns:
+            tuple: (person_bboxes, person_conf, litter_bboxes, litter_conf,
+                    litter_names, littering) where `littering` flags static
+                    litter far from every person
+        """
+        t = time.perf_counter()
+        (person_bboxes, person_conf, person_centroids,
+         litter_bboxes, litter_conf, litter_cls, litter_centroids) = self._split_detections(detections)
+        litter_names = [self.LITTER_CLASSES[c] for c in litter_cls.tolist()]
+        t, self.timings['parse'] = _lap(t)
         
         # Update debug info
         self.debug_info['persons'] = len(person_bboxes)
-        self.debug_info['litter_objects'] = len(bottle_detections)
+        self.debug_info['litter_objects'] = len(litter_bboxes)
+        
+        # Track all litter detections and measure person distances in bulk
+        litter_points = [tuple(c) for c in litter_centroids.tolist()]
+        self.tracker.history_size = self.VELOCITY_FRAMES  # applies to new tracks
+        tracks = self.tracker.update(litter_points, timestamp)
+        person_distances = self._nearest_person_distances(litter_centroids, person_centroids).tolist()
         
         # Process litter detections
         litter_detected = False
         static_count = 0
         nearest_dist = float('inf')
+        littering = [False] * len(tracks)
         
-        for bbox, centroid, litter_name in bottle_detections:
-            bottle_id = self._match_bottle_to_track(centroid)
-            
+        for i, (bbox, track, distance) in enumerate(zip(litter_bboxes, tracks, person_distances)):
             # Check if object is static
-            if self._is_bottle_static(bottle_id, centroid):
+            if self._is_bottle_static(track):
                 static_count += 1
                 # Check distance to nearest person
-                distance = self._find_nearest_person_distance(centroid, person_bboxes)
                 nearest_dist = min(nearest_dist, distance)
                 
                 if distance > self.DISTANCE_THRESHOLD:
                     litter_detected = True
+                    littering[i] = True
                     self.detected_bottle_frame = bbox
-                    
-                    # Draw warning indicator
-                    cv2.rectangle(annotated_frame, 
-                                (int(bbox[0]), int(bbox[1])), 
-                                (int(bbox[2]), int(bbox[3])), 
-                                (0, 0, 255), 4)
-                    cv2.putText(annotated_frame, f'LITTER: {litter_name}!', 
-                              (int(bbox[0]), int(bbox[1]-30)),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
         
         self.debug_info['static_objects'] = static_count
         self.debug_info['nearest_distance'] = nearest_dist if nearest_dist != float('inf') else 0
+        self.debug_info['inference_skip_rate'] = self.motion_gate.skip_rate
         
         # State machine logic
         if self.current_state == "IDLE":
             if litter_detected:
                 if self.grace_start_time is None:
-                    self.grace_start_time = time.time()
-                elif time.time() - self.grace_start_time >= self.GRACE_PERIOD:
+                    self.grace_start_time = timestamp
+                elif timestamp - self.grace_start_time >= self.GRACE_PERIOD:
                     self.current_state = "WARNING"
                     self.grace_start_time = None
                     # Capture frame from 7 seconds ago (before grace period started)
-                    self.captured_violator_frame = self._get_past_frame(self.capture_delay)
+                    self.captured_violator_frame = self._get_past_frame(self.capture_delay, timestamp)
             else:
                 self.grace_start_time = None
                 
@@ -265,6 +253,81 @@ class LitterMonitor:
             # State will be reset by backend after display
             pass
         
+        self.timings['tracking'] = time.perf_counter() - t
+        return person_bboxes, person_conf, litter_bboxes, litter_conf, litter_names, littering
+    
+    def detect_frame(self, frame, timestamp=None):
+        """
+        Process a single frame for litter detection.
+        
+        Args:
+            frame: OpenCV frame (BGR)
+            timestamp: Frame time in seconds (e.g. video PTS for offline
+                analysis); defaults to the wall clock
+            
+        Returns:
+            tuple: (annotated_frame, current_state_flag)
+        """
+        if frame is None:
+            return None, self.current_state
+        
+        # Add current frame to buffer with timestamp
+        current_time = time.time() if timestamp is None else timestamp
+        t = time.perf_counter()
+        self.frame_buffer.append(current_time, frame)
+        t, self.timings['history'] = _lap(t)
+        
+        # Restrict inference (and motion gating) to the ROI bounding region
+        if self.roi is not None:
+            region, (x_off, y_off) = self.roi.crop(frame)
+        else:
+            region, x_off, y_off = frame, 0, 0
+        
+        # Run YOLOv8 detection only if the scene changed; otherwise the last
+        # detections still hold and feed the tracker as zero-motion updates
+        infer = self.motion_gate.should_infer(region, current_time) or self.last_detections is None
+        t, self.timings['motion'] = _lap(t)
+        if infer:
+            detections = self.detector(region)
+            if x_off or y_off:
+                detections = detections + np.array([x_off, y_off, x_off, y_off, 0, 0],
+                                                   dtype=detections.dtype)
+            self.last_detections = detections
+        self.last_inferred = infer
+        detections = self.last_detections
+        t, self.timings['inference'] = _lap(t)
+        
+        (person_bboxes, person_conf, litter_bboxes, litter_conf,
+         litter_names, littering) = self.update(detections, current_time)
+        
+        t = time.perf_counter()
+        annotated_frame = frame.copy()
+        if self.roi is not None:
+            self.roi.draw(annotated_frame)
+        
+        # Draw person boxes (blue)
+        for bbox, conf in zip(person_bboxes.astype(int).tolist(), person_conf.tolist()):
+            cv2.rectangle(annotated_frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), 
+                        (255, 200, 0), 2)
+            cv2.putText(annotated_frame, f'Person {conf:.2f}', (bbox[0], bbox[1]-10),
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 200, 0), 2)
+        
+        # Draw litter object boxes (cyan)
+        for bbox, conf, litter_name in zip(litter_bboxes.astype(int).tolist(), litter_conf.tolist(), litter_names):
+            cv2.rectangle(annotated_frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), 
+                        (0, 255, 255), 2)
+            cv2.putText(annotated_frame, f'{litter_name} {conf:.2f}', (bbox[0], bbox[1]-10),
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+        
+        # Draw warning indicator on static litter left far from everyone
+        for bbox, litter_name, flagged in zip(litter_bboxes.astype(int).tolist(), litter_names, littering):
+            if flagged:
+                cv2.rectangle(annotated_frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), 
+                            (0, 0, 255), 4)
+                cv2.putText(annotated_frame, f'LITTER: {litter_name}!', 
+                          (bbox[0], bbox[1]-30),
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        
         # Draw status overlay
         status_color = {
             "IDLE": (0, 255, 0),
@@ -279,22 +342,25 @@ class LitterMonitor:
                   (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.7, status_color, 2)
         
         # Debug info box
-        cv2.rectangle(annotated_frame, (10, 60), (280, 140), (0, 0, 0), -1)
+        cv2.rectangle(annotated_frame, (10, 60), (280, 160), (0, 0, 0), -1)
         cv2.putText(annotated_frame, f'Persons: {self.debug_info["persons"]}', 
                   (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-        cv2.putText(annotated_frame, f'Objects: {self.debug_info["litter_objects"]} (Static: {static_count})', 
+        cv2.putText(annotated_frame, f'Objects: {self.debug_info["litter_objects"]} (Static: {self.debug_info["static_objects"]})', 
                   (20, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
         cv2.putText(annotated_frame, f'Nearest: {self.debug_info["nearest_distance"]:.0f}px (Thresh: {self.DISTANCE_THRESHOLD})', 
                   (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        cv2.putText(annotated_frame, f'Inference skipped: {self.debug_info["inference_skip_rate"]:.0%}', 
+                  (20, 140), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
         
         # Draw grace timer if active
         if self.grace_start_time is not None:
-            elapsed = time.time() - self.grace_start_time
+            elapsed = current_time - self.grace_start_time
             remaining = max(0, self.GRACE_PERIOD - elapsed)
-            cv2.rectangle(annotated_frame, (10, 145), (280, 175), (0, 100, 100), -1)
+            cv2.rectangle(annotated_frame, (10, 165), (280, 195), (0, 100, 100), -1)
             cv2.putText(annotated_frame, f'GRACE TIMER: {remaining:.1f}s', 
-                      (20, 165), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+                      (20, 185), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
         
+        self.timings['annotation'] = time.perf_counter() - t
         return annotated_frame, self.current_state
     
     def set_state(self, state):
@@ -309,12 +375,12 @@ class LitterMonitor:
     
     def reset(self):
         """Reset all tracking state."""
-        self.bottle_history.clear()
         self.static_bottles.clear()
-        self.tracked_bottles.clear()
+        self.tracker.clear()
+        self.motion_gate.reset()
+        self.last_detections = None
         self.grace_start_time = None
         self.current_state = "IDLE"
-        self.next_bottle_id = 0
         self.captured_violator_frame = None
         self.frame_buffer.clear()  # Clear frame buffer
     
@@ -1,32 +1,259 @@
 """
 CivicEye AI Engine - Face Recognition Module
-Mock implementation that returns dummy data for hackathon demo.
+CPU face detection (YuNet) and embedding (SFace) through OpenCV's DNN
+module, matched against a gallery of known offenders.
+
+Gallery embeddings are computed once and persisted as an .npy matrix that is
+memory-mapped at startup; a query is one matrix-vector product (cosine
+similarity of L2-normalized embeddings) plus a partial sort for the top k.
+Large galleries can use a FAISS HNSW index instead, when faiss is installed.
+
+The ONNX models come from the OpenCV model zoo and are looked up in
+<project root>/models/ by default:
+    face_detection_yunet_2023mar.onnx
+    face_recognition_sface_2021dec.onnx
+Without them matching is disabled: alerts stay unidentified, and only the
+demo route uses a (random) demo offender.
 """
 
 import json
 import os
 import random
 
+import numpy as np
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_DIR = os.path.join(PROJECT_ROOT, 'backend', 'database')
+MODELS_DIR = os.path.join(PROJECT_ROOT, 'models')
+DETECTOR_MODEL = 'face_detection_yunet_2023mar.onnx'
+RECOGNIZER_MODEL = 'face_recognition_sface_2021dec.onnx'
+
+MATCH_THRESHOLD = 0.363  # SFace cosine similarity for "same person"
+ANN_MIN_SIZE = 50000     # gallery size from which a FAISS index is used
+
+
+class FaceEmbedder:
+    """YuNet face detector + SFace embedder (cv2.dnn, CPU)."""
+
+    def __init__(self, detector_model, recognizer_model, score_threshold=0.8):
+        """
+        Args:
+            detector_model: Path to the YuNet ONNX model
+            recognizer_model: Path to the SFace ONNX model
+            score_threshold: Minimum face detection confidence
+        """
+        import cv2
+
+        self.detector = cv2.FaceDetectorYN.create(detector_model, '', (320, 320), score_threshold)
+        self.recognizer = cv2.FaceRecognizerSF.create(recognizer_model, '')
+
+    def detect(self, image):
+        """
+        Detect faces.
+
+        Returns:
+            numpy.ndarray: (N, 15) YuNet rows (box, 5 landmarks, score),
+                highest score first
+        """
+        height, width = image.shape[:2]
+        self.detector.setInputSize((width, height))
+        _, faces = self.detector.detect(image)
+        if faces is None:
+            return np.empty((0, 15), dtype=np.float32)
+        return faces[np.argsort(-faces[:, -1])]
+
+    def embed_face(self, image, face):
+        """Aligned, L2-normalized embedding of one detected face."""
+        aligned = self.recognizer.alignCrop(image, face)
+        feature = self.recognizer.feature(aligned).reshape(-1).astype(np.float32)
+        return feature / (np.linalg.norm(feature) + 1e-12)
+
+    def embed(self, image, max_faces=None):
+        """
+        Detect and embed the faces in an image.
+
+        Returns:
+            tuple: (faces (N, 15), embeddings (N, D) float32)
+        """
+        faces = self.detect(image)
+        if max_faces is not None:
+            faces = faces[:max_faces]
+        if len(faces) == 0:
+            return faces, np.empty((0, 0), dtype=np.float32)
+        return faces, np.stack([self.embed_face(image, face) for face in faces])
+
+
+class FaceGallery:
+    """
+    Embedding matrix of known offenders persisted as <path>.npy + <path>.json.
+
+    Row i of the matrix belongs to `ids[i]`. The JSON sidecar records which
+    photo (and modification time) each row was computed from, and which
+    photos had no usable face, so a rebuild only re-embeds photos that changed.
+    """
+
+    def __init__(self, ids=(), embeddings=None, sources=None, failed=None):
+        self.ids = list(ids)
+        self.embeddings = embeddings if embeddings is not None else np.empty((0, 0), np.float32)
+        self.sources = dict(sources or {})  # id -> [photo path, mtime]
+        self.failed = dict(failed or {})    # id -> [photo path, mtime] of photos without a face
+        self._index = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved gallery (embeddings memory-mapped), or None if missing."""
+        try:
+            with open(f"{path}.json", 'r') as f:
+                meta = json.load(f)
+            embeddings = np.load(f"{path}.npy", mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        if len(meta['ids']) != len(embeddings):
+            return None
+        return cls(meta['ids'], embeddings, meta.get('sources'), meta.get('failed'))
+
+    def save(self, path):
+        """Write the embedding matrix and its sidecar (atomically)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.tmp.npy", 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.embeddings, dtype=np.float32))
+        with open(f"{path}.tmp.json", 'w') as f:
+            json.dump({'ids': self.ids, 'sources': self.sources, 'failed': self.failed}, f, indent=2)
+        os.replace(f"{path}.tmp.npy", f"{path}.npy")
+        os.replace(f"{path}.tmp.json", f"{path}.json")
+
+    @classmethod
+    def build(cls, entries, embedder, previous=None):
+        """
+        Embed gallery photos, reusing rows of `previous` for unchanged photos.
+
+        Args:
+            entries: [(id, photo path), ...]
+            embedder: FaceEmbedder
+            previous: FaceGallery computed earlier (or None)
+
+        Returns:
+            tuple: (FaceGallery, number of photos embedded now)
+        """
+        import cv2
+
+        reuse = {}
+        if previous is not None:
+            reuse = {cid: i for i, cid in enumerate(previous.ids)}
+        ids, rows, sources, failed, embedded = [], [], {}, {}, 0
+        for criminal_id, photo in entries:
+            try:
+                mtime = os.path.getmtime(photo)
+            except OSError:
+                continue
+            source = [os.path.abspath(photo), mtime]
+            if criminal_id in reuse and previous.sources.get(criminal_id) == source:
+                row = np.asarray(previous.embeddings[reuse[criminal_id]])
+            elif previous is not None and previous.failed.get(criminal_id) == source:
+                failed[criminal_id] = source  # unchanged photo that had no face
+                continue
+            else:
+                image = cv2.imread(photo)
+                if image is None:
+                    failed[criminal_id] = source
+                    continue
+                _, embeddings = embedder.embed(image, max_faces=1)
+                if len(embeddings) == 0:
+                    print(f"⚠️  No face found in gallery photo {photo}")
+                    failed[criminal_id] = source
+                    continue
+                row = embeddings[0]
+                embedded += 1
+            ids.append(criminal_id)
+            rows.append(row)
+            sources[criminal_id] = source
+        matrix = np.stack(rows).astype(np.float32) if rows else np.empty((0, 0), np.float32)
+        return cls(ids, matrix, sources, failed), embedded
+
+    def _ann_index(self):
+        """FAISS HNSW (inner product) index for large galleries, if available."""
+        if self._index is None:
+            try:
+                import faiss
+            except ImportError:
+                self._index = False
+            else:
+                index = faiss.IndexHNSWFlat(self.embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+                index.add(np.ascontiguousarray(self.embeddings, dtype=np.float32))
+                self._index = index
+        return self._index or None
+
+    def search(self, queries, k=5, threshold=MATCH_THRESHOLD):
+        """
+        Top-k gallery matches for each query embedding.
+
+        Args:
+            queries: (Q, D) or (D,) L2-normalized embeddings
+            k: Matches returned per query
+            threshold: Minimum cosine similarity
+
+        Returns:
+            list: Per query, [(id, similarity), ...] best first
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if len(self.ids) == 0 or len(queries) == 0:
+            return [[] for _ in queries]
+        k = min(k, len(self.ids))
+
+        index = self._ann_index() if len(self.ids) >= ANN_MIN_SIZE else None
+        if index is not None:
+            scores, top = index.search(queries, k)
+        else:
+            scores = queries @ np.asarray(self.embeddings).T  # (Q, N) cosine similarities
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            scores = np.take_along_axis(scores, order, axis=1)
+
+        return [
+            [(self.ids[i], float(s)) for i, s in zip(row_top, row_scores) if i >= 0 and s >= threshold]
+            for row_top, row_scores in zip(top, scores)
+        ]
+
 
 class FaceMatcher:
     """
-    Mock face matching class that returns dummy criminal data.
-    In production, this would use actual face recognition (e.g., face_recognition library).
+    Matches faces in captured frames against the known-offender database.
+
+    Offender records come from dummy_criminals.json; entries with a local
+    "photo" (relative to the database directory) are embedded into the
+    gallery. The gallery is rebuilt incrementally at startup when photos
+    change and otherwise just memory-mapped.
     """
-    
-    def __init__(self, database_path=None):
-        """Initialize FaceMatcher with path to dummy criminals database."""
+
+    def __init__(self, database_path=None, gallery_path=None, models_dir=MODELS_DIR,
+                 threshold=MATCH_THRESHOLD):
+        """
+        Args:
+            database_path: Offender records (JSON list)
+            gallery_path: Embedding files prefix (<path>.npy / <path>.json)
+            models_dir: Directory holding the YuNet and SFace ONNX models
+            threshold: Minimum cosine similarity for a match
+        """
         if database_path is None:
             # Default path (relative to project root)
-            self.database_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)),
-                'backend', 'database', 'dummy_criminals.json'
-            )
+            self.database_path = os.path.join(DATABASE_DIR, 'dummy_criminals.json')
         else:
             self.database_path = database_path
-            
+        self.gallery_path = gallery_path or os.path.join(DATABASE_DIR, 'face_gallery')
+        self.threshold = threshold
+
         self.criminals_db = self._load_database()
-    
+        self._by_id = {c["id"]: c for c in self.criminals_db}
+
+        self.embedder = self._create_embedder(models_dir)
+        self.gallery = self._load_gallery() if self.embedder else FaceGallery()
+
     def _load_database(self):
         """Load the dummy criminals database."""
         try:
@@ -35,7 +262,43 @@ class FaceMatcher:
         except FileNotFoundError:
             # Return default dummy data if file not found
             return self._get_default_criminals()
-    
+
+    def _create_embedder(self, models_dir):
+        detector = os.path.join(models_dir, DETECTOR_MODEL)
+        recognizer = os.path.join(models_dir, RECOGNIZER_MODEL)
+        if not (os.path.exists(detector) and os.path.exists(recognizer)):
+            return None
+        try:
+            return FaceEmbedder(detector, recognizer)
+        except Exception as e:
+            print(f"⚠️  Face models failed to load: {e}")
+            return None
+
+    def _gallery_entries(self):
+        base = os.path.dirname(os.path.abspath(self.database_path))
+        return [(c["id"], os.path.join(base, c["photo"]))
+                for c in self.criminals_db if c.get("photo")]
+
+    def _load_gallery(self):
+        """Memory-map the saved gallery, re-embedding only changed photos."""
+        gallery = FaceGallery.load(self.gallery_path)
+        entries = self._gallery_entries()
+        current = {cid: [os.path.abspath(photo), os.path.getmtime(photo)]
+                   for cid, photo in entries if os.path.exists(photo)}
+        if gallery is not None and {**gallery.sources, **gallery.failed} == current:
+            return gallery
+        gallery, embedded = FaceGallery.build(entries, self.embedder, previous=gallery)
+        if not current:
+            return gallery
+        gallery.save(self.gallery_path)
+        print(f"🧑 Face gallery: {len(gallery)} offenders ({embedded} embedded)")
+        return FaceGallery.load(self.gallery_path) or gallery
+
+    @property
+    def ready(self):
+        """True if face models are loaded and the gallery is not empty."""
+        return self.embedder is not None and len(self.gallery) > 0
+
     def _get_default_criminals(self):
         """Return default dummy criminal data."""
         return [
@@ -46,7 +309,7 @@ class FaceMatcher:
                 "prior_offenses": 2
             },
             {
-                "id": "CIV-002", 
+                "id": "CIV-002",
                 "name": "Jane Smith",
                 "photo_url": "https://randomuser.me/api/portraits/women/2.jpg",
                 "prior_offenses": 1
@@ -70,37 +333,92 @@ class FaceMatcher:
                 "prior_offenses": 1
             }
         ]
-    
-    def match_face(self, face_image=None):
+
+    def match(self, image, k=5, threshold=None, max_faces=3):
         """
-        Mock face matching - returns a random criminal from the database.
-        
+        Find known offenders among the faces in an image.
+
         Args:
-            face_image: Face image (ignored in mock implementation)
-            
+            image: BGR frame (e.g. the captured violator frame)
+            k: Matches returned
+            threshold: Minimum cosine similarity (default: self.threshold)
+            max_faces: Largest number of detected faces searched
+
         Returns:
-            dict: Criminal data with match confidence
+            list: Offender records with "match_confidence" (cosine similarity),
+                best first, at most k (empty if nothing passes the threshold)
         """
-        if not self.criminals_db:
-            return None
-            
-        # Returns random criminal for demo purposes
-        criminal = random.choice(self.criminals_db)
+        if not self.ready or image is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        _, embeddings = self.embedder.embed(image, max_faces=max_faces)
+        best = {}
+        for matches in self.gallery.search(embeddings, k=k, threshold=threshold):
+            for criminal_id, similarity in matches:
+                best[criminal_id] = max(similarity, best.get(criminal_id, -1.0))
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:k]
+        return [self._offender(self._by_id[cid], similarity) for cid, similarity in ranked
+                if cid in self._by_id]
+
+    @staticmethod
+    def _offender(criminal, confidence):
         return {
             "id": criminal["id"],
             "name": criminal["name"],
             "photo_url": criminal["photo_url"],
             "prior_offenses": criminal.get("prior_offenses", 0),
-            "match_confidence": round(random.uniform(0.85, 0.98), 2)
+            "match_confidence": round(float(confidence), 3)
         }
-    
+
+    def match_face(self, face_image=None):
+        """
+        Best known offender in `face_image`.
+
+        Args:
+            face_image: BGR frame or face crop
+
+        Returns:
+            dict: Criminal data with match confidence, or None if no face
+                matches (or matching is unavailable)
+        """
+        matches = self.match(face_image, k=1)
+        return matches[0] if matches else None
+
+    def demo_offender(self):
+        """Random offender with a made-up confidence, for demos without a capture."""
+        if not self.criminals_db:
+            return None
+        criminal = random.choice(self.criminals_db)
+        return self._offender(criminal, random.uniform(0.85, 0.98))
+
     def get_all_criminals(self):
         """Return all criminals in database."""
         return self.criminals_db
-    
+
     def get_criminal_by_id(self, criminal_id):
         """Get a specific criminal by ID."""
-        for criminal in self.criminals_db:
-            if criminal["id"] == criminal_id:
-                return criminal
-        return None
+        return self._by_id.get(criminal_id)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the face gallery or match an image")
+    parser.add_argument("images", nargs="*", help="Images to match against the gallery")
+    parser.add_argument("--database", help="Offender records JSON (default: backend/database/dummy_criminals.json)")
+    parser.add_argument("--gallery", help="Gallery file prefix (default: backend/database/face_gallery)")
+    parser.add_argument("--models", default=MODELS_DIR, help="Directory with the YuNet/SFace ONNX models")
+    parser.add_argument("-k", type=int, default=5, help="Matches per image")
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    args = parser.parse_args()
+
+    import cv2
+
+    matcher = FaceMatcher(args.database, args.gallery, args.models, args.threshold)
+    if matcher.embedder is None:
+        raise SystemExit(f"❌ Face models not found in {args.models} ({DETECTOR_MODEL}, {RECOGNIZER_MODEL})")
+    print(f"🧑 Gallery: {len(matcher.gallery)} offenders")
+    for path in args.images:
+        results = matcher.match(cv2.imread(path), k=args.k)
+        print(f"{path}: " + (", ".join(f"{r['id']} ({r['match_confidence']:.3f})" for r in results)
+                             or "no match"))
@@ -0,0 +1,200 @@
+"""
+CivicEye AI Engine - Frame History Module
+Memory-bounded ring buffer holding the last few seconds of video so past
+moments (e.g. the frame before a violation) can be recovered.
+"""
+
+import cv2
+import numpy as np
+
+
+class FrameHistory:
+    """
+    Fixed-size ring of downscaled, time-sampled frames.
+
+    Storage is one contiguous uint8 array allocated when the first frame
+    arrives; new frames are resized straight into their ring slot, so the
+    steady state allocates nothing per frame. Frames are only copied out when
+    a caller actually needs one (e.g. on a violation).
+
+    Timestamps are kept in a parallel ring that is monotonic in insertion
+    order, so point and range lookups are binary searches.
+    """
+
+    def __init__(self, duration=10.0, sample_fps=10.0, max_width=960,
+                 max_bytes=192 * 1024 * 1024):
+        """
+        Args:
+            duration: Seconds of history to keep
+            sample_fps: Frames per second stored (incoming frames are decimated)
+            max_width: Frames wider than this are downscaled before storing
+            max_bytes: Hard cap on the ring's pixel storage
+        """
+        self.duration = duration
+        self.sample_interval = 1.0 / sample_fps if sample_fps else 0.0
+        self.max_width = max_width
+        self.max_bytes = max_bytes
+
+        self._frames = None   # (capacity, h, w, 3) uint8
+        self._times = None    # (capacity,) float64
+        self._shape = None    # source frame shape the ring was sized for
+        self._size = None     # (w, h) stored frame size
+        self._start = 0
+        self._count = 0
+        self._last_time = None
+        self._next_due = None  # sample slot the next stored frame must reach
+
+    # -------------------------------------------------------------------------
+    # Storage
+    # -------------------------------------------------------------------------
+
+    def _allocate(self, frame):
+        """Size the ring for the given source frame shape."""
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            scale = self.max_width / w
+            w, h = self.max_width, max(1, int(round(h * scale)))
+
+        frame_bytes = h * w * 3
+        wanted = int(np.ceil(self.duration / self.sample_interval)) + 1 \
+            if self.sample_interval else int(self.duration * 30)
+        capacity = max(1, min(wanted, self.max_bytes // frame_bytes))
+
+        self._frames = np.empty((capacity, h, w, 3), dtype=np.uint8)
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._shape = frame.shape
+        self._size = (w, h)
+        self.clear()
+
+    def append(self, timestamp, frame):
+        """
+        Store a frame if its sample slot is due.
+
+        Slots are scheduled at a fixed `sample_interval` (not relative to the
+        last stored frame), so sources whose frame period does not divide the
+        interval evenly still average `sample_fps`; frame timestamps are
+        compared with a small tolerance for float jitter.
+
+        Returns:
+            bool: True if the frame was stored
+        """
+        if frame is None:
+            return False
+        if self._last_time is not None:
+            if timestamp < self._last_time:
+                # Clock went backwards (e.g. source restarted): keep the index monotonic
+                self.clear()
+            elif timestamp < self._next_due - self.sample_interval * 1e-3:
+                return False
+        if self._frames is None or frame.shape != self._shape:
+            self._allocate(frame)
+
+        capacity = len(self._times)
+        if self._count < capacity:
+            idx = (self._start + self._count) % capacity
+            self._count += 1
+        else:
+            idx = self._start
+            self._start = (self._start + 1) % capacity
+
+        slot = self._frames[idx]
+        if (frame.shape[1], frame.shape[0]) == self._size:
+            np.copyto(slot, frame)
+        else:
+            cv2.resize(frame, self._size, dst=slot, interpolation=cv2.INTER_AREA)
+        self._times[idx] = timestamp
+        if self._last_time is None:
+            self._next_due = timestamp
+        self._last_time = timestamp
+        self._next_due += self.sample_interval
+        if self._next_due <= timestamp:
+            self._next_due = timestamp + self.sample_interval  # far behind (gap in the source): resync
+        return True
+
+    def clear(self):
+        """Drop all stored frames (storage stays allocated)."""
+        self._start = 0
+        self._count = 0
+        self._last_time = None
+        self._next_due = None
+
+    # -------------------------------------------------------------------------
+    # Lookup
+    # -------------------------------------------------------------------------
+
+    def _physical(self, i):
+        """Map a logical index (0 = oldest) to a ring slot."""
+        return (self._start + i) % len(self._times)
+
+    def _bisect_left(self, timestamp):
+        """Logical index of the first stored frame with time >= timestamp."""
+        lo, hi = 0, self._count
+        times = self._times
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[self._physical(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get_closest(self, timestamp):
+        """Return a copy of the stored frame closest to `timestamp`, or None."""
+        if self._count == 0:
+            return None
+        i = self._bisect_left(timestamp)
+        if i == self._count:
+            i -= 1
+        elif i > 0:
+            before = self._times[self._physical(i - 1)]
+            after = self._times[self._physical(i)]
+            if timestamp - before <= after - timestamp:
+                i -= 1
+        return self._frames[self._physical(i)].copy()
+
+    def iter_range(self, t0, t1):
+        """
+        Yield (timestamp, frame) for every stored frame with t0 <= time <= t1,
+        oldest first.
+
+        Frames are views into the ring: copy them (or consume them before the
+        next append) if they must outlive the call.
+        """
+        i = self._bisect_left(t0)
+        while i < self._count:
+            idx = self._physical(i)
+            timestamp = self._times[idx]
+            if timestamp > t1:
+                break
+            yield float(timestamp), self._frames[idx]
+            i += 1
+
+    def get_range(self, t0, t1):
+        """Return [(timestamp, frame_copy), ...] for frames in [t0, t1]."""
+        return [(t, frame.copy()) for t, frame in self.iter_range(t0, t1)]
+
+    @property
+    def time_span(self):
+        """(oldest, newest) stored timestamps, or None if empty."""
+        if self._count == 0:
+            return None
+        return (float(self._times[self._physical(0)]),
+                float(self._times[self._physical(self._count - 1)]))
+
+    def latest(self):
+        """Return a copy of the most recently stored frame, or None."""
+        if self._count == 0:
+            return None
+        return self._frames[self._physical(self._count - 1)].copy()
+
+    @property
+    def nbytes(self):
+        """Bytes allocated for frame storage."""
+        return 0 if self._frames is None else self._frames.nbytes
+
+    @property
+    def capacity(self):
+        return 0 if self._times is None else len(self._times)
+
+    def __len__(self):
+        return self._count
@@ -0,0 +1,110 @@
+"""
+CivicEye AI Engine - Motion Gate Module
+Cheap frame-differencing pre-stage that decides whether a frame needs a full
+YOLO pass or whether the previous detections still describe the scene.
+"""
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Skips inference on frames that have not changed since the last inferred frame.
+
+    Each frame is downscaled to a small blurred grayscale image and compared
+    with the one kept from the last inference. If fewer than
+    `min_changed_ratio` of the pixels differ by more than `pixel_threshold`,
+    the frame is skipped. Inference is always forced after `max_interval`
+    seconds so slow changes and detector noise are picked up.
+    """
+
+    def __init__(self, enabled=True, width=160, pixel_threshold=25,
+                 min_changed_ratio=0.002, max_interval=1.0):
+        """
+        Args:
+            enabled: When False every frame is inferred
+            width: Width of the downscaled comparison image
+            pixel_threshold: Gray-level change that counts a pixel as changed
+            min_changed_ratio: Fraction of changed pixels that counts as motion
+            max_interval: Maximum seconds between forced inferences
+        """
+        self.enabled = enabled
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.max_interval = max_interval
+
+        # Preallocated working buffers (sized on the first frame)
+        self._color = None
+        self._gray = None
+        self._diff = None
+        self._reference = None
+        self._last_inference = None
+
+        # Counters
+        self.frames_seen = 0
+        self.frames_inferred = 0
+        self.frames_skipped = 0
+
+    def _prepare(self, frame):
+        """Downscale + grayscale + blur the frame into the working buffer."""
+        h, w = frame.shape[:2]
+        sw = min(self.width, w)
+        sh = max(1, int(round(h * sw / w)))
+        if self._gray is None or self._gray.shape != (sh, sw):
+            self._color = np.empty((sh, sw, 3), dtype=np.uint8)
+            self._gray = np.empty((sh, sw), dtype=np.uint8)
+            self._diff = np.empty((sh, sw), dtype=np.uint8)
+            self._reference = None
+
+        cv2.resize(frame, (sw, sh), dst=self._color, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._color, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.GaussianBlur(self._gray, (5, 5), 0, dst=self._gray)
+
+    def _has_motion(self):
+        cv2.absdiff(self._gray, self._reference, dst=self._diff)
+        cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        return cv2.countNonZero(self._diff) >= self.min_changed_ratio * self._diff.size
+
+    def should_infer(self, frame, timestamp):
+        """
+        Decide whether `frame` needs a fresh YOLO pass.
+
+        Returns:
+            bool: True to run inference, False to reuse the last detections
+        """
+        self.frames_seen += 1
+
+        infer = not self.enabled
+        if not infer:
+            self._prepare(frame)
+            infer = (
+                self._reference is None
+                or self._last_inference is None
+                or not 0 <= timestamp - self._last_inference < self.max_interval
+                or self._has_motion()
+            )
+
+        if not infer:
+            self.frames_skipped += 1
+            return False
+
+        if self.enabled:
+            if self._reference is None:
+                self._reference = self._gray.copy()
+            else:
+                np.copyto(self._reference, self._gray)
+        self._last_inference = timestamp
+        self.frames_inferred += 1
+        return True
+
+    def reset(self):
+        """Forget the reference frame so the next frame is always inferred."""
+        self._reference = None
+        self._last_inference = None
+
+    @property
+    def skip_rate(self):
+        """Fraction of frames that skipped inference."""
+        return self.frames_skipped / self.frames_seen if self.frames_seen else 0.0
@@ -0,0 +1,229 @@
+"""
+CivicEye AI Engine - Detection Cache & Replay Module
+Records per-frame raw detections into compact NPZ caches and replays them
+through the tracker and state machine without the model, so detection
+thresholds can be tuned in seconds instead of re-running YOLO.
+
+Caches are written by `python analyze.py ... --record caches/`, then:
+
+    python -m ai_engine.replay caches/*.npz --velocity-threshold 4 8 12 \\
+        --distance-threshold 100 150 200 --grace-period 3 5 --workers 8
+"""
+
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+# LitterMonitor attributes a sweep can vary
+TUNABLE_PARAMS = ('VELOCITY_THRESHOLD', 'VELOCITY_FRAMES', 'DISTANCE_THRESHOLD', 'GRACE_PERIOD')
+
+
+class DetectionRecorder:
+    """Accumulates per-frame (N, 6) detections and their timestamps."""
+
+    def __init__(self, **meta):
+        """
+        Args:
+            **meta: JSON-serializable metadata stored with the cache
+                (source, start, end, frame_shape, ...)
+        """
+        self.meta = meta
+        self._timestamps = []
+        self._counts = []
+        self._chunks = []
+
+    def append(self, timestamp, detections):
+        self._timestamps.append(timestamp)
+        self._counts.append(len(detections))
+        if len(detections):
+            self._chunks.append(np.asarray(detections, dtype=np.float32))
+
+    def save(self, path):
+        """Write the cache as a compressed NPZ file."""
+        offsets = np.zeros(len(self._counts) + 1, dtype=np.int64)
+        np.cumsum(self._counts, out=offsets[1:])
+        detections = (np.concatenate(self._chunks) if self._chunks
+                      else np.empty((0, 6), dtype=np.float32))
+        np.savez_compressed(
+            path,
+            timestamps=np.asarray(self._timestamps, dtype=np.float64),
+            offsets=offsets,
+            detections=detections,
+            meta=np.array(json.dumps(self.meta))
+        )
+        return path
+
+    def __len__(self):
+        return len(self._timestamps)
+
+
+class DetectionCache:
+    """
+    Recorded detections of one video (segment).
+
+    All boxes live in a single (total, 6) array; frame i owns rows
+    offsets[i]:offsets[i + 1], so iterating yields views without copies.
+    """
+
+    def __init__(self, timestamps, offsets, detections, meta=None):
+        self.timestamps = timestamps
+        self.offsets = offsets
+        self.detections = detections
+        self.meta = meta or {}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['timestamps'], data['offsets'], data['detections'],
+                       json.loads(str(data['meta'])))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __iter__(self):
+        offsets = self.offsets.tolist()
+        for i, ts in enumerate(self.timestamps.tolist()):
+            yield ts, self.detections[offsets[i]:offsets[i + 1]]
+
+
+def _no_model(frame):
+    raise RuntimeError("Replay monitors have no model")
+
+
+def replay(cache, params=None, cooldown=30.0, roi=None):
+    """
+    Drive a fresh LitterMonitor's tracker and state machine from a cache.
+
+    Alerts auto-reset after `cooldown` seconds like the live STATE_TIMEOUT,
+    and alerts before the cache's "start" (a shard's warm-up) are not counted.
+
+    Args:
+        cache: DetectionCache
+        params: Optional {TUNABLE_PARAM: value} overrides
+        cooldown: Seconds an alert stays active before re-arming
+        roi: Optional ROI config applied to the cached detections
+
+    Returns:
+        list: Timestamps at which incidents fired
+    """
+    from .detector import LitterMonitor
+
+    monitor = LitterMonitor(detector=_no_model, roi=roi or cache.meta.get('roi'))
+    for name, value in (params or {}).items():
+        if name not in TUNABLE_PARAMS:
+            raise ValueError(f"Unknown parameter: {name}")
+        setattr(monitor, name, value)
+    if monitor.roi is not None:
+        frame_shape = cache.meta.get('frame_shape')
+        if frame_shape is None:
+            if len(cache) == 0:
+                return []  # nothing was recorded (and no frame size to scale the ROI to)
+            raise ValueError("Cache has no frame_shape; cannot apply an ROI to its detections")
+        monitor.roi.prepare(frame_shape)
+
+    start = cache.meta.get('start', 0.0)
+    incidents = []
+    warning_since = None
+    for ts, detections in cache:
+        monitor.update(detections, ts)
+        if monitor.current_state != "WARNING":
+            continue
+        if warning_since is None:
+            warning_since = ts
+            if ts >= start:
+                incidents.append(ts)
+        elif ts - warning_since > cooldown:
+            monitor.set_state("IDLE")
+            warning_since = None
+    return incidents
+
+
+_loaded = {}
+
+
+def _replay_config(args):
+    """Worker: replay every cache with one parameter set."""
+    paths, params, cooldown = args
+    counts = {}
+    frames = 0
+    started = time.perf_counter()
+    for path in paths:
+        cache = _loaded.get(path)
+        if cache is None:
+            cache = _loaded[path] = DetectionCache.load(path)
+        source = cache.meta.get('source', path)
+        counts[source] = counts.get(source, 0) + len(replay(cache, params, cooldown))
+        frames += len(cache)
+    return {
+        'params': params,
+        'incidents': sum(counts.values()),
+        'per_source': counts,
+        'frames': frames,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def sweep(paths, grid, cooldown=30.0, workers=None):
+    """
+    Replay all caches for every combination of parameter values in parallel.
+
+    Args:
+        paths: Cache files
+        grid: {TUNABLE_PARAM: [values, ...]}
+        cooldown: Seconds an alert stays active before re-arming
+        workers: Worker processes (None = CPU count)
+
+    Returns:
+        list: One result dict per parameter combination
+    """
+    names = list(grid)
+    jobs = [(list(paths), dict(zip(names, values)), cooldown)
+            for values in itertools.product(*(grid[n] for n in names))]
+    if workers == 1 or len(jobs) == 1:
+        return [_replay_config(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_replay_config, jobs))
+
+
+if __name__ == '__main__':
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Replay CivicEye detection caches over a parameter grid")
+    parser.add_argument('caches', nargs='+', help="NPZ detection caches (or glob patterns)")
+    parser.add_argument('--velocity-threshold', type=float, nargs='+')
+    parser.add_argument('--velocity-frames', type=int, nargs='+')
+    parser.add_argument('--distance-threshold', type=float, nargs='+')
+    parser.add_argument('--grace-period', type=float, nargs='+')
+    parser.add_argument('--cooldown', type=float, default=30.0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    paths = []
+    for pattern in args.caches:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    grid = {name: values for name, values in (
+        ('VELOCITY_THRESHOLD', args.velocity_threshold),
+        ('VELOCITY_FRAMES', args.velocity_frames),
+        ('DISTANCE_THRESHOLD', args.distance_threshold),
+        ('GRACE_PERIOD', args.grace_period),
+    ) if values}
+
+    started = time.perf_counter()
+    results = sweep(paths, grid, args.cooldown, args.workers)
+    elapsed = time.perf_counter() - started
+
+    for result in sorted(results, key=lambda r: r['incidents']):
+        params = ' '.join(f"{k}={v}" for k, v in result['params'].items()) or 'defaults'
+        print(f"{result['incidents']:5d} incident(s)  {params}")
+    frames = sum(r['frames'] for r in results)
+    print(f"\n{len(results)} config(s), {frames} frames replayed in {elapsed:.2f}s "
+          f"({frames / elapsed if elapsed else 0:.0f} frames/s)")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,127 @@
+"""
+CivicEye AI Engine - Region of Interest Module
+Per-camera ROI polygons: inference is restricted to the bounding region of
+the polygons and litter detected outside them is discarded.
+"""
+
+import cv2
+import numpy as np
+
+
+class RegionOfInterest:
+    """
+    One or more polygons marking where litter can actually occur.
+
+    The crop handed to the detector is the bounding box of all polygons,
+    grown by `margin` pixels so people standing next to the region are still
+    detected for the distance check. Litter is kept only if its centroid lies
+    inside a polygon (one lookup in a precomputed mask per detection).
+
+    Polygons are clipped to the frame. If nothing of them is left (e.g. a
+    config written for another resolution), the ROI falls back to the full
+    frame with a warning instead of cropping an empty image.
+    """
+
+    def __init__(self, polygons, normalized=False, margin=32):
+        """
+        Args:
+            polygons: List of polygons, each a list of (x, y) points
+            normalized: Points are fractions of the frame size instead of pixels
+            margin: Pixels added around the polygons' bounding box for the crop
+        """
+        self.polygons = [np.asarray(p, dtype=np.float32).reshape(-1, 2) for p in polygons]
+        if not self.polygons or any(len(p) < 3 for p in self.polygons):
+            raise ValueError("ROI needs at least one polygon with 3 or more points")
+        self.normalized = normalized
+        self.margin = margin
+
+        # Computed for the current frame size
+        self._shape = None
+        self._points = None
+        self._mask = None
+        self.bounds = None  # (x0, y0, x1, y1) crop in frame pixels
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build an ROI from a camera config value.
+
+        Accepts a list of polygons or {"polygons": [...], "normalized": bool,
+        "margin": int}. Returns None for an empty value.
+        """
+        if not config:
+            return None
+        if isinstance(config, dict):
+            return cls(config['polygons'], normalized=config.get('normalized', False),
+                       margin=config.get('margin', 32))
+        return cls(config)
+
+    def prepare(self, shape):
+        """Rasterize the polygons and compute the crop for a frame size."""
+        h, w = shape[:2]
+        if self._shape == (h, w):
+            return
+        scale = np.array([w, h], dtype=np.float32) if self.normalized else 1.0
+        self._points = [np.round(p * scale).astype(np.int32) for p in self.polygons]
+
+        self._mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(self._mask, self._points, 1)
+
+        allpts = np.concatenate(self._points)
+        x0, y0 = allpts.min(axis=0) - self.margin
+        x1, y1 = allpts.max(axis=0) + self.margin + 1
+        x0, y0 = int(min(max(0, x0), w)), int(min(max(0, y0), h))
+        x1, y1 = int(max(min(w, x1), x0)), int(max(min(h, y1), y0))
+        if x1 <= x0 or y1 <= y0 or not self._mask.any():
+            print(f"⚠️  ROI lies outside the {w}x{h} frame; using the full frame")
+            self._mask[:] = 1
+            x0, y0, x1, y1 = 0, 0, w, h
+        self.bounds = (x0, y0, x1, y1)
+        self._shape = (h, w)
+
+    def crop(self, frame):
+        """
+        Cut the ROI bounding region out of a frame (a view, no copy).
+
+        Returns:
+            tuple: (cropped_frame, (x_offset, y_offset))
+        """
+        self.prepare(frame.shape)
+        x0, y0, x1, y1 = self.bounds
+        return frame[y0:y1, x0:x1], (x0, y0)
+
+    def contains(self, points):
+        """
+        Test which points lie inside the ROI polygons.
+
+        Args:
+            points: (N, 2) array of (x, y) frame coordinates
+
+        Returns:
+            np.ndarray: (N,) bool mask
+
+        Raises:
+            RuntimeError: If the ROI has not been prepared for a frame size yet
+        """
+        if self._mask is None:
+            raise RuntimeError("ROI is not prepared for a frame size; call prepare() or crop() first")
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        if len(points) == 0:
+            return np.zeros(0, dtype=bool)
+        h, w = self._mask.shape
+        xs = np.clip(points[:, 0].astype(np.intp), 0, w - 1)
+        ys = np.clip(points[:, 1].astype(np.intp), 0, h - 1)
+        return self._mask[ys, xs].astype(bool)
+
+    def draw(self, frame, color=(255, 0, 255)):
+        """Outline the ROI polygons on an (annotated) frame."""
+        self.prepare(frame.shape)
+        cv2.polylines(frame, self._points, True, color, 1)
+
+    @property
+    def coverage(self):
+        """Fraction of the frame area sent to the detector."""
+        if self._shape is None:
+            return 1.0
+        x0, y0, x1, y1 = self.bounds
+        return (x1 - x0) * (y1 - y0) / float(self._shape[0] * self._shape[1])
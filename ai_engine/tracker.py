@@ -0,0 +1,256 @@
+"""
+CivicEye AI Engine - Tracking Module
+Vectorized pairwise distances, one-to-one detection/track assignment and a
+centroid tracker with track lifecycle management.
+"""
+
+import math
+from array import array
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # Fall back to the pure NumPy solver below
+    linear_sum_assignment = None
+
+
+# Cost given to pairs outside the matching gate. Large enough that the solver
+# always prefers more valid matches over a cheaper total distance.
+_FORBIDDEN_COST = 1e9
+
+
+def pairwise_distances(points_a, points_b):
+    """
+    Euclidean distance between every point in A and every point in B.
+
+    Args:
+        points_a: (N, 2) array-like of (x, y)
+        points_b: (M, 2) array-like of (x, y)
+
+    Returns:
+        np.ndarray: (N, M) float32 distance matrix
+    """
+    a = np.asarray(points_a, dtype=np.float32).reshape(-1, 2)
+    b = np.asarray(points_b, dtype=np.float32).reshape(-1, 2)
+    diff = a[:, None, :] - b[None, :, :]
+    return np.sqrt(np.einsum('nmk,nmk->nm', diff, diff))
+
+
+def _hungarian(cost):
+    """
+    Minimum-cost assignment (Hungarian algorithm, shortest augmenting paths
+    with potentials), used when scipy is not installed.
+
+    O(n^2 m) for an (n, m) matrix with n <= m; the inner loop over columns is
+    vectorized, which is plenty for per-frame track/detection matrices.
+
+    Returns:
+        tuple: (row_indices, col_indices), one column per row, rows ascending
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # 1-based arrays; column 0 is the virtual start of each augmenting path
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.intp)  # row assigned to each column (0 = free)
+    way = np.zeros(m + 1, dtype=np.intp)
+    for row in range(1, n + 1):
+        owner[0] = row
+        col = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col] = True
+            r = owner[col]
+            reduced = cost[r - 1] - u[r] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = col
+            candidates = np.where(free, minv[1:], np.inf)
+            nxt = int(np.argmin(candidates)) + 1
+            delta = candidates[nxt - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            col = nxt
+            if owner[col] == 0:
+                break
+        while col:  # flip the augmenting path
+            prev = way[col]
+            owner[col] = owner[prev]
+            col = prev
+
+    cols = np.nonzero(owner[1:])[0]
+    rows = owner[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order].astype(np.intp), cols[order].astype(np.intp)
+
+
+def assign(cost, max_cost):
+    """
+    One-to-one assignment of rows to columns, ignoring pairs with cost >= max_cost.
+
+    Optimal (maximum number of matches, then minimum total cost) using scipy's
+    Hungarian solver, or the NumPy implementation above without scipy.
+
+    Returns:
+        tuple: (row_indices, col_indices) of matched pairs
+    """
+    cost = np.asarray(cost, dtype=np.float32)
+    if cost.size == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    gated = np.where(cost < max_cost, cost, _FORBIDDEN_COST)
+    solve = linear_sum_assignment if linear_sum_assignment is not None else _hungarian
+    rows, cols = solve(gated)
+    keep = cost[rows, cols] < max_cost
+    return rows[keep], cols[keep]
+
+
+class Track:
+    """
+    A tracked litter object.
+
+    Motion over the last `window` positions is kept as a ring of step lengths
+    plus a running total, so each new observation costs O(1) regardless of
+    the window size.
+    """
+
+    __slots__ = ('track_id', 'centroid', 'first_seen', 'last_seen', 'misses',
+                 'points', 'total_motion', '_steps', '_head')
+
+    def __init__(self, track_id, centroid, timestamp, window=8):
+        self.track_id = track_id
+        self.centroid = centroid
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.misses = 0           # consecutive frames without a matching detection
+        self.points = 1           # positions currently inside the motion window
+        self.total_motion = 0.0   # path length over the motion window (pixels)
+        self._steps = array('d', bytes(8 * max(1, window - 1)))
+        self._head = 0
+
+    def observe(self, centroid, timestamp):
+        """Record a new position and update the windowed path length."""
+        x0, y0 = self.centroid
+        step = math.hypot(centroid[0] - x0, centroid[1] - y0)
+
+        steps = self._steps
+        head = self._head
+        if self.points > len(steps):
+            # Window full: the oldest step falls out
+            self.total_motion -= steps[head]
+        else:
+            self.points += 1
+        steps[head] = step
+        self._head = (head + 1) % len(steps)
+        self.total_motion += step
+
+        self.centroid = centroid
+        self.last_seen = timestamp
+        self.misses = 0
+
+
+class CentroidTracker:
+    """
+    Centroid tracker with bounded lifetime.
+
+    Tracks that go unmatched for `max_misses` consecutive updates or are not
+    seen for `max_age` seconds are evicted, and at most `max_tracks` tracks are
+    kept alive (least recently seen are evicted first). Detections beyond
+    `max_tracks` in one frame are not tracked, so callers should pass the most
+    important ones first or cap them (LitterMonitor keeps the most confident).
+    """
+
+    def __init__(self, match_threshold=50, max_age=5.0, max_misses=30, max_tracks=256,
+                 history_size=8):
+        self.match_threshold = match_threshold
+        self.history_size = history_size  # positions per track motion window
+        self.max_age = max_age
+        self.max_misses = max_misses
+        self.max_tracks = max_tracks
+
+        self.tracks = {}  # id -> Track
+        self.next_id = 0
+
+        # Lifetime counters
+        self.tracks_created = 0
+        self.tracks_evicted = 0
+
+    def update(self, centroids, timestamp):
+        """
+        Match this frame's detections to live tracks one-to-one, start tracks
+        for unmatched detections and age out stale ones.
+
+        Returns:
+            list: Track for each centroid (None past the first `max_tracks`)
+        """
+        untracked = len(centroids) - self.max_tracks
+        if untracked > 0:
+            return self.update(centroids[:self.max_tracks], timestamp) + [None] * untracked
+
+        live = list(self.tracks.values())
+        matched = [None] * len(centroids)
+
+        if live and len(centroids):
+            last_centroids = np.array([t.centroid for t in live], dtype=np.float32)
+            cost = pairwise_distances(centroids, last_centroids)
+            for det, trk in zip(*assign(cost, self.match_threshold)):
+                matched[det] = live[trk]
+
+        seen = set()
+        for i, centroid in enumerate(centroids):
+            track = matched[i]
+            if track is None:
+                track = Track(self.next_id, centroid, timestamp, self.history_size)
+                self.tracks[track.track_id] = track
+                self.next_id += 1
+                self.tracks_created += 1
+                matched[i] = track
+            else:
+                track.observe(centroid, timestamp)
+            seen.add(track.track_id)
+
+        self._evict(timestamp, seen)
+        return matched
+
+    def _evict(self, timestamp, seen):
+        """Drop tracks past their miss/age limits and enforce the track cap."""
+        expired = []
+        for track_id, track in self.tracks.items():
+            if track_id in seen:
+                continue
+            track.misses += 1
+            if track.misses > self.max_misses or timestamp - track.last_seen > self.max_age:
+                expired.append(track_id)
+
+        overflow = len(self.tracks) - len(expired) - self.max_tracks
+        if overflow > 0:
+            expired_set = set(expired)
+            candidates = sorted(
+                (t for t in self.tracks.values()
+                 if t.track_id not in expired_set and t.track_id not in seen),
+                key=lambda t: t.last_seen
+            )
+            expired.extend(t.track_id for t in candidates[:overflow])
+
+        for track_id in expired:
+            del self.tracks[track_id]
+        self.tracks_evicted += len(expired)
+
+    def clear(self):
+        """Drop all tracks and restart ids (counters are kept)."""
+        self.tracks.clear()
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.tracks)
@@ -0,0 +1,263 @@
+"""
+CivicEye - Offline Batch Analysis
+Scan recorded footage for littering as fast as the CPU allows.
+
+Long files are split into time segments and all segments of all files are
+spread over a process pool. Every shard runs its own LitterMonitor on video
+PTS timestamps, so results do not depend on processing speed. Incidents go to
+<output>/incidents.json and their captured frames to <output>/captured/.
+
+    python analyze.py assets/demo_footage_1.mp4 recordings/*.mp4 -o analysis --workers 4
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def source_tag(path):
+    """
+    File stem plus a short hash of the resolved path, so inputs with the same
+    file name in different directories get distinct incident ids and caches.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(os.path.realpath(path).encode('utf-8')).hexdigest()[:8]
+    return f"{stem}-{digest}"
+
+
+def format_timecode(seconds):
+    """Format seconds as HH:MM:SS.mmm."""
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def probe_duration(path):
+    """Video duration in seconds (None if the container does not report it)."""
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        return count / fps if fps > 0 and count > 0 else None
+    finally:
+        cap.release()
+
+
+def plan_shards(paths, segment):
+    """
+    Split files into (path, start, end) time segments.
+
+    Files with unknown duration are processed as one shard (end=None).
+    """
+    shards = []
+    for path in paths:
+        duration = probe_duration(path)
+        if duration is None or segment <= 0 or duration <= segment:
+            shards.append((path, 0.0, None))
+            continue
+        start = 0.0
+        while start < duration:
+            end = start + segment
+            shards.append((path, start, end if end < duration else None))
+            start = end
+    return shards
+
+
+def analyze_shard(path, start, end, options):
+    """
+    Run detection over one time segment of a video (worker process).
+
+    The monitor starts `warmup` seconds before `start` so tracks, the grace
+    timer and the pre-event frame history are primed; incidents raised during
+    the warm-up belong to the previous shard and are dropped.
+
+    Returns:
+        dict: Shard summary with its incidents
+    """
+    import cv2
+    from ai_engine.backends import create_backend
+    from ai_engine.detector import LitterMonitor
+    from ai_engine.replay import DetectionRecorder
+
+    cv2.setNumThreads(options['threads'])
+    backend = create_backend(options['inference'], threads=options['threads'])
+    roi = options.get('roi', {}).get(os.path.basename(path))
+    monitor = LitterMonitor(detector=lambda frame: backend.predict([frame])[0], roi=roi)
+    recorder = DetectionRecorder(source=path, start=start, end=end, roi=roi) if options.get('record') else None
+
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    warm_start = max(0.0, start - options['warmup'])
+    if warm_start > 0:
+        cap.set(cv2.CAP_PROP_POS_MSEC, warm_start * 1000.0)
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    tag = source_tag(path)
+    incidents = []
+    frames = 0
+    frame_index = 0
+    warning_since = None
+    started = time.perf_counter()
+
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        pts = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if pts <= 0 and frame_index > 0:
+            pts = warm_start + frame_index / fps
+        frame_index += 1
+        if end is not None and pts >= end:
+            break
+
+        _, state = monitor.detect_frame(frame, pts)
+        frames += 1
+        if recorder is not None:
+            recorder.meta['frame_shape'] = frame.shape[:2]
+            recorder.append(pts, monitor.last_detections)
+
+        if state != "WARNING":
+            continue
+        if warning_since is None:
+            warning_since = pts
+            if pts < start:
+                continue
+            incident_id = f"INC-{tag}-{int(round(pts * 1000)):09d}"
+            photo = None
+            captured = monitor.get_captured_frame()
+            if captured is not None:
+                photo = os.path.join('captured', f"{incident_id}.jpg")
+                cv2.imwrite(os.path.join(options['output'], photo), captured)
+            bbox = monitor.detected_bottle_frame
+            incidents.append({
+                "id": incident_id,
+                "source": path,
+                "camera_id": stem,
+                "video_time": round(pts, 3),
+                "timecode": format_timecode(pts),
+                "status": "DETECTED",
+                "litter_bbox": [round(float(v), 1) for v in bbox] if bbox is not None else None,
+                "photo": photo,
+                "analyzed_at": datetime.now().isoformat()
+            })
+        elif pts - warning_since > options['cooldown']:
+            # Nobody reviews offline alerts: auto-reset like the live timeout
+            monitor.set_state("IDLE")
+            warning_since = None
+
+    cap.release()
+    if recorder is not None:
+        recorder.save(os.path.join(options['record'], f"{tag}@{int(start)}.npz"))
+    return {
+        "source": path,
+        "start": start,
+        "end": end,
+        "frames": frames,
+        "seconds": time.perf_counter() - started,
+        "incidents": incidents
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CivicEye offline analysis of recorded footage")
+    parser.add_argument('inputs', nargs='+', help="Video files or glob patterns")
+    parser.add_argument('-o', '--output', default=os.path.join(PROJECT_ROOT, 'analysis'),
+                        help="Output directory for incidents.json and captured/")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--segment', type=float, default=300.0,
+                        help="Seconds of video per shard (0 = whole files)")
+    parser.add_argument('--warmup', type=float, default=15.0,
+                        help="Seconds decoded before each shard to prime tracking")
+    parser.add_argument('--cooldown', type=float, default=30.0,
+                        help="Seconds an alert stays active before re-arming (live STATE_TIMEOUT)")
+    parser.add_argument('--config', help="cameras.json for the inference backend and per-file ROIs")
+    parser.add_argument('--model', help="Model path (overrides the config)")
+    parser.add_argument('--record', metavar='DIR',
+                        help="Also save per-shard detection caches for ai_engine.replay")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="CPU threads per worker (default: cores / workers)")
+    args = parser.parse_args()
+
+    paths = []
+    for pattern in args.inputs:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    missing = [p for p in paths if not os.path.isfile(p)]
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        return 1
+
+    inference, roi = {}, {}
+    if args.config:
+        from main import load_config
+        config = load_config(args.config)
+        inference = config.get('inference', {})
+        for camera in config.get('cameras', []):
+            if isinstance(camera.get('source'), str) and camera.get('roi'):
+                roi[os.path.basename(camera['source'])] = camera['roi']
+    if args.model:
+        inference['model'] = args.model
+
+    os.makedirs(os.path.join(args.output, 'captured'), exist_ok=True)
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+    shards = plan_shards(paths, args.segment)
+    workers = max(1, min(args.workers, len(shards)))
+    options = {
+        'output': args.output,
+        'inference': inference,
+        'roi': roi,
+        'warmup': args.warmup,
+        'cooldown': args.cooldown,
+        'record': args.record,
+        'threads': args.threads or max(1, (os.cpu_count() or 1) // workers)
+    }
+
+    print(f"🎞️  {len(paths)} file(s), {len(shards)} shard(s), {workers} worker(s)")
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(analyze_shard, path, start, end, options): (path, start)
+                   for path, start, end in shards}
+        for future in as_completed(futures):
+            path, start = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"⚠️  {os.path.basename(path)} @ {format_timecode(start)} failed: {e}")
+                continue
+            results.append(result)
+            rate = result['frames'] / result['seconds'] if result['seconds'] else 0.0
+            print(f"   ✅ {os.path.basename(path)} @ {format_timecode(start)}: "
+                  f"{result['frames']} frames, {rate:.1f} FPS, {len(result['incidents'])} incident(s)")
+    elapsed = time.perf_counter() - started
+
+    incidents = sorted((i for r in results for i in r['incidents']),
+                       key=lambda i: (i['source'], i['video_time']))
+    with open(os.path.join(args.output, 'incidents.json'), 'w') as f:
+        json.dump(incidents, f, indent=2)
+
+    frames = sum(r['frames'] for r in results)
+    print(f"\n📊 {frames} frames in {elapsed:.1f}s ({frames / elapsed if elapsed else 0:.1f} FPS), "
+          f"{len(incidents)} incident(s)")
+    print(f"📁 Results: {os.path.join(args.output, 'incidents.json')}")
+    return 0 if len(results) == len(shards) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
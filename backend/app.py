@@ -3,20 +3,31 @@ CivicEye Backend - Flask Application
 Main server handling video streaming, status updates, and admin actions.
 """
 
+import hashlib
 import os
 import sys
-import json
 import time
 import threading
 from datetime import datetime
-from flask import Flask, Response, jsonify, request, send_from_directory
+from flask import Flask, Response, abort, jsonify, request, send_file, send_from_directory
+from werkzeug.security import safe_join
 from flask_cors import CORS
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ai_engine.detector import LitterMonitor
+from ai_engine.backends import create_backend
+from ai_engine.batching import BatchInferer
 from ai_engine.face_recog import FaceMatcher
+from backend import metrics
+from backend.cameras import Camera
+from backend.clips import ClipExporter
+from backend.events import EVENTS
+from backend.evidence import EvidenceJob, EvidenceWriter, ensure_thumbnail
+from backend.incidents import IncidentStore
+from backend.storage import EvidenceStorage, RetentionPolicy
+from backend.stream import FramePipeline
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend access
@@ -25,12 +36,8 @@ CORS(app)  # Enable CORS for frontend access
 # GLOBAL STATE
 # =============================================================================
 
-SYSTEM_STATE = "IDLE"  # IDLE, WARNING, PENDING_REVIEW, SHAMING
-STATE_TIMESTAMP = time.time()
+# Per-camera state (IDLE, WARNING, PENDING_REVIEW, SHAMING) lives on each Camera
 STATE_TIMEOUT = 30.0  # Auto-reset after 30 seconds
-CURRENT_OFFENDER = None
-FRAME_LOCK = threading.Lock()
-CURRENT_FRAME = None
 
 # Public Display Control
 DISPLAY_ENABLED = True
@@ -44,173 +51,403 @@ CUSTOM_MESSAGES = {
 SURVEILLANCE_ACTIVE = True
 
 # Initialize AI components
-litter_monitor = None
+batcher = None  # Shared batched YOLO inference for all cameras
+BATCH_SIZE = 8
+BATCH_MAX_WAIT = 0.01  # seconds a frame waits for its batch to fill
 face_matcher = FaceMatcher()
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_DIR = os.path.join(BASE_DIR, 'database')
-INCIDENT_LOG_PATH = os.path.join(DATABASE_DIR, 'incident_log.json')
-
-# Video source (will be set by main.py)
-video_source = None
+INCIDENT_LOG_PATH = os.path.join(DATABASE_DIR, 'incident_log.json')  # legacy, imported once
+INCIDENT_DB_PATH = os.path.join(DATABASE_DIR, 'incidents.db')
+LOG_PAGE_SIZE = 100  # default /get_logs page
+LOG_PAGE_MAX = 1000
+CAPTURED_DIR = os.path.join(DATABASE_DIR, 'captured')
+CLIPS_DIR = os.path.join(DATABASE_DIR, 'clips')
+
+# Incident store (SQLite, WAL); the old JSON log is migrated on first start
+incident_store = IncidentStore(INCIDENT_DB_PATH)
+_migrated = incident_store.migrate_json(INCIDENT_LOG_PATH)
+if _migrated:
+    print(f"📦 Migrated {_migrated} incidents from {INCIDENT_LOG_PATH}")
+
+# Evidence images are encoded and written off the frame loop
+EVIDENCE_QUEUE_SIZE = 16
+EVIDENCE_JPEG_QUALITY = 95
+THUMBNAIL_WIDTHS = (160, 320, 640)  # served as /database/captured/<file>?w=<px>
+CAPTURED_MAX_AGE = 86400  # seconds browsers may reuse evidence images without revalidating
+evidence_writer = EvidenceWriter(max_queue=EVIDENCE_QUEUE_SIZE, jpeg_quality=EVIDENCE_JPEG_QUALITY,
+                                 thumbnail_widths=THUMBNAIL_WIDTHS).start()
+
+# Evidence files: date-sharded paths, incident index and retention sweeper
+evidence_storage = EvidenceStorage(DATABASE_DIR, INCIDENT_DB_PATH, incident_store)
+_adopted = evidence_storage.adopt()
+if _adopted:
+    print(f"📦 Indexed {_adopted} existing evidence files")
+
+# Violation clips: 8 s before to 3 s after each WARNING, at most 2 in flight
+clip_exporter = ClipExporter(DATABASE_DIR, pre=8.0, post=3.0, max_pending=2).start()
+
+# Cameras (sources are set by main.py); the first one is the default
+CAMERAS = {}
+DEFAULT_CAMERA_ID = 'cam0'
+CAMERAS_LOCK = threading.RLock()
+PIPELINE_RESTART_DELAY = 2.0  # seconds before a source that ended is reopened
+MONITOR_ALL = False  # keep every camera's pipeline running (set by start_cameras)
+
+# Server-Sent Events
+SSE_HEARTBEAT = 15.0  # seconds between keep-alive comments
+SSE_RETRY_MS = 3000   # client reconnect delay
+_state_timer = None   # background thread expiring alerts for event subscribers
+
+
+def _create_monitor(camera):
+    """Create a per-camera LitterMonitor sharing the batched detector."""
+    return LitterMonitor(detector=batcher, roi=camera.roi) if batcher else None
+
+
+def _count_batch(frames):
+    metrics.INFERENCE_BATCHES.labels().inc()
+    metrics.INFERENCE_BATCH_FRAMES.labels().inc(frames)
+
+
+def init_detector(model_path='yolov8n.pt', batch_size=BATCH_SIZE, max_wait=BATCH_MAX_WAIT,
+                  backend_config=None):
+    """
+    Initialize the shared detector and a litter monitor for every camera.
+    
+    Args:
+        model_path: Default model when `backend_config` has no "model"
+        batch_size: Maximum frames per batched model call
+        max_wait: Maximum seconds a frame waits for its batch to fill
+        backend_config: Inference backend config (see ai_engine.backends.create_backend)
+    """
+    global batcher
+    backend = create_backend({'model': model_path, **(backend_config or {})})
+    print(f"   Inference backend: {backend.name} ({backend.model_path}, imgsz={backend.imgsz})")
+    with CAMERAS_LOCK:
+        if batcher is not None:
+            batcher.stop()
+        batcher = BatchInferer(backend.predict, batch_size=batch_size,
+                               max_wait=max_wait, expected_streams=max(1, len(CAMERAS)),
+                               on_batch=_count_batch)
+        for camera in CAMERAS.values():
+            camera.monitor = _create_monitor(camera)
+
+
+def add_camera(cam_id, source=None, name=None, location=None, roi=None):
+    """Register a camera (replacing any camera with the same id)."""
+    with CAMERAS_LOCK:
+        if cam_id in CAMERAS:
+            CAMERAS[cam_id].stop()
+        camera = Camera(cam_id, source, name=name, location=location, roi=roi)
+        camera.on_state_change = publish_state
+        camera.monitor = _create_monitor(camera)
+        CAMERAS[cam_id] = camera
+        if batcher is not None:
+            batcher.expected_streams = len(CAMERAS)
+        return camera
+
+
+def configure_cameras(cameras):
+    """
+    Replace all cameras with the given configuration; the first is the default.
+    
+    Args:
+        cameras: List of dicts with "id", "source" and optional "name"/"location"/"roi"
+    """
+    global DEFAULT_CAMERA_ID
+    with CAMERAS_LOCK:
+        for camera in CAMERAS.values():
+            camera.stop()
+        CAMERAS.clear()
+        for index, entry in enumerate(cameras):
+            add_camera(entry.get('id', f'cam{index}'), entry.get('source'),
+                       name=entry.get('name'), location=entry.get('location'),
+                       roi=entry.get('roi'))
+        if CAMERAS:
+            DEFAULT_CAMERA_ID = next(iter(CAMERAS))
+
+
+def configure_storage(storage=None):
+    """
+    Apply the evidence retention policy and start the background sweeper.
+    
+    Args:
+        storage: "storage" section of cameras.json (see backend.storage.RetentionPolicy)
+    """
+    evidence_storage.policy = RetentionPolicy.from_config(storage)
+    evidence_storage.start_sweeper()
 
 
-def init_detector(model_path='yolov8n.pt'):
-    """Initialize the litter detector."""
-    global litter_monitor
-    litter_monitor = LitterMonitor(model_path)
+def get_camera(cam_id=None):
+    """Look up a camera by id (None = default camera)."""
+    with CAMERAS_LOCK:
+        if cam_id is None:
+            cam_id = DEFAULT_CAMERA_ID if DEFAULT_CAMERA_ID in CAMERAS else next(iter(CAMERAS), None)
+        return CAMERAS.get(cam_id)
 
 
-def set_video_source(source):
-    """Set the video source (camera index or file path)."""
-    global video_source
-    video_source = source
+def set_video_source(source, cam_id=DEFAULT_CAMERA_ID):
+    """Set the video source (camera index or file path) of a camera."""
+    with CAMERAS_LOCK:
+        camera = CAMERAS.get(cam_id)
+        if camera is None:
+            add_camera(cam_id, source)
+            return
+        camera.source = source
+        # Restart the camera's pipeline on the new source
+        camera.stop()
 
 
 # =============================================================================
 # STATE MANAGEMENT
 # =============================================================================
 
-def set_state(new_state, offender=None):
-    """Set the system state with timestamp tracking."""
-    global SYSTEM_STATE, STATE_TIMESTAMP, CURRENT_OFFENDER
-    SYSTEM_STATE = new_state
-    STATE_TIMESTAMP = time.time()
-    if offender is not None:
-        CURRENT_OFFENDER = offender
-    if litter_monitor:
-        litter_monitor.set_state(new_state)
+def camera_status(camera):
+    """State machine fields of one camera as served by /status and /events."""
+    return {
+        "camera_id": camera.cam_id,
+        "state": camera.state,
+        "timestamp": camera.state_timestamp,
+        "offender_details": camera.offender,
+        "timeout_remaining": camera.timeout_remaining(STATE_TIMEOUT)
+    }
+
+
+def display_config():
+    """Display/surveillance settings shared by all cameras."""
+    return {
+        "display_enabled": DISPLAY_ENABLED,
+        "custom_messages": dict(CUSTOM_MESSAGES),
+        "surveillance_active": SURVEILLANCE_ACTIVE
+    }
+
+
+def publish_state(camera):
+    """Push a camera's new state to event stream subscribers."""
+    EVENTS.publish("state", camera_status(camera), camera.cam_id)
+
 
+def publish_config():
+    """Push changed display/surveillance settings to event stream subscribers."""
+    EVENTS.publish("config", display_config())
 
-def check_state_timeout():
-    """Check if current state has timed out and reset if needed."""
-    global SYSTEM_STATE
-    if SYSTEM_STATE in ["WARNING", "PENDING_REVIEW"]:
-        if time.time() - STATE_TIMESTAMP > STATE_TIMEOUT:
-            set_state("IDLE")
-            return True
-    return False
+
+# Default camera (video source set later by main.py)
+add_camera(DEFAULT_CAMERA_ID)
+
+
+def set_state(new_state, offender=None, cam_id=None):
+    """Set a camera's state with timestamp tracking."""
+    camera = get_camera(cam_id)
+    if camera:
+        camera.set_state(new_state, offender)
+
+
+def check_state_timeout(cam_id=None):
+    """Check if a camera's state has timed out and reset if needed."""
+    camera = get_camera(cam_id)
+    return camera.check_state_timeout(STATE_TIMEOUT) if camera else False
 
 
 def load_incident_log():
-    """Load incident log from JSON file."""
-    try:
-        with open(INCIDENT_LOG_PATH, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+    """Load the full incident log, oldest first."""
+    return incident_store.all()
 
 
 def save_incident(incident):
-    """Save an incident to the log."""
-    incidents = load_incident_log()
-    incidents.append(incident)
-    with open(INCIDENT_LOG_PATH, 'w') as f:
-        json.dump(incidents, f, indent=2)
+    """Append an incident to the log and return it as stored (id made unique)."""
+    incident = incident_store.add(incident)
+    files = (incident.get('offender') or {}).get('files')
+    if files:
+        evidence_storage.link(incident['id'], files)
+    metrics.INCIDENTS.labels(incident.get('camera_id', ''), incident.get('status', '')).inc()
+    EVENTS.publish("incident", incident, incident.get('camera_id'))
+    return incident
 
 
 # =============================================================================
 # VIDEO STREAMING
 # =============================================================================
 
-def generate_frames():
-    """Generate video frames for streaming."""
-    global CURRENT_FRAME, SYSTEM_STATE
+def _identify(frame):
+    """
+    Known-offender face matches for a captured frame, as offender record fields.
     
-    import cv2
-    
-    # Try to open video source
-    cap = None
-    if video_source is not None:
-        cap = cv2.VideoCapture(video_source)
-    else:
-        # Try webcam
-        cap = cv2.VideoCapture(0)
+    Matches go under "match" (best) and "matches"; the record's own "id" stays
+    the evidence id it was published with.
+    """
+    matches = face_matcher.match(frame, k=3)
+    if not matches:
+        return {}
+    return {"match": matches[0], "matches": matches}
+
+
+def _evidence_saved(camera, relpath, kind, changes, quality=None, identify=False):
+    """
+    Handoff run by a background writer once a violator photo/clip is on disk.
     
-    if not cap or not cap.isOpened():
-        # Generate placeholder frame
-        while True:
-            frame = create_placeholder_frame("NO VIDEO SOURCE")
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            time.sleep(0.1)
+    `changes` (e.g. the file's URL) are applied to the offender record only
+    now, so dashboards never request a file that does not exist yet. Records
+    already published are never modified in place: the camera gets an updated
+    copy, and an incident confirmed meanwhile is rewritten in the log.
+    With `identify`, face matching also runs here (on the writer thread, off
+    the frame loop) against the photo job's frame.
+    """
+    def on_saved(job=None, *_):
+        evidence_storage.register(relpath, kind, camera.cam_id, quality=quality)
+        update = dict(changes)
+        if identify and job is not None:
+            update.update(_identify(job.frame))
+        with camera.lock:
+            current = camera.offender
+            if current is not None and relpath in current.get('files', ()):
+                camera.offender = {**current, **update}
+                publish_state(camera)  # dashboards can load it now
+        incident_id = evidence_storage.incident_of(relpath)
+        if incident_id is not None:
+            incident_store.update(incident_id, lambda incident: {
+                **incident, "offender": {**(incident.get("offender") or {}), **update}
+            })
+    return on_saved
+
+
+def process_frame(camera, frame):
+    """Run surveillance logic on one decoded frame and return the frame to stream."""
+    import cv2
+
+    camera.metric_decoded.inc()
     
-    while True:
-        ret, frame = cap.read()
-        
-        # Loop video if end reached
-        if not ret or frame is None:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            ret, frame = cap.read()
-            if not ret:
-                continue
+    # Check if surveillance is active
+    if SURVEILLANCE_ACTIVE:
+        # Check for state timeout
+        camera.check_state_timeout(STATE_TIMEOUT)
         
-        # Check if surveillance is active
-        if SURVEILLANCE_ACTIVE:
-            # Check for state timeout
-            check_state_timeout()
+        # Process frame with AI detector
+        litter_monitor = camera.monitor
+        if litter_monitor:
+            annotated_frame, detected_state = litter_monitor.detect_frame(frame)
+            camera.record_detection(litter_monitor)
+            clip_exporter.feed(camera.cam_id, litter_monitor.frame_buffer)
             
-            # Process frame with AI detector
-            if litter_monitor:
-                annotated_frame, detected_state = litter_monitor.detect_frame(frame)
-                
-                # Update state based on detection
-                if detected_state == "WARNING" and SYSTEM_STATE == "IDLE":
-                    # Save the captured violator frame
-                    from datetime import datetime
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    captured_filename = f"violator_{timestamp}.jpg"
-                    captured_path = os.path.join(DATABASE_DIR, 'captured', captured_filename)
-                    
-                    # Create captured directory if it doesn't exist
-                    os.makedirs(os.path.join(DATABASE_DIR, 'captured'), exist_ok=True)
+            # Update state based on detection (under the camera lock, so evidence
+            # handoffs only run once the offender record is published)
+            with camera.lock:
+                if detected_state == "WARNING" and camera.state == "IDLE":
+                    now = datetime.now()
+                    evidence_id, relpath = evidence_storage.allocate('photo', camera.cam_id,
+                                                                     'violator', '.jpg', now)
+                    offender = {
+                        "id": f"VIO-{evidence_id}",
+                        "name": "Unidentified Violator",
+                        "camera_id": camera.cam_id,
+                        "evidence": "missing",
+                        "files": []
+                    }
+                    captured_frame = litter_monitor.get_captured_frame()
+                    if captured_frame is not None:
+                        # Queue the violator frame; the evidence writer encodes and stores it
+                        # (photo_url is added once the file exists). Under back-pressure the
+                        # photo is dropped, but the violation is still reported as unidentified.
+                        saved = {"evidence": "saved",
+                                 "photo_url": f"http://localhost:5000/database/{relpath}"}
+                        job = EvidenceJob(captured_frame, evidence_storage.abspath(relpath), camera.cam_id,
+                                          on_saved=_evidence_saved(camera, relpath, 'photo', saved,
+                                                                   EVIDENCE_JPEG_QUALITY,
+                                                                   identify=face_matcher.ready))
+                        if evidence_writer.submit(job):
+                            offender["evidence"] = "pending"
+                            offender["files"].append(relpath)
+                        else:
+                            offender["evidence"] = "dropped"
                     
-                    # Save the frame
-                    if litter_monitor.save_captured_frame(captured_path):
-                        # Create offender data with real captured image
-                        offender = {
-                            "id": f"VIO-{timestamp}",
-                            "name": "Unidentified Violator",
-                            "photo_url": f"http://localhost:5000/database/captured/{captured_filename}"
-                        }
-                    else:
-                        # Fallback to mock data if capture failed
-                        offender = face_matcher.match_face()
+                    # Clip of the drop itself, finished once the post-roll has played out
+                    _, clip_base = evidence_storage.allocate('clip', camera.cam_id, 'violation', '', now)
+                    clip_relpath = clip_base + clip_exporter.extension
+                    saved = {"clip": "saved",
+                             "clip_url": f"http://localhost:5000/database/{clip_relpath}"}
+                    if clip_exporter.trigger(
+                        camera.cam_id, litter_monitor.frame_buffer, clip_base,
+                        on_saved=_evidence_saved(camera, clip_relpath, 'clip', saved)
+                    ):
+                        offender["clip"] = "pending"
+                        offender["files"].append(clip_relpath)
                     
-                    set_state("WARNING", offender)
-                
-                frame = annotated_frame if annotated_frame is not None else frame
-        else:
-            # Surveillance paused - show overlay
-            import cv2
-            import numpy as np
-            overlay = frame.copy()
-            cv2.rectangle(overlay, (0, 0), (frame.shape[1], frame.shape[0]), (0, 0, 0), -1)
-            frame = cv2.addWeighted(overlay, 0.5, frame, 0.5, 0)
+                    camera.set_state("WARNING", offender)
             
-            # Add "PAUSED" text
-            text = "SURVEILLANCE PAUSED"
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            text_size = cv2.getTextSize(text, font, 2, 3)[0]
-            text_x = (frame.shape[1] - text_size[0]) // 2
-            text_y = (frame.shape[0] + text_size[1]) // 2
-            cv2.putText(frame, text, (text_x, text_y), font, 2, (0, 165, 255), 3)
-        
-        with FRAME_LOCK:
-            CURRENT_FRAME = frame.copy()
-        
-        # Encode and yield frame
-        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        frame_bytes = buffer.tobytes()
-        
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            frame = annotated_frame if annotated_frame is not None else frame
+    else:
+        # Surveillance paused - show overlay
+        overlay = frame.copy()
+        cv2.rectangle(overlay, (0, 0), (frame.shape[1], frame.shape[0]), (0, 0, 0), -1)
+        frame = cv2.addWeighted(overlay, 0.5, frame, 0.5, 0)
         
-        # Control frame rate
-        time.sleep(0.033)  # ~30 FPS
+        # Add "PAUSED" text
+        text = "SURVEILLANCE PAUSED"
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        text_size = cv2.getTextSize(text, font, 2, 3)[0]
+        text_x = (frame.shape[1] - text_size[0]) // 2
+        text_y = (frame.shape[0] + text_size[1]) // 2
+        cv2.putText(frame, text, (text_x, text_y), font, 2, (0, 165, 255), 3)
+    
+    return frame
+
+
+def get_pipeline(camera):
+    """
+    Return a camera's frame pipeline, starting it on first use.
+    
+    A pipeline whose source ended (camera unplugged, stream dropped) is
+    reopened, and one whose source did not open keeps retrying it, at most
+    once every PIPELINE_RESTART_DELAY seconds.
+    """
+    with camera.lock:
+        pipeline = camera.pipeline
+        if pipeline is not None and not pipeline.running and pipeline.ended is not None \
+                and time.monotonic() - pipeline.ended < PIPELINE_RESTART_DELAY:
+            return pipeline
+        if pipeline is None or not pipeline.running:
+            camera.pipeline = FramePipeline(
+                camera.source,
+                lambda frame: process_frame(camera, frame),
+                placeholder_frame=lambda: create_placeholder_frame("NO VIDEO SOURCE"),
+                on_encode=camera.metric_jpeg.observe,
+                reopen_interval=PIPELINE_RESTART_DELAY
+            )
+            camera.pipeline.start()
+        return camera.pipeline
+
+
+def generate_frames(camera):
+    """Stream a camera pipeline's cached JPEG frames to one viewer."""
+    source = get_pipeline(camera)
+    last_seq = 0
+    with camera.lock:
+        camera.viewers += 1
+    
+    try:
+        while True:
+            # Follow the pipeline across video source changes
+            if not source.running:
+                source = get_pipeline(camera)
+                last_seq = 0
+                if not source.running:
+                    time.sleep(0.5)  # waiting to reopen the source
+                    continue
+            
+            seq, frame_bytes = source.wait_for_jpeg(last_seq)
+            if frame_bytes is None:
+                continue
+            last_seq = seq
+            
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+    finally:
+        # Client disconnected
+        with camera.lock:
+            camera.viewers -= 1
 
 
 def create_placeholder_frame(message="CivicEye"):
@@ -237,6 +474,14 @@ def create_placeholder_frame(message="CivicEye"):
 # API ROUTES
 # =============================================================================
 
+def camera_not_found(cam_id):
+    """Standard 404 response for an unknown camera id."""
+    return jsonify({
+        "success": False,
+        "message": f"Unknown camera: {cam_id}"
+    }), 404
+
+
 @app.route('/')
 def index():
     """Root endpoint."""
@@ -246,65 +491,225 @@ def index():
         "status": "running",
         "endpoints": [
             "/video_feed",
+            "/video_feed/<cam_id>",
+            "/snapshot",
+            "/snapshot/<cam_id>",
             "/status",
+            "/status/<cam_id>",
+            "/events",
+            "/events/<cam_id>",
+            "/cameras",
             "/admin/action",
-            "/get_logs"
+            "/get_logs",
+            "/metrics"
         ]
     })
 
 
+@app.route('/cameras')
+def list_cameras():
+    """List configured cameras."""
+    with CAMERAS_LOCK:
+        cameras = [camera.to_dict() for camera in CAMERAS.values()]
+    return jsonify({
+        "count": len(cameras),
+        "default": DEFAULT_CAMERA_ID,
+        "cameras": cameras
+    })
+
+
 @app.route('/video_feed')
-def video_feed():
+@app.route('/video_feed/<cam_id>')
+def video_feed(cam_id=None):
     """Video streaming endpoint."""
+    camera = get_camera(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
     return Response(
-        generate_frames(),
+        generate_frames(camera),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
 
+@app.route('/snapshot')
+@app.route('/snapshot/<cam_id>')
+def snapshot(cam_id=None):
+    """Return the latest annotated frame as a single JPEG."""
+    camera = get_camera(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
+    
+    seq, frame_bytes = get_pipeline(camera).latest_jpeg()
+    if frame_bytes is None:
+        return jsonify({
+            "success": False,
+            "message": "No frame available yet"
+        }), 503
+    
+    response = Response(frame_bytes, mimetype='image/jpeg')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Frame-Sequence'] = str(seq)
+    return response
+
+
 @app.route('/status')
-def get_status():
-    """Get current system status."""
-    check_state_timeout()  # Check for timeout on each status request
+@app.route('/status/<cam_id>')
+def get_status(cam_id=None):
+    """Get current system status for one camera (default camera if omitted)."""
+    camera = get_camera(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
+    camera.check_state_timeout(STATE_TIMEOUT)  # Check for timeout on each status request
     
-    return jsonify({
-        "state": SYSTEM_STATE,
-        "timestamp": STATE_TIMESTAMP,
-        "offender_details": CURRENT_OFFENDER,
-        "timeout_remaining": max(0, STATE_TIMEOUT - (time.time() - STATE_TIMESTAMP)) 
-                            if SYSTEM_STATE in ["WARNING", "PENDING_REVIEW"] else None,
-        "display_enabled": DISPLAY_ENABLED,
-        "custom_messages": CUSTOM_MESSAGES,
-        "surveillance_active": SURVEILLANCE_ACTIVE
-    })
+    return jsonify({**camera_status(camera), **display_config()})
+
+
+def _run_state_timer():
+    """
+    Expire timed-out alerts so subscribers are told even when nobody polls.
+    
+    With MONITOR_ALL it also keeps every camera's pipeline running (reopening
+    dropped sources, starting cameras added later), viewers or not.
+    """
+    while True:
+        time.sleep(0.5)
+        with CAMERAS_LOCK:
+            cameras = list(CAMERAS.values())
+        for camera in cameras:
+            camera.check_state_timeout(STATE_TIMEOUT)
+            if MONITOR_ALL:
+                get_pipeline(camera)
+
+
+def _start_state_timer():
+    global _state_timer
+    with CAMERAS_LOCK:
+        if _state_timer is None:
+            _state_timer = threading.Thread(target=_run_state_timer,
+                                            name='civiceye-state-timer', daemon=True)
+            _state_timer.start()
+
+
+def start_cameras():
+    """Start monitoring every configured camera, whether or not anyone is watching it."""
+    global MONITOR_ALL
+    MONITOR_ALL = True
+    with CAMERAS_LOCK:
+        cameras = list(CAMERAS.values())
+    for camera in cameras:
+        get_pipeline(camera)
+    _start_state_timer()
+
+
+@app.route('/events')
+@app.route('/events/<cam_id>')
+def event_stream(cam_id=None):
+    """
+    Server-Sent Events stream of state changes for one camera.
+    
+    Events: "snapshot" (full /status payload on connect or resync), "state",
+    "config" and "incident". Reconnecting clients resume from Last-Event-ID
+    (header, or `last_event_id` query parameter); comment heartbeats keep
+    idle connections open.
+    """
+    camera = get_camera(cam_id)
+    if camera is None:
+        return camera_not_found(cam_id)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    resume_after = EVENTS.resolve(last_event_id)
+    _start_state_timer()
+    
+    def snapshot():
+        camera.check_state_timeout(STATE_TIMEOUT)
+        return EVENTS.snapshot("snapshot", lambda: {**camera_status(camera), **display_config()},
+                               camera.cam_id)
+    
+    def stream(after):
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        if after is None:
+            event = snapshot()
+            after = event.seq
+            yield event.to_sse()
+        
+        while True:
+            events = EVENTS.wait(after, SSE_HEARTBEAT)
+            if not events:
+                yield ": heartbeat\n\n"
+                continue
+            if events[0].seq > after + 1:
+                # Fell behind the event ring: resynchronize
+                event = snapshot()
+                after = event.seq
+                yield event.to_sse()
+                continue
+            for event in events:
+                after = event.seq
+                if event.camera_id is None or event.camera_id == camera.cam_id:
+                    yield event.to_sse()
+    
+    response = Response(stream(resume_after), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics (text exposition format)."""
+    # Gauges are sampled here so the frame loops never pay for them; the values
+    # go into a snapshot for this response only (no shared series are touched)
+    live_tracks, buffer_bytes, viewers, states = {}, {}, {}, {}
+    with CAMERAS_LOCK:
+        cameras = list(CAMERAS.values())
+    for camera in cameras:
+        cam_id = camera.cam_id
+        viewers[(cam_id,)] = camera.viewers
+        for state in ("IDLE", "WARNING", "PENDING_REVIEW", "SHAMING"):
+            states[(cam_id, state)] = 1 if camera.state == state else 0
+        monitor = camera.monitor
+        if monitor is not None:
+            live_tracks[(cam_id,)] = len(monitor.tracker)
+            buffer_bytes[(cam_id,)] = monitor.frame_buffer.nbytes
+    snapshot = {
+        metrics.LIVE_TRACKS: live_tracks,
+        metrics.FRAME_BUFFER_BYTES: buffer_bytes,
+        metrics.STREAM_VIEWERS: viewers,
+        metrics.CAMERA_STATE: states,
+        metrics.EVIDENCE_QUEUE_DEPTH: {(): evidence_writer.pending},
+        metrics.CLIPS_PENDING: {(): clip_exporter.pending},
+    }
+    
+    return Response(metrics.REGISTRY.expose(snapshot), mimetype=metrics.CONTENT_TYPE)
 
 
 @app.route('/admin/action', methods=['POST'])
 def admin_action():
     """Handle admin actions (CONFIRM or IGNORE)."""
-    global SYSTEM_STATE, CURRENT_OFFENDER
-    
     data = request.get_json()
     action = data.get('action', '').upper()
+    camera = get_camera(data.get('camera_id'))
+    if camera is None:
+        return camera_not_found(data.get('camera_id'))
     
     if action == 'CONFIRM':
         # Set to SHAMING state
-        set_state("SHAMING")
+        camera.set_state("SHAMING")
         
         # Log the incident
         incident = {
             "id": f"INC-{int(time.time())}",
             "timestamp": datetime.now().isoformat(),
-            "offender": CURRENT_OFFENDER,
+            "camera_id": camera.cam_id,
+            "offender": camera.offender,
             "status": "CONFIRMED",
             "action_by": data.get('admin_id', 'ADMIN-001')
         }
-        save_incident(incident)
+        incident = save_incident(incident)
         
         # Schedule auto-reset after 10 seconds of shaming
         def reset_after_shaming():
             time.sleep(10)
-            set_state("IDLE")
+            camera.set_state("IDLE")
         threading.Thread(target=reset_after_shaming, daemon=True).start()
         
         return jsonify({
@@ -315,8 +720,8 @@ def admin_action():
     
     elif action == 'IGNORE':
         # Reset to IDLE
-        set_state("IDLE")
-        CURRENT_OFFENDER = None
+        camera.set_state("IDLE")
+        camera.offender = None
         
         return jsonify({
             "success": True,
@@ -330,14 +735,82 @@ def admin_action():
         }), 400
 
 
+def _parse_log_time(value):
+    """Normalize a time-range query value to the log's local ISO format."""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.isoformat()
+
+
 @app.route('/get_logs')
 def get_logs():
-    """Get incident log history."""
-    incidents = load_incident_log()
-    return jsonify({
+    """
+    Get incident log history.
+
+    Query parameters (all optional):
+        since: Incident id; only incidents logged after it are returned (oldest first)
+        start / end: ISO time range (end exclusive)
+        status, camera: Exact-match filters
+        limit, offset: Page size (default LOG_PAGE_SIZE, max LOG_PAGE_MAX) and start
+        order: "desc" (default, newest first) or "asc"
+
+    Responses carry an ETag; a matching If-None-Match returns 304 without
+    querying the log. `cursor` is the id to pass as `since` next time.
+    """
+    args = request.args
+    etag = hashlib.sha1(
+        f"{incident_store.revision()}|{sorted(args.items(multi=True))}".encode()
+    ).hexdigest()[:20]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    since = args.get('since')
+    after_seq = 0
+    if since:
+        after_seq = incident_store.seq_of(since)
+        if after_seq is None:
+            return jsonify({
+                "success": False,
+                "message": f"Unknown incident: {since}"
+            }), 404
+
+    try:
+        start = _parse_log_time(args.get('start'))
+        end = _parse_log_time(args.get('end'))
+        limit = min(max(args.get('limit', LOG_PAGE_SIZE, type=int), 0), LOG_PAGE_MAX)
+        offset = max(args.get('offset', 0, type=int), 0)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": f"Invalid query: {e}"}), 400
+    # Incremental fetches are always oldest first so the cursor only moves forward
+    newest_first = not since and args.get('order', 'desc').lower() != 'asc'
+
+    incidents, total = incident_store.query(
+        after_seq=after_seq, start=start, end=end,
+        status=args.get('status'), camera_id=args.get('camera'),
+        limit=limit, offset=offset, newest_first=newest_first
+    )
+    if incidents:
+        cursor = incidents[0 if newest_first else -1]["id"]
+    else:
+        cursor = since
+
+    response = jsonify({
         "count": len(incidents),
+        "total": total,
+        "offset": offset,
+        "has_more": offset + len(incidents) < total,
+        "cursor": cursor,
         "incidents": incidents
     })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/assets/<path:filename>')
@@ -349,9 +822,29 @@ def serve_assets(filename):
 
 @app.route('/database/captured/<path:filename>')
 def serve_captured_images(filename):
-    """Serve captured violator images."""
-    captured_dir = os.path.join(DATABASE_DIR, 'captured')
-    return send_from_directory(captured_dir, filename)
+    """
+    Serve captured violator images.
+
+    `?w=<pixels>` serves the smallest thumbnail at least that wide (created on
+    first request for older images). Responses carry an ETag and are cacheable
+    for CAPTURED_MAX_AGE; revalidation returns 304 Not Modified.
+    """
+    width = request.args.get('w', type=int)
+    size = next((w for w in THUMBNAIL_WIDTHS if width and w >= width), None)
+    if size is not None:
+        path = safe_join(CAPTURED_DIR, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        thumb = ensure_thumbnail(path, size)
+        if thumb is not None:
+            return send_file(thumb, mimetype='image/jpeg', max_age=CAPTURED_MAX_AGE)
+    return send_from_directory(CAPTURED_DIR, filename, max_age=CAPTURED_MAX_AGE)
+
+
+@app.route('/database/clips/<path:filename>')
+def serve_clips(filename):
+    """Serve exported violation clips."""
+    return send_from_directory(CLIPS_DIR, filename, conditional=True)
 
 
 @app.route('/display/toggle', methods=['POST'])
@@ -360,6 +853,7 @@ def toggle_display():
     global DISPLAY_ENABLED
     data = request.get_json()
     DISPLAY_ENABLED = data.get('enabled', True)
+    publish_config()
     return jsonify({
         "success": True,
         "display_enabled": DISPLAY_ENABLED
@@ -378,6 +872,7 @@ def update_messages():
         CUSTOM_MESSAGES['shaming'] = data['shaming']
     if 'fine' in data:
         CUSTOM_MESSAGES['fine'] = data['fine']
+    publish_config()
     
     return jsonify({
         "success": True,
@@ -392,9 +887,12 @@ def toggle_surveillance():
     data = request.get_json()
     SURVEILLANCE_ACTIVE = data.get('active', True)
     
-    # If resuming, reset to IDLE state
+    # If resuming, reset every camera to IDLE state
     if SURVEILLANCE_ACTIVE:
-        set_state("IDLE")
+        with CAMERAS_LOCK:
+            for camera in CAMERAS.values():
+                camera.set_state("IDLE")
+    publish_config()
     
     return jsonify({
         "success": True,
@@ -409,8 +907,12 @@ def toggle_surveillance():
 @app.route('/demo/trigger_warning', methods=['POST'])
 def demo_trigger_warning():
     """Demo endpoint to manually trigger WARNING state."""
-    offender = face_matcher.match_face()
-    set_state("WARNING", offender)
+    data = request.get_json(silent=True) or {}
+    camera = get_camera(data.get('camera_id'))
+    if camera is None:
+        return camera_not_found(data.get('camera_id'))
+    offender = face_matcher.demo_offender()
+    camera.set_state("WARNING", offender)
     return jsonify({
         "success": True,
         "message": "WARNING state triggered",
@@ -421,7 +923,11 @@ def demo_trigger_warning():
 @app.route('/demo/reset', methods=['POST'])
 def demo_reset():
     """Demo endpoint to reset system state."""
-    set_state("IDLE")
+    data = request.get_json(silent=True) or {}
+    camera = get_camera(data.get('camera_id'))
+    if camera is None:
+        return camera_not_found(data.get('camera_id'))
+    camera.set_state("IDLE")
     return jsonify({
         "success": True,
         "message": "System reset to IDLE"
@@ -434,4 +940,5 @@ def demo_reset():
 
 if __name__ == '__main__':
     init_detector()
+    configure_storage()
     app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
@@ -0,0 +1,103 @@
+"""
+CivicEye Backend - Camera Registry
+Per-camera video source, tracker, state machine and stream pipeline.
+"""
+
+import threading
+import time
+
+from ai_engine.detector import LitterMonitor
+from backend import metrics
+
+
+class Camera:
+    """
+    One monitored video source.
+
+    Each camera owns its LitterMonitor (tracker + detection state machine),
+    its public state (IDLE, WARNING, PENDING_REVIEW, SHAMING) and its shared
+    frame pipeline. Inference is shared across cameras through the monitor's
+    detector.
+    """
+
+    def __init__(self, cam_id, source=None, name=None, location=None, roi=None):
+        self.cam_id = cam_id
+        self.source = source
+        self.name = name or cam_id
+        self.location = location
+        self.roi = roi  # ROI config (list of polygons or dict), None = full frame
+
+        self.monitor = None
+        self.pipeline = None
+
+        self.state = "IDLE"
+        self.state_timestamp = time.time()
+        self.offender = None
+        self.viewers = 0  # connected MJPEG stream clients
+        self.on_state_change = None  # Callable(camera) run after every set_state()
+        self.lock = threading.RLock()
+
+        # Metric series for this camera, looked up once and updated per frame
+        self.metric_decoded = metrics.FRAMES_DECODED.labels(cam_id)
+        self.metric_inferred = metrics.FRAMES_INFERRED.labels(cam_id)
+        self.metric_skipped = metrics.FRAMES_SKIPPED.labels(cam_id)
+        self.metric_stages = [(stage, metrics.STAGE_SECONDS.labels(cam_id, stage))
+                              for stage in LitterMonitor.STAGES]
+        self.metric_jpeg = metrics.JPEG_ENCODE_SECONDS.labels(cam_id)
+
+    def record_detection(self, monitor):
+        """Count one detected frame as inferred/skipped and observe its stage timings."""
+        if monitor.last_inferred:
+            self.metric_inferred.inc()
+        else:
+            self.metric_skipped.inc()
+        timings = monitor.timings
+        for stage, histogram in self.metric_stages:
+            if stage != 'inference' or monitor.last_inferred:
+                histogram.observe(timings[stage])
+
+    def set_state(self, new_state, offender=None):
+        """Set the camera state with timestamp tracking."""
+        with self.lock:
+            if new_state != self.state:
+                metrics.STATE_TRANSITIONS.labels(self.cam_id, self.state, new_state).inc()
+            self.state = new_state
+            self.state_timestamp = time.time()
+            if offender is not None:
+                self.offender = offender
+            if self.monitor:
+                self.monitor.set_state(new_state)
+            if self.on_state_change is not None:
+                self.on_state_change(self)
+
+    def check_state_timeout(self, timeout):
+        """Reset to IDLE if a WARNING/PENDING_REVIEW state has timed out."""
+        with self.lock:
+            if self.state in ["WARNING", "PENDING_REVIEW"]:
+                if time.time() - self.state_timestamp > timeout:
+                    self.set_state("IDLE")
+                    return True
+        return False
+
+    def timeout_remaining(self, timeout):
+        """Seconds left before an active alert auto-resets (None when idle)."""
+        if self.state in ["WARNING", "PENDING_REVIEW"]:
+            return max(0, timeout - (time.time() - self.state_timestamp))
+        return None
+
+    def stop(self):
+        """Stop the camera's frame pipeline."""
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+
+    def to_dict(self):
+        return {
+            "id": self.cam_id,
+            "name": self.name,
+            "location": self.location,
+            "roi": self.roi,
+            "state": self.state,
+            "viewers": self.viewers,
+            "streaming": self.pipeline is not None and self.pipeline.running
+        }
@@ -0,0 +1,275 @@
+"""
+CivicEye Backend - Violation Clips
+Short pre/post-event clips (e.g. 8 s before to 3 s after a WARNING) built
+from a LitterMonitor's frame history and encoded in a background worker.
+
+Cost is bounded on both sides:
+- memory: clip frames are copied downscaled at `fps`/`max_width`, and at most
+  `max_pending` clips (all cameras together) are collected or queued at once;
+  further triggers are dropped and counted.
+- CPU: the frame loop copies at most `frames_per_feed` clip frames per call,
+  oldest first, so the pre-roll is gathered over a few frames (well before
+  it leaves the history ring) instead of in one long stall; all encoding
+  happens on one low-priority worker thread.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from backend import metrics
+
+
+CLIP_FORMATS = {
+    # format: (fourcc, extension)
+    'mp4': ('mp4v', '.mp4'),
+    'mjpeg': ('MJPG', '.avi'),
+}
+
+
+class PendingClip:
+    """Frames of one clip being collected while its post-roll plays out."""
+
+    def __init__(self, camera_id, trigger_time, path, pre, post, fps, max_width, on_saved):
+        self.camera_id = camera_id
+        self.trigger_time = trigger_time
+        self.path = path
+        self.start = trigger_time - pre
+        self.end = trigger_time + post
+        self.interval = 1.0 / fps
+        self.fps = fps
+        self.max_width = max_width
+        self.on_saved = on_saved
+        self.frames = []
+        self.last_time = None
+        self.created = time.monotonic()
+
+    def collect(self, history, budget):
+        """
+        Copy (downscaled) history frames newer than the last collected one.
+
+        Args:
+            history: FrameHistory to read from
+            budget: Maximum frames copied by this call
+
+        Returns:
+            bool: True if every available frame up to the clip end was collected
+        """
+        t0 = self.start if self.last_time is None else self.last_time + 1e-6
+        for timestamp, frame in history.iter_range(t0, self.end):
+            if self.last_time is not None and timestamp - self.last_time < self.interval * 0.5:
+                continue  # keep roughly the clip frame rate
+            if budget <= 0:
+                return False
+            height, width = frame.shape[:2]
+            if width > self.max_width:
+                size = (self.max_width, max(2, round(height * self.max_width / width) // 2 * 2))
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+            else:
+                frame = frame.copy()
+            self.frames.append((timestamp, frame))
+            self.last_time = timestamp
+            budget -= 1
+        return True
+
+
+class ClipExporter:
+    """
+    Collects clip frames from camera frame loops and encodes them off-thread.
+
+    The frame loop calls `trigger()` when a violation fires and `feed()` on
+    every frame; once a clip's post-roll is in the history (or it times out)
+    it is handed to the encoder thread.
+    """
+
+    def __init__(self, directory, pre=8.0, post=3.0, fps=5.0, max_width=640,
+                 video_format='mp4', max_pending=2, frames_per_feed=4, timeout=10.0):
+        """
+        Args:
+            directory: Where clips are written
+            pre: Seconds before the trigger (limited by the history length)
+            post: Seconds after the trigger
+            fps: Clip frame rate (history frames are decimated to it)
+            max_width: Clip frames wider than this are downscaled
+            video_format: "mp4" or "mjpeg" (see CLIP_FORMATS)
+            max_pending: Clips collecting or waiting to be encoded, all cameras
+            frames_per_feed: Clip frames copied per trigger()/feed() call
+            timeout: Extra seconds a clip waits for its post-roll before it is
+                encoded with what it has (e.g. the source stopped)
+        """
+        if video_format not in CLIP_FORMATS:
+            raise ValueError(f"video_format must be one of {sorted(CLIP_FORMATS)}, got {video_format!r}")
+        self.directory = directory
+        self.pre = pre
+        self.post = post
+        self.fps = fps
+        self.max_width = max_width
+        self.video_format = video_format
+        self.max_pending = max_pending
+        self.frames_per_feed = frames_per_feed
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._collecting = {}  # camera_id -> PendingClip
+        self._queue = queue.Queue()
+        self._in_flight = 0
+        self._thread = None
+
+    @property
+    def extension(self):
+        return CLIP_FORMATS[self.video_format][1]
+
+    def start(self):
+        """Start the encoder thread (no-op if already running)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='civiceye-clips', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Encode queued clips and stop the encoder thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def pending(self):
+        """Clips collecting frames or waiting to be encoded."""
+        return self._in_flight
+
+    # -------------------------------------------------------------------------
+    # Frame loop API
+    # -------------------------------------------------------------------------
+
+    def trigger(self, camera_id, history, filename, on_saved=None):
+        """
+        Start a clip around the newest frame in `history`.
+
+        Starts copying the pre-roll (the part about to fall out of the ring);
+        `feed()` continues it. Never blocks: if `max_pending` clips are already
+        in flight the trigger is dropped.
+
+        Args:
+            camera_id: Camera the clip belongs to
+            history: The camera's FrameHistory
+            filename: Clip file name without extension
+            on_saved: Optional Callable(path) run by the encoder when the clip is written
+
+        Returns:
+            str or None: Clip file name (with extension), or None if dropped
+        """
+        span = history.time_span
+        if span is None:
+            return None
+        self.expire()
+        with self._lock:
+            if camera_id in self._collecting or self._in_flight >= self.max_pending:
+                metrics.CLIPS_DROPPED.labels(camera_id).inc()
+                return None
+            self._in_flight += 1
+            clip = PendingClip(camera_id, span[1], os.path.join(self.directory, filename + self.extension),
+                               self.pre, self.post, self.fps, self.max_width, on_saved)
+            self._collecting[camera_id] = clip
+        clip.collect(history, self.frames_per_feed)
+        return filename + self.extension
+
+    def feed(self, camera_id, history):
+        """Add new post-roll frames to the camera's clip, if one is collecting."""
+        clip = self._collecting.get(camera_id)
+        if clip is None:
+            return
+        caught_up = clip.collect(history, self.frames_per_feed)
+        span = history.time_span
+        done = caught_up and span is not None and span[1] >= clip.end
+        if done or self._overdue(clip):
+            self._finish(camera_id, clip)
+
+    def expire(self):
+        """
+        Hand clips whose post-roll deadline has passed to the encoder.
+
+        Called from `trigger()` and periodically by the encoder thread, so a
+        clip still finishes (with the frames it has) and frees its slot when
+        its camera stops feeding frames (pipeline stopped, surveillance
+        paused, cameras reconfigured).
+        """
+        with self._lock:
+            overdue = [(camera_id, clip) for camera_id, clip in self._collecting.items()
+                       if self._overdue(clip)]
+        for camera_id, clip in overdue:
+            self._finish(camera_id, clip)
+
+    def _overdue(self, clip):
+        return time.monotonic() - clip.created > self.post + self.timeout
+
+    def _finish(self, camera_id, clip):
+        """Move a clip from collecting to the encoder queue (once)."""
+        with self._lock:
+            if self._collecting.get(camera_id) is not clip:
+                return
+            del self._collecting[camera_id]
+        self._queue.put(clip)
+
+    # -------------------------------------------------------------------------
+    # Encoder
+    # -------------------------------------------------------------------------
+
+    def _encode(self, clip):
+        frames = list(clip.frames)  # a late feed() may still append after expire()
+        if not frames:
+            raise ValueError("no frames collected")
+        started = time.perf_counter()
+        height, width = frames[0][1].shape[:2]
+        os.makedirs(os.path.dirname(clip.path), exist_ok=True)
+        tmp_path = f"{clip.path}.tmp{self.extension}"
+        fourcc = cv2.VideoWriter_fourcc(*CLIP_FORMATS[self.video_format][0])
+        writer = cv2.VideoWriter(tmp_path, fourcc, clip.fps, (width, height))
+        if not writer.isOpened():
+            raise RuntimeError(f"cannot open a {self.video_format} writer")
+        try:
+            # Frames go out at a constant rate; hold each one until the next sample is due
+            t = frames[0][0]
+            index = 0
+            while t <= frames[-1][0] + 1e-6:
+                while index + 1 < len(frames) and frames[index + 1][0] <= t + 1e-6:
+                    index += 1
+                frame = frames[index][1]
+                if frame.shape[:2] != (height, width):
+                    frame = cv2.resize(frame, (width, height))
+                writer.write(frame)
+                t += 1.0 / clip.fps
+        finally:
+            writer.release()
+        os.replace(tmp_path, clip.path)
+        metrics.CLIP_ENCODE_SECONDS.labels(clip.camera_id).observe(time.perf_counter() - started)
+        metrics.CLIPS_WRITTEN.labels(clip.camera_id).inc()
+
+    def _run(self):
+        # Encoding yields to inference and streaming threads (Linux: per-thread nice)
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            try:
+                clip = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self.expire()
+                continue
+            if clip is None:
+                return
+            try:
+                self._encode(clip)
+                if clip.on_saved is not None:
+                    clip.on_saved(clip.path)
+            except Exception as e:
+                metrics.CLIPS_FAILED.labels(clip.camera_id).inc()
+                print(f"⚠️  Clip export failed ({clip.path}): {e}")
+            finally:
+                clip.frames = []
+                with self._lock:
+                    self._in_flight -= 1
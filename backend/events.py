@@ -0,0 +1,120 @@
+"""
+CivicEye Backend - Event Bus
+In-memory publish/subscribe of state-change events for the /events
+Server-Sent Events stream.
+
+Every event gets an id of the form "<boot>-<seq>". The last events are kept
+in a ring so a reconnecting client that sends Last-Event-ID gets exactly what
+it missed; if its id is from another server run or already fell out of the
+ring, it is told to resynchronize from a full snapshot instead.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+
+class Event:
+    __slots__ = ('seq', 'id', 'type', 'camera_id', 'data')
+
+    def __init__(self, seq, event_id, event_type, camera_id, data):
+        self.seq = seq
+        self.id = event_id
+        self.type = event_type
+        self.camera_id = camera_id
+        self.data = data
+
+    def to_sse(self):
+        """Serialize as one Server-Sent Events message."""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class EventBus:
+    """Ring of recent events plus a condition that wakes waiting streams."""
+
+    def __init__(self, history=512):
+        """
+        Args:
+            history: Events kept for Last-Event-ID resume
+        """
+        self.boot = format(int(time.time() * 1000), 'x')
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def publish(self, event_type, data, camera_id=None):
+        """
+        Publish an event to all subscribers.
+
+        Args:
+            event_type: SSE event name ("state", "config", "incident", ...)
+            data: JSON-serializable payload
+            camera_id: Camera the event belongs to (None = all cameras)
+        """
+        with self._cond:
+            self._seq += 1
+            event = Event(self._seq, f"{self.boot}-{self._seq}", event_type, camera_id, data)
+            self._events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def snapshot(self, event_type, build, camera_id=None):
+        """
+        Build an event carrying a full state snapshot without publishing it.
+
+        The position is read before `build()` collects the state, and the
+        event's id is that position: anything published meanwhile is sent
+        again after the snapshot rather than lost.
+
+        Args:
+            event_type: SSE event name
+            build: Callable() -> JSON-serializable snapshot payload
+            camera_id: Camera the snapshot belongs to
+        """
+        with self._cond:
+            seq = self._seq
+        return Event(seq, f"{self.boot}-{seq}", event_type, camera_id, build())
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def resolve(self, last_event_id):
+        """
+        Map a client's Last-Event-ID to a sequence number to resume after.
+
+        Returns:
+            int or None: Sequence to resume after, or None if the client must
+                resynchronize (unknown id, other server run, or id no longer
+                in the ring)
+        """
+        if not last_event_id:
+            return None
+        boot, _, seq = str(last_event_id).partition('-')
+        if boot != self.boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        with self._cond:
+            if seq > self._seq:
+                return None
+            oldest = self._events[0].seq if self._events else self._seq + 1
+            if seq < oldest - 1:
+                return None
+        return seq
+
+    def wait(self, after_seq, timeout=15.0):
+        """
+        Block until events newer than `after_seq` exist (or timeout).
+
+        Returns:
+            list: Events with seq > after_seq, oldest first
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq, timeout)
+            if self._seq <= after_seq:
+                return []
+            return [e for e in self._events if e.seq > after_seq]
+
+
+EVENTS = EventBus()
@@ -0,0 +1,265 @@
+"""
+CivicEye Backend - Evidence Writer
+Background encoding and storage of violation evidence, so the frame loop
+never waits on JPEG encoding or disk I/O.
+
+Jobs go into a bounded queue. When the queue is full the new job is dropped
+(and counted) instead of blocking the camera that submitted it.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from backend import metrics
+
+
+FSYNC_POLICIES = ('always', 'idle', 'never')
+
+
+class EvidenceJob:
+    """One still image to encode and store."""
+
+    __slots__ = ('frame', 'path', 'camera_id', 'on_saved', 'submitted')
+
+    def __init__(self, frame, path, camera_id='', on_saved=None):
+        """
+        Args:
+            frame: BGR image (must not be modified after submitting)
+            path: Destination .jpg path
+            camera_id: Camera label for metrics
+            on_saved: Optional Callable(job, paths) run by the writer once the
+                image and its thumbnails are on disk (incident handoff)
+        """
+        self.frame = frame
+        self.path = path
+        self.camera_id = camera_id
+        self.on_saved = on_saved
+        self.submitted = time.monotonic()
+
+
+def thumbnail_path(path, width):
+    """Path of the `width`-pixel thumbnail stored next to an evidence image."""
+    directory, filename = os.path.split(path)
+    stem, ext = os.path.splitext(filename)
+    return os.path.join(directory, 'thumbs', f"{stem}_w{width}{ext}")
+
+
+def make_thumbnail(frame, width, params):
+    """
+    JPEG-encode `frame` scaled down to `width` pixels.
+
+    Returns:
+        numpy.ndarray or None: Encoded bytes, or None if encoding failed
+    """
+    height, frame_width = frame.shape[:2]
+    if width < frame_width:
+        size = (width, max(1, round(height * width / frame_width)))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', frame, params)
+    return buffer if ok else None
+
+
+def ensure_thumbnail(path, width, quality=80):
+    """
+    Return the path of an image's thumbnail, creating it on first use.
+
+    Used for evidence written before thumbnails existed or in another size.
+
+    Returns:
+        str or None: Thumbnail path, or None if the image cannot be read
+    """
+    thumb_file = thumbnail_path(path, width)
+    if os.path.exists(thumb_file) and os.path.getmtime(thumb_file) >= os.path.getmtime(path):
+        return thumb_file
+    frame = cv2.imread(path)
+    if frame is None:
+        return None
+    buffer = make_thumbnail(frame, width, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if buffer is None:
+        return None
+    os.makedirs(os.path.dirname(thumb_file), exist_ok=True)
+    tmp_path = f"{thumb_file}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer)
+    os.replace(tmp_path, thumb_file)
+    return thumb_file
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # not supported on this platform
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class EvidenceWriter:
+    """
+    Bounded queue plus worker threads that encode and write evidence.
+
+    Files are written to a temporary name and renamed into place, so readers
+    never see a half-written JPEG. The fsync policy decides when data is
+    forced to disk: after every file ('always'), once the queue runs empty
+    ('idle'), or never (left to the OS).
+    """
+
+    def __init__(self, max_queue=16, workers=1, jpeg_quality=95, thumbnail_widths=(160, 320, 640),
+                 thumbnail_quality=80, fsync='idle'):
+        """
+        Args:
+            max_queue: Jobs waiting before new ones are dropped
+            workers: Writer threads
+            jpeg_quality: Quality of the full-size evidence image
+            thumbnail_widths: Widths of the thumbnails written alongside it
+            thumbnail_quality: JPEG quality of the thumbnails
+            fsync: One of FSYNC_POLICIES
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+        self.thumbnail_widths = tuple(thumbnail_widths)
+        self.thumbnail_params = [cv2.IMWRITE_JPEG_QUALITY, int(thumbnail_quality)]
+        self.fsync = fsync
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._unsynced = set()  # files written but not yet fsynced ('idle')
+        self._sync_lock = threading.Lock()
+        self._threads = []
+        self.workers = workers
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """Start the writer threads (no-op if already running)."""
+        if self._threads:
+            return self
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'civiceye-evidence-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=5.0):
+        """Finish queued jobs and stop the writer threads."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def flush(self):
+        """Block until every queued job has been written."""
+        self._queue.join()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    # -------------------------------------------------------------------------
+    # Producer API
+    # -------------------------------------------------------------------------
+
+    def submit(self, job):
+        """
+        Queue a job without blocking.
+
+        Returns:
+            bool: False if the queue was full and the job was dropped
+        """
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            metrics.EVIDENCE_DROPPED.labels(job.camera_id).inc()
+            return False
+        return True
+
+    # -------------------------------------------------------------------------
+    # Worker
+    # -------------------------------------------------------------------------
+
+    def _write(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if self.fsync == 'always':
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if self.fsync == 'always':
+            _fsync_dir(directory)
+        elif self.fsync == 'idle':
+            with self._sync_lock:
+                self._unsynced.add(path)
+        return len(data)
+
+    def _sync_idle(self):
+        """Flush written data to disk once nothing is left in the queue."""
+        with self._sync_lock:
+            paths, self._unsynced = self._unsynced, set()
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    os.fsync(f.fileno())
+            except OSError:
+                continue  # removed meanwhile
+        for directory in {os.path.dirname(path) for path in paths}:
+            _fsync_dir(directory)
+
+    def _process(self, job):
+        started = time.perf_counter()
+        ok, buffer = cv2.imencode('.jpg', job.frame, self.jpeg_params)
+        if not ok:
+            raise ValueError(f"JPEG encoding failed for {job.path}")
+        written = self._write(job.path, buffer)
+        paths = {'image': job.path}
+
+        width = job.frame.shape[1]
+        for thumb_width in self.thumbnail_widths:
+            if thumb_width >= width:
+                continue
+            buffer = make_thumbnail(job.frame, thumb_width, self.thumbnail_params)
+            if buffer is not None:
+                thumb_file = thumbnail_path(job.path, thumb_width)
+                written += self._write(thumb_file, buffer)
+                paths[thumb_width] = thumb_file
+
+        metrics.EVIDENCE_WRITE_SECONDS.labels(job.camera_id).observe(time.perf_counter() - started)
+        metrics.EVIDENCE_BYTES.labels(job.camera_id).inc(written)
+        metrics.EVIDENCE_WRITTEN.labels(job.camera_id).inc()
+        return paths
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                metrics.EVIDENCE_QUEUE_WAIT_SECONDS.labels(job.camera_id).observe(
+                    time.monotonic() - job.submitted
+                )
+                try:
+                    paths = self._process(job)
+                except Exception as e:
+                    metrics.EVIDENCE_FAILED.labels(job.camera_id).inc()
+                    print(f"⚠️  Evidence write failed ({job.path}): {e}")
+                    continue
+                if job.on_saved is not None:
+                    try:
+                        job.on_saved(job, paths)
+                    except Exception as e:
+                        print(f"⚠️  Evidence handoff failed ({job.path}): {e}")
+                if self.fsync == 'idle' and self._queue.empty():
+                    self._sync_idle()
+            finally:
+                self._queue.task_done()
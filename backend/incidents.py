@@ -0,0 +1,234 @@
+"""
+CivicEye Backend - Incident Store
+SQLite (WAL) incident log: each incident is one INSERT, so saving is O(1)
+and crash-safe, and concurrent writers are serialized instead of racing on a
+read-modify-write of a JSON file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    timestamp TEXT,
+    camera_id TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS incidents_timestamp ON incidents (timestamp);
+CREATE INDEX IF NOT EXISTS incidents_camera ON incidents (camera_id, seq);
+CREATE INDEX IF NOT EXISTS incidents_status ON incidents (status, seq);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class IncidentStore:
+    """
+    Incident log backed by SQLite in WAL mode.
+
+    Incidents are stored as their JSON document plus indexed columns
+    (timestamp, camera_id, status). Every thread gets its own connection so
+    readers never block on each other; writes go through one lock.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=FULL")  # an incident is durable once add() returns
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(incident):
+        return (incident.get('timestamp'), incident.get('camera_id'),
+                incident.get('status'), json.dumps(incident))
+
+    def add(self, incident):
+        """
+        Append one incident.
+
+        If its id is already taken (two confirmations in the same second),
+        a numeric suffix is added to keep ids unique.
+
+        Returns:
+            dict: The stored incident (with its final id)
+        """
+        base_id = incident['id']
+        with self._write_lock:
+            conn = self._connection()
+            for attempt in range(1, 1000):
+                if attempt > 1:
+                    incident = {**incident, 'id': f"{base_id}-{attempt}"}
+                try:
+                    conn.execute(
+                        "INSERT INTO incidents (id, timestamp, camera_id, status, data) "
+                        "VALUES (?, ?, ?, ?, ?)", (incident['id'],) + self._row(incident)
+                    )
+                    return incident
+                except sqlite3.IntegrityError:
+                    continue
+        raise RuntimeError(f"Could not allocate a unique incident id for {base_id}")
+
+    def all(self):
+        """Return every incident, oldest first."""
+        rows = self._connection().execute("SELECT data FROM incidents ORDER BY seq")
+        return [json.loads(data) for (data,) in rows]
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM incidents").fetchone()[0]
+
+    def revision(self):
+        """
+        Cheap change marker for the whole log (for ETags).
+
+        Incidents are never deleted, so the highest seq (a rowid lookup, not a
+        table scan) changes on every add and the update counter on every
+        in-place rewrite.
+
+        Returns:
+            tuple: (highest seq, number of in-place updates)
+        """
+        return self._connection().execute(
+            "SELECT (SELECT COALESCE(MAX(seq), 0) FROM incidents), "
+            "(SELECT COALESCE(MAX(CAST(value AS INTEGER)), 0) FROM meta WHERE key = 'updates')"
+        ).fetchone()
+
+    def update(self, incident_id, change):
+        """
+        Rewrite one incident in place (e.g. when its evidence is purged).
+
+        Args:
+            incident_id: Incident to change
+            change: Callable(incident dict) -> changed incident dict
+
+        Returns:
+            dict or None: The updated incident, or None if the id is unknown
+        """
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM incidents WHERE id = ?",
+                                   (incident_id,)).fetchone()
+                if row is None:
+                    conn.execute("ROLLBACK")
+                    return None
+                incident = change(json.loads(row[0]))
+                conn.execute(
+                    "UPDATE incidents SET timestamp = ?, camera_id = ?, status = ?, data = ? "
+                    "WHERE id = ?", self._row(incident) + (incident_id,)
+                )
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('updates', '1') ON CONFLICT(key) "
+                    "DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return incident
+
+    def seq_of(self, incident_id):
+        """Return the log position of an incident id, or None if unknown."""
+        row = self._connection().execute(
+            "SELECT seq FROM incidents WHERE id = ?", (incident_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def query(self, after_seq=0, start=None, end=None, status=None, camera_id=None,
+              limit=None, offset=0, newest_first=False):
+        """
+        Filtered, paginated read of the log.
+
+        Args:
+            after_seq: Only incidents logged after this position
+            start: Earliest ISO timestamp (inclusive)
+            end: Latest ISO timestamp (exclusive)
+            status: Incident status (e.g. "CONFIRMED")
+            camera_id: Camera the incident was logged on
+            limit: Maximum incidents returned (None = all)
+            offset: Matching incidents skipped before the page
+            newest_first: Order by log position descending
+
+        Returns:
+            tuple: (incidents, total matching ignoring limit/offset)
+        """
+        clauses, params = ["seq > ?"], [after_seq]
+        for clause, value in (("timestamp >= ?", start), ("timestamp < ?", end),
+                              ("status = ?", status), ("camera_id = ?", camera_id)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = " AND ".join(clauses)
+
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM incidents WHERE {where}", params).fetchone()[0]
+        order = "DESC" if newest_first else "ASC"
+        rows = conn.execute(
+            f"SELECT data FROM incidents WHERE {where} ORDER BY seq {order} LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset]
+        )
+        return [json.loads(data) for (data,) in rows], total
+
+    def migrate_json(self, json_path):
+        """
+        Import a legacy incident_log.json once (in a single transaction).
+
+        The JSON file is left untouched; the import is recorded in the meta
+        table so it is not repeated.
+
+        Returns:
+            int: Number of incidents imported
+        """
+        if not os.path.exists(json_path):
+            return 0
+        key = f"migrated:{os.path.abspath(json_path)}"
+        with self._write_lock:
+            conn = self._connection()
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return 0
+            try:
+                with open(json_path, 'r') as f:
+                    incidents = json.load(f)
+            except json.JSONDecodeError:
+                incidents = []
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                imported = 0
+                for incident in incidents:
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO incidents (id, timestamp, camera_id, status, data) "
+                        "VALUES (?, ?, ?, ?, ?)", (incident.get('id'),) + self._row(incident)
+                    )
+                    imported += cursor.rowcount
+                conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(imported)))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return imported
@@ -0,0 +1,251 @@
+"""
+CivicEye Backend - Metrics
+Minimal Prometheus-compatible counters, gauges and histograms for the
+/metrics endpoint.
+
+Updates are a dict lookup plus a few float operations under a per-series
+lock, cheap enough for the per-frame loops. Values that already live
+elsewhere (track counts, buffer sizes, viewers) are read at scrape time
+instead of being updated on the hot path.
+"""
+
+import bisect
+import threading
+
+
+# Latency buckets in seconds (0.5 ms .. 5 s)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    kind = None
+    child_class = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _new_child(self):
+        return self.child_class()
+
+    def labels(self, *values):
+        """Return the series for these label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def remove(self, *values):
+        """Drop one series (e.g. for a removed camera)."""
+        with self._lock:
+            self._children.pop(values, None)
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def _samples(self, child):
+        """Yield (sample name, extra label pairs, value) for one series."""
+        yield self.name, (), child.value
+
+    def expose(self, snapshot=None):
+        """
+        Prometheus text exposition lines for this metric.
+
+        Args:
+            snapshot: Optional {label values tuple: value} rendered instead of
+                the stored series (scrape-time values, see Registry.expose)
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        if snapshot is not None:
+            for values, value in sorted(snapshot.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, values)} '
+                             f'{_format_value(value)}')
+            return lines
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            for name, extra, value in self._samples(child):
+                lines.append(f'{name}{_format_labels(self.labelnames, values, extra)} '
+                             f'{_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    child_class = _CounterChild
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+    child_class = _GaugeChild
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _samples(self, child):
+        with child._lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            cumulative += n
+            yield f'{self.name}_bucket', (('le', _format_value(float(bound))),), cumulative
+        yield f'{self.name}_sum', (), total
+        yield f'{self.name}_count', (), count
+
+
+class Registry:
+    """Collection of metrics rendered together by /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def expose(self, snapshot=None):
+        """
+        Render every metric.
+
+        Args:
+            snapshot: Optional {metric: {label values tuple: value}} of values
+                sampled for this scrape only. They are rendered as given and
+                never stored, so concurrent scrapes cannot see each other's
+                half-filled series.
+        """
+        snapshot = snapshot or {}
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose(snapshot.get(metric)))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# =============================================================================
+# CIVICEYE METRICS
+# =============================================================================
+
+# Hot path (updated per frame / per event)
+FRAMES_DECODED = Counter('civiceye_frames_decoded_total',
+                         'Frames decoded and handed to the detector', ['camera'])
+FRAMES_INFERRED = Counter('civiceye_frames_inferred_total',
+                          'Frames that ran the detection model', ['camera'])
+FRAMES_SKIPPED = Counter('civiceye_frames_skipped_total',
+                         'Frames that reused the previous detections (no motion)', ['camera'])
+STAGE_SECONDS = Histogram('civiceye_stage_seconds',
+                          'Per-frame latency of each detection pipeline stage', ['camera', 'stage'])
+JPEG_ENCODE_SECONDS = Histogram('civiceye_jpeg_encode_seconds',
+                                'Time to JPEG-encode a streamed frame', ['camera'])
+INCIDENTS = Counter('civiceye_incidents_total', 'Incidents logged', ['camera', 'status'])
+STATE_TRANSITIONS = Counter('civiceye_state_transitions_total',
+                            'Camera state machine transitions', ['camera', 'from_state', 'to_state'])
+EVIDENCE_WRITTEN = Counter('civiceye_evidence_written_total', 'Evidence images written', ['camera'])
+EVIDENCE_DROPPED = Counter('civiceye_evidence_dropped_total',
+                           'Evidence jobs dropped because the writer queue was full', ['camera'])
+EVIDENCE_FAILED = Counter('civiceye_evidence_failed_total', 'Evidence jobs that failed to write',
+                          ['camera'])
+EVIDENCE_BYTES = Counter('civiceye_evidence_bytes_total', 'Evidence bytes written (incl. thumbnails)',
+                         ['camera'])
+EVIDENCE_WRITE_SECONDS = Histogram('civiceye_evidence_write_seconds',
+                                   'Time to encode and write one evidence image', ['camera'])
+EVIDENCE_QUEUE_WAIT_SECONDS = Histogram('civiceye_evidence_queue_wait_seconds',
+                                        'Time evidence jobs wait in the writer queue', ['camera'])
+CLIPS_WRITTEN = Counter('civiceye_clips_written_total', 'Violation clips exported', ['camera'])
+CLIPS_DROPPED = Counter('civiceye_clips_dropped_total',
+                        'Violation clips skipped because too many were in flight', ['camera'])
+CLIPS_FAILED = Counter('civiceye_clips_failed_total', 'Violation clips that failed to encode', ['camera'])
+CLIP_ENCODE_SECONDS = Histogram('civiceye_clip_encode_seconds', 'Time to encode one violation clip',
+                                ['camera'])
+INFERENCE_BATCHES = Counter('civiceye_inference_batches_total', 'Batched model calls')
+INFERENCE_BATCH_FRAMES = Counter('civiceye_inference_batch_frames_total',
+                                 'Frames run through batched model calls')
+
+# Read at scrape time (rendered from a per-scrape snapshot, see Registry.expose)
+LIVE_TRACKS = Gauge('civiceye_live_tracks', 'Litter tracks currently alive', ['camera'])
+FRAME_BUFFER_BYTES = Gauge('civiceye_frame_buffer_bytes',
+                           'Bytes allocated by the pre-event frame history', ['camera'])
+STREAM_VIEWERS = Gauge('civiceye_stream_viewers', 'Connected MJPEG stream viewers', ['camera'])
+CAMERA_STATE = Gauge('civiceye_camera_state', 'Current camera state (1 for the active state)',
+                     ['camera', 'state'])
+EVIDENCE_QUEUE_DEPTH = Gauge('civiceye_evidence_queue_depth', 'Evidence jobs waiting to be written')
+CLIPS_PENDING = Gauge('civiceye_clips_pending', 'Violation clips collecting frames or waiting to encode')
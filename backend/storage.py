@@ -0,0 +1,403 @@
+"""
+CivicEye Backend - Evidence Storage
+Date-sharded evidence files, an index linking them to incidents, and a
+background sweeper that applies the retention policy.
+
+Files live under <root>/<kind dir>/YYYY/MM/DD/ with collision-free names.
+Every file is recorded in the `evidence` table (in the incident database) with
+its size, JPEG quality and the incident it belongs to. The sweeper only ever
+works from that index:
+- evidence older than `recompress_after_days` is re-encoded at a lower quality
+  (except files adopted from the old flat layout)
+- evidence of alerts that never became an incident is deleted after
+  `unlinked_max_age_days` (files adopted from the old flat layout are exempt,
+  since they predate incident links)
+- everything is deleted after `max_age_days`, and the oldest files go first
+  (unlinked before linked) while the total exceeds `max_bytes`
+Recompression and deletion are opt-in: every limit defaults to None (keep
+everything as written).
+When a linked file is deleted, its incident is updated (URL cleared and the
+file listed under "evidence_purged"), so no log entry points at a missing file.
+"""
+
+import glob
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from backend.evidence import thumbnail_path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evidence (
+    path TEXT PRIMARY KEY,
+    kind TEXT,
+    camera_id TEXT,
+    created REAL NOT NULL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    quality INTEGER,
+    incident_id TEXT,
+    deleted REAL,
+    legacy INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS evidence_created ON evidence (deleted, created);
+CREATE INDEX IF NOT EXISTS evidence_incident ON evidence (incident_id);
+"""
+
+KIND_DIRS = {'photo': 'captured', 'clip': 'clips'}
+DAY = 86400.0
+
+
+class RetentionPolicy:
+    """Retention and recompression settings (sizes in bytes, ages in days)."""
+
+    def __init__(self, max_age_days=None, max_bytes=None, unlinked_max_age_days=None,
+                 recompress_after_days=None, recompress_quality=60, sweep_interval=600,
+                 batch=200):
+        """
+        Args:
+            max_age_days: Delete any evidence older than this (None = keep)
+            max_bytes: Byte budget for all indexed evidence (None = unlimited)
+            unlinked_max_age_days: Delete evidence of dismissed alerts after this (None = keep)
+            recompress_after_days: Re-encode photos older than this (None = never)
+            recompress_quality: JPEG quality used when recompressing
+            sweep_interval: Seconds between sweeps
+            batch: Maximum files recompressed per sweep (bounds sweep CPU)
+        """
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.unlinked_max_age_days = unlinked_max_age_days
+        self.recompress_after_days = recompress_after_days
+        self.recompress_quality = recompress_quality
+        self.sweep_interval = sweep_interval
+        self.batch = batch
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from the "storage" section of cameras.json ({} = defaults)."""
+        config = dict(config or {})
+        if 'max_gb' in config:
+            max_gb = config.pop('max_gb')
+            config['max_bytes'] = None if max_gb is None else int(max_gb * 1024 ** 3)
+        return cls(**config)
+
+
+class EvidenceStorage:
+    """Allocates evidence paths, indexes files and runs the retention sweeper."""
+
+    def __init__(self, root, db_path, incident_store=None, policy=None):
+        """
+        Args:
+            root: Directory that relative evidence paths are resolved against
+            db_path: SQLite database holding the evidence index
+            incident_store: IncidentStore updated when linked evidence is purged
+            policy: RetentionPolicy (defaults if None)
+        """
+        self.root = root
+        self.db_path = db_path
+        self.incident_store = incident_store
+        self.policy = policy or RetentionPolicy()
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def abspath(self, relpath):
+        return os.path.join(self.root, relpath)
+
+    # -------------------------------------------------------------------------
+    # Allocation and indexing
+    # -------------------------------------------------------------------------
+
+    def allocate(self, kind, camera_id, prefix, extension='', now=None):
+        """
+        Reserve a unique, date-sharded path for a new evidence file.
+
+        Names carry the time to the millisecond plus a random suffix, so two
+        violations in the same second (or on two servers) never collide.
+
+        Args:
+            kind: "photo" or "clip"
+            camera_id: Camera that produced the evidence
+            prefix: File name prefix (e.g. "violator")
+            extension: File extension including the dot ("" if added later)
+            now: datetime to shard by (default: now)
+
+        Returns:
+            tuple: (evidence id, path relative to the storage root)
+        """
+        now = now or datetime.now()
+        evidence_id = f"{now:%Y%m%d_%H%M%S}_{now.microsecond // 1000:03d}_{camera_id}_{secrets.token_hex(3)}"
+        relpath = os.path.join(KIND_DIRS[kind], f"{now:%Y/%m/%d}", f"{prefix}_{evidence_id}{extension}")
+        return evidence_id, relpath.replace(os.sep, '/')
+
+    def register(self, relpath, kind, camera_id=None, quality=None, created=None, legacy=False):
+        """Record a file that is now on disk (size read from the file)."""
+        try:
+            size = os.path.getsize(self.abspath(relpath))
+        except OSError:
+            return
+        with self._write_lock:
+            self._connection().execute(
+                "INSERT INTO evidence (path, kind, camera_id, created, bytes, quality, legacy) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET "
+                "kind = excluded.kind, camera_id = excluded.camera_id, "
+                "bytes = excluded.bytes, quality = excluded.quality, deleted = NULL",
+                (relpath, kind, camera_id, created or time.time(), size + self._thumbnail_bytes(relpath),
+                 quality, int(legacy))
+            )
+
+    def link(self, incident_id, relpaths):
+        """
+        Attach evidence files to an incident.
+
+        Files not registered yet (still queued for writing) get a placeholder
+        row that `register()` fills in later.
+        """
+        with self._write_lock:
+            self._connection().executemany(
+                "INSERT INTO evidence (path, created, incident_id) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET incident_id = excluded.incident_id",
+                [(relpath, time.time(), incident_id) for relpath in relpaths]
+            )
+
+    def files(self, incident_id):
+        """Relative paths of an incident's evidence that still exist."""
+        rows = self._connection().execute(
+            "SELECT path FROM evidence WHERE incident_id = ? AND deleted IS NULL", (incident_id,)
+        )
+        return [path for (path,) in rows]
+
+    def incident_of(self, relpath):
+        """Incident an evidence file is linked to, or None."""
+        row = self._connection().execute(
+            "SELECT incident_id FROM evidence WHERE path = ?", (relpath,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def usage(self):
+        """
+        Returns:
+            dict: {"files", "bytes"} of indexed evidence still on disk
+        """
+        files, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM evidence WHERE deleted IS NULL"
+        ).fetchone()
+        return {"files": files, "bytes": size}
+
+    def adopt(self):
+        """
+        Index evidence written before the storage index existed.
+
+        Picks up untracked files at the top level of the kind directories
+        (the old flat layout; sharded files are always registered on write),
+        using their mtime as creation time, and links them to the incidents
+        whose URLs reference them. Adopted files are marked legacy: they are
+        never recompressed or deleted as unlinked.
+
+        Returns:
+            int: Files added to the index
+        """
+        conn = self._connection()
+        adopted = set()
+        for kind, directory in KIND_DIRS.items():
+            base = os.path.join(self.root, directory)
+            if not os.path.isdir(base):
+                continue
+            for entry in os.scandir(base):
+                if not entry.is_file() or entry.name.endswith('.tmp'):
+                    continue
+                relpath = f"{directory}/{entry.name}"
+                if conn.execute("SELECT 1 FROM evidence WHERE path = ?", (relpath,)).fetchone():
+                    continue
+                self.register(relpath, kind, created=entry.stat().st_mtime, legacy=True)
+                adopted.add(relpath)
+
+        if adopted and self.incident_store is not None:
+            for incident in self.incident_store.all():
+                linked = [path for path in self._referenced(incident.get('offender') or {})
+                          if path in adopted]
+                if linked:
+                    self.link(incident['id'], linked)
+        return len(adopted)
+
+    @staticmethod
+    def _referenced(offender):
+        """Relative evidence paths referenced by an offender record's URLs."""
+        paths = list(offender.get('files') or [])
+        for key in ('photo_url', 'clip_url'):
+            url = offender.get(key) or ''
+            _, marker, relpath = url.partition('/database/')
+            if marker and relpath not in paths:
+                paths.append(relpath)
+        return paths
+
+    # -------------------------------------------------------------------------
+    # Retention
+    # -------------------------------------------------------------------------
+
+    def _thumbnail_bytes(self, relpath):
+        return sum(os.path.getsize(p) for p in self._thumbnails(relpath))
+
+    def _thumbnails(self, relpath):
+        pattern = thumbnail_path(self.abspath(relpath), '*')
+        return [p for p in glob.glob(pattern) if os.path.isfile(p)]
+
+    def _delete(self, relpath, incident_id, now):
+        path = self.abspath(relpath)
+        for file_path in [path] + self._thumbnails(relpath):
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+        # Drop now-empty thumbs/day/month/year directories (never the kind directory)
+        kind_dir = os.path.join(self.root, relpath.split('/', 1)[0])
+        directory = os.path.dirname(path)
+        for candidate in (os.path.join(directory, 'thumbs'), directory):
+            while os.path.abspath(candidate).startswith(os.path.abspath(kind_dir) + os.sep):
+                try:
+                    os.rmdir(candidate)
+                except OSError:
+                    break
+                candidate = os.path.dirname(candidate)
+
+        with self._write_lock:
+            self._connection().execute("UPDATE evidence SET deleted = ? WHERE path = ?", (now, relpath))
+        if incident_id and self.incident_store is not None:
+            self.incident_store.update(incident_id, lambda incident: _mark_purged(incident, relpath, now))
+
+    def _recompress(self, relpath, quality):
+        path = self.abspath(relpath)
+        frame = cv2.imread(path)
+        if frame is None:
+            return False
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        if not ok or len(buffer) >= os.path.getsize(path):
+            return False
+        stat = os.stat(path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer)
+        os.utime(tmp_path, (stat.st_atime, stat.st_mtime))  # keep thumbnails fresh
+        os.replace(tmp_path, path)
+        return True
+
+    def sweep(self, now=None):
+        """
+        Apply the retention policy once.
+
+        Returns:
+            dict: Counts of recompressed and deleted files and bytes freed
+        """
+        policy = self.policy
+        now = time.time() if now is None else now
+        conn = self._connection()
+        stats = {"recompressed": 0, "deleted": 0, "freed_bytes": 0}
+
+        if policy.recompress_after_days is not None:
+            rows = conn.execute(
+                "SELECT path FROM evidence WHERE deleted IS NULL AND kind = 'photo' AND NOT legacy "
+                "AND created < ? AND (quality IS NULL OR quality > ?) ORDER BY created LIMIT ?",
+                (now - policy.recompress_after_days * DAY, policy.recompress_quality, policy.batch)
+            ).fetchall()
+            for (relpath,) in rows:
+                try:
+                    if self._recompress(relpath, policy.recompress_quality):
+                        stats["recompressed"] += 1
+                except OSError as e:
+                    print(f"⚠️  Recompression failed ({relpath}): {e}")
+                size = self._size(relpath)
+                with self._write_lock:
+                    conn.execute("UPDATE evidence SET quality = ?, bytes = ? WHERE path = ?",
+                                 (policy.recompress_quality, size, relpath))
+
+        expired = []
+        if policy.max_age_days is not None:
+            expired += conn.execute(
+                "SELECT path, incident_id, bytes FROM evidence WHERE deleted IS NULL AND created < ?",
+                (now - policy.max_age_days * DAY,)
+            ).fetchall()
+        if policy.unlinked_max_age_days is not None:
+            expired += conn.execute(
+                "SELECT path, incident_id, bytes FROM evidence WHERE deleted IS NULL "
+                "AND incident_id IS NULL AND NOT legacy AND created < ?",
+                (now - policy.unlinked_max_age_days * DAY,)
+            ).fetchall()
+        for relpath, incident_id, size in dict.fromkeys(expired):
+            self._delete(relpath, incident_id, now)
+            stats["deleted"] += 1
+            stats["freed_bytes"] += size
+
+        if policy.max_bytes is not None:
+            excess = self.usage()["bytes"] - policy.max_bytes
+            if excess > 0:
+                rows = conn.execute(
+                    "SELECT path, incident_id, bytes FROM evidence WHERE deleted IS NULL "
+                    "ORDER BY incident_id IS NOT NULL, created"
+                )
+                for relpath, incident_id, size in rows.fetchall():
+                    if excess <= 0:
+                        break
+                    self._delete(relpath, incident_id, now)
+                    excess -= size
+                    stats["deleted"] += 1
+                    stats["freed_bytes"] += size
+        return stats
+
+    def _size(self, relpath):
+        try:
+            return os.path.getsize(self.abspath(relpath)) + self._thumbnail_bytes(relpath)
+        except OSError:
+            return 0
+
+    def start_sweeper(self):
+        """Run `sweep()` every `policy.sweep_interval` seconds in the background."""
+        if self._sweeper is not None:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._run_sweeper, name='civiceye-storage', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self, timeout=5.0):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout)
+            self._sweeper = None
+
+    def _run_sweeper(self):
+        while not self._stop.is_set():
+            try:
+                stats = self.sweep()
+                if stats["deleted"] or stats["recompressed"]:
+                    print(f"🧹 Storage sweep: {stats['deleted']} deleted "
+                          f"({stats['freed_bytes'] / 1024 ** 2:.1f} MB), "
+                          f"{stats['recompressed']} recompressed")
+            except Exception as e:
+                print(f"⚠️  Storage sweep failed: {e}")
+            self._stop.wait(self.policy.sweep_interval)
+
+
+def _mark_purged(incident, relpath, now):
+    """Clear an incident's reference to a deleted evidence file."""
+    offender = dict(incident.get('offender') or {})
+    for key in ('photo_url', 'clip_url'):
+        if (offender.get(key) or '').endswith('/database/' + relpath):
+            offender[key] = None
+    offender['files'] = [path for path in offender.get('files') or [] if path != relpath]
+    purged = list(incident.get('evidence_purged') or [])
+    purged.append({"path": relpath, "at": datetime.fromtimestamp(now).isoformat()})
+    return {**incident, 'offender': offender, 'evidence_purged': purged}
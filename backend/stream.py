@@ -0,0 +1,348 @@
+"""
+CivicEye Backend - Shared Frame Pipeline
+A single background producer decodes the video source and runs inference once
+per frame. Every /video_feed viewer subscribes to the latest published frame,
+so adding viewers does not add decode, YOLO or JPEG encoding work.
+
+Decoding runs in its own FrameReader thread that keeps only the newest frames,
+so slow inference drops stale frames instead of building up latency.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+class FrameReader:
+    """
+    Threaded decoder feeding a small "latest wins" queue.
+
+    Video files are paced to their presentation timestamps (PTS) so they play
+    back in real time; live cameras are read as fast as the device delivers.
+    When the consumer falls behind, older frames are discarded and `read()`
+    always returns the newest decoded frame.
+    """
+
+    MAX_LAG = 1.0  # seconds behind schedule before the playback clock resyncs
+
+    def __init__(self, cap, realtime=True, loop=True, max_queue=2):
+        """
+        Args:
+            cap: Opened cv2.VideoCapture
+            realtime: Pace decoding to the stream's PTS (for video files)
+            loop: Rewind to the first frame at end of stream
+            max_queue: Maximum decoded frames held before dropping the oldest
+        """
+        self.cap = cap
+        self.realtime = realtime
+        self.loop = loop
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if 0 < fps <= 240 else 30.0
+
+        self._cond = threading.Condition()
+        self._queue = deque(maxlen=max_queue)
+        self._running = False
+        self._thread = None
+        self.eof = False
+
+        # Counters
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        """Start the decode thread."""
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name='civiceye-reader', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stop the decode thread and release the capture."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.cap.release()
+
+    def read(self, timeout=1.0):
+        """
+        Return the newest decoded frame, discarding any older queued frames.
+
+        Returns:
+            tuple: (pts_seconds, frame) or (None, None) on timeout/end of stream
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._queue or self.eof or not self._running, timeout
+            )
+            if not self._queue:
+                return None, None
+            self.frames_dropped += len(self._queue) - 1
+            item = self._queue.pop()
+            self._queue.clear()
+            return item
+
+    def _push(self, pts, frame):
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.frames_dropped += 1
+            self._queue.append((pts, frame))
+            self.frames_read += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        clock_start = None
+        frame_index = 0
+
+        while self._running:
+            ret, frame = self.cap.read()
+
+            if not ret or frame is None:
+                if not self.loop or frame_index == 0:
+                    break
+                # Loop video if end reached and restart the playback clock
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                clock_start = None
+                frame_index = 0
+                continue
+
+            # Prefer the container PTS; fall back to frame count / FPS
+            pts = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if pts <= 0 and frame_index > 0:
+                pts = frame_index / self.fps
+            frame_index += 1
+
+            if self.realtime:
+                now = time.monotonic()
+                if clock_start is None:
+                    clock_start = now - pts
+                delay = clock_start + pts - now
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -self.MAX_LAG:
+                    clock_start = now - pts
+
+            self._push(pts, frame)
+
+        with self._cond:
+            self.eof = True
+            self._cond.notify_all()
+
+
+class FramePipeline:
+    """
+    Background capture/inference loop with fan-out to any number of viewers.
+
+    The producer calls `process_frame(frame)` for every decoded frame and
+    publishes the returned (annotated) frame under a monotonically increasing
+    sequence number. Viewers block in `wait_for_frame()` / `wait_for_jpeg()`
+    until a newer frame than the one they last saw is available.
+
+    JPEG encoding is done lazily, at most once per sequence number, the first
+    time any viewer asks for that frame; every other viewer gets the cached
+    bytes.
+    """
+
+    def __init__(self, source, process_frame, placeholder_frame=None, jpeg_quality=80,
+                 on_encode=None, reopen_interval=2.0):
+        """
+        Args:
+            source: Camera index or video file path (None = webcam 0)
+            process_frame: Callable(frame) -> annotated frame
+            placeholder_frame: Callable() -> frame shown when no source opens
+            jpeg_quality: JPEG quality used for the shared encoded frame
+            on_encode: Optional Callable(seconds) told how long each JPEG encode took
+            reopen_interval: Seconds between attempts to open a source that
+                failed to open (placeholder frames are shown meanwhile)
+        """
+        self.source = source
+        self.process_frame = process_frame
+        self.placeholder_frame = placeholder_frame
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+        self.on_encode = on_encode
+        self.reopen_interval = reopen_interval
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._running = False
+        self._thread = None
+        self.reader = None
+        self.ended = None  # monotonic time the source ended on its own
+
+        # Encoded-frame cache: (sequence, jpeg bytes) of the last encoded frame
+        self._encode_lock = threading.Lock()
+        self._jpeg_seq = 0
+        self._jpeg = None
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """Start the producer thread (no-op if already running)."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._run, name='civiceye-pipeline', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop the producer thread and wake up all waiting viewers."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    # -------------------------------------------------------------------------
+    # Subscriber API
+    # -------------------------------------------------------------------------
+
+    def latest(self):
+        """Return (sequence, frame) of the most recently published frame."""
+        with self._cond:
+            return self._seq, self._frame
+
+    def wait_for_frame(self, last_seq, timeout=1.0):
+        """
+        Block until a frame newer than `last_seq` is published.
+
+        Returns:
+            tuple: (sequence, frame). The sequence equals `last_seq` if the
+            wait timed out or the pipeline was stopped.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._seq != last_seq or not self._running, timeout
+            )
+            return self._seq, self._frame
+
+    def _encode(self, seq, frame):
+        """Return JPEG bytes for frame `seq`, encoding it only once."""
+        with self._encode_lock:
+            if self._jpeg_seq != seq:
+                started = time.perf_counter()
+                ret, buffer = cv2.imencode('.jpg', frame, self.jpeg_params)
+                if self.on_encode is not None:
+                    self.on_encode(time.perf_counter() - started)
+                if not ret:
+                    return None
+                self._jpeg_seq = seq
+                self._jpeg = buffer.tobytes()
+            return self._jpeg
+
+    def latest_jpeg(self):
+        """Return (sequence, jpeg bytes) of the latest frame, or (0, None)."""
+        seq, frame = self.latest()
+        if frame is None:
+            return 0, None
+        return seq, self._encode(seq, frame)
+
+    def wait_for_jpeg(self, last_seq, timeout=1.0):
+        """
+        Block until a frame newer than `last_seq` is published and return its
+        cached JPEG encoding.
+
+        Returns:
+            tuple: (sequence, jpeg bytes or None)
+        """
+        seq, frame = self.wait_for_frame(last_seq, timeout)
+        if seq == last_seq or frame is None:
+            return last_seq, None
+        return seq, self._encode(seq, frame)
+
+    # -------------------------------------------------------------------------
+    # Producer
+    # -------------------------------------------------------------------------
+
+    def _publish(self, frame):
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def _open_reader(self):
+        source = self.source if self.source is not None else 0
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        # Files are paced to their PTS; live devices/streams pace themselves
+        realtime = isinstance(source, str) and os.path.isfile(source)
+        return FrameReader(cap, realtime=realtime).start()
+
+    def _run_placeholder(self):
+        """
+        Show placeholder frames and keep retrying the source.
+
+        Returns:
+            FrameReader or None: The reader once the source opens, or None if stopped
+        """
+        next_open = time.monotonic() + self.reopen_interval
+        while self._running:
+            if self.placeholder_frame is not None:
+                self._publish(self.placeholder_frame())
+            if time.monotonic() >= next_open:
+                reader = self._open_reader()
+                if reader is not None:
+                    return reader
+                next_open = time.monotonic() + self.reopen_interval
+            time.sleep(0.1)
+        return None
+
+    def _run(self):
+        try:
+            self._run_source()
+        finally:
+            # The source ended (file without loop, camera/stream dropped):
+            # report it so get_pipeline() reopens it, and wake all viewers
+            with self._cond:
+                if self._thread is threading.current_thread():
+                    self._running = False
+                    self.ended = time.monotonic()
+                self._cond.notify_all()
+
+    def _run_source(self):
+        reader = self._open_reader()
+        if reader is None:
+            # Camera down or device not ready yet: retry until it opens
+            reader = self._run_placeholder()
+            if reader is None:
+                return
+        self.reader = reader
+
+        try:
+            while self._running:
+                # Always process the newest decoded frame (stale ones are dropped)
+                pts, frame = reader.read(timeout=0.5)
+                if frame is None:
+                    if reader.eof:
+                        break
+                    continue
+
+                try:
+                    processed = self.process_frame(frame)
+                except Exception as e:
+                    print(f"⚠️  Frame processing error: {e}")
+                    processed = None
+
+                self._publish(processed if processed is not None else frame)
+        finally:
+            reader.stop()
@@ -0,0 +1,140 @@
+"""
+CivicEye Benchmarks - Inference Backends
+Compares CPU inference backends on the demo footage.
+
+Each backend is given as `type:model` (or just a model path, the type is then
+inferred from the extension):
+
+    python benchmarks/backends.py ultralytics:yolov8n.pt onnxruntime:yolov8n.onnx \\
+        openvino:yolov8n_int8_openvino_model --frames 200 --batch 1 --threads 4
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from ai_engine.backends import create_backend
+
+
+def load_frames(paths, count):
+    """Decode up to `count` frames, round-robin across the given videos."""
+    caps = [cv2.VideoCapture(p) for p in paths]
+    frames = []
+    try:
+        while len(frames) < count and caps:
+            for cap in list(caps):
+                ok, frame = cap.read()
+                if not ok:
+                    caps.remove(cap)
+                    continue
+                frames.append(frame)
+                if len(frames) >= count:
+                    break
+    finally:
+        for cap in caps:
+            cap.release()
+    return frames
+
+
+def parse_spec(spec):
+    """'onnxruntime:yolov8n.onnx' -> {'backend': 'onnxruntime', 'model': 'yolov8n.onnx'}"""
+    backend, sep, model = spec.partition(':')
+    if sep and backend in ('ultralytics', 'onnxruntime', 'openvino'):
+        return {'backend': backend, 'model': model}
+    return {'model': spec}
+
+
+def run_backend(config, frames, batch=1, warmup=5):
+    """
+    Time one backend over the frame set.
+
+    Returns:
+        dict: Backend description plus latency/throughput figures
+    """
+    t0 = time.perf_counter()
+    backend = create_backend(config)
+    load_time = time.perf_counter() - t0
+
+    batches = [frames[i:i + batch] for i in range(0, len(frames), batch)]
+    for chunk in batches[:warmup]:
+        backend.predict(chunk)
+
+    latencies = []
+    detections = 0
+    start = time.perf_counter()
+    for chunk in batches:
+        t0 = time.perf_counter()
+        results = backend.predict(chunk)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        detections += sum(len(r) for r in results)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies)
+    return {
+        **backend.describe(),
+        'batch': batch,
+        'frames': len(frames),
+        'load_s': round(load_time, 3),
+        'fps': round(len(frames) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms_mean': round(float(latencies.mean()), 2),
+        'latency_ms_p50': round(float(np.percentile(latencies, 50)), 2),
+        'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2),
+        'detections_per_frame': round(detections / len(frames), 2),
+    }
+
+
+def print_table(rows):
+    columns = ['backend', 'model', 'imgsz', 'threads', 'batch', 'fps',
+               'latency_ms_mean', 'latency_ms_p50', 'latency_ms_p95', 'detections_per_frame']
+    table = [[os.path.basename(str(r.get(c))) if c == 'model' else str(r.get(c)) for c in columns]
+             for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in table)) for i, c in enumerate(columns)]
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in table:
+        print('  '.join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CivicEye inference backends")
+    parser.add_argument('backends', nargs='*', default=['ultralytics:yolov8n.pt'],
+                        help="Backend specs (type:model or model path)")
+    parser.add_argument('--videos', nargs='*',
+                        default=sorted(glob.glob(os.path.join(PROJECT_ROOT, 'assets', 'demo_footage*.mp4'))))
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=1)
+    parser.add_argument('--imgsz', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    frames = load_frames(args.videos, args.frames)
+    if not frames:
+        print("❌ No frames decoded from", args.videos)
+        return 1
+    print(f"🎞️  {len(frames)} frames from {len(args.videos)} video(s)")
+
+    rows = []
+    for spec in args.backends:
+        config = {**parse_spec(spec), 'imgsz': args.imgsz, 'threads': args.threads}
+        print(f"⏱️  {spec} ...")
+        rows.append(run_backend(config, frames, batch=args.batch))
+
+    print()
+    print_table(rows)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+CivicEye Benchmarks - Detection Pipeline
+End-to-end throughput and per-stage latency of the detection pipeline on the
+demo footage: decode, LitterMonitor.detect_frame() stages (history, motion
+gate, inference, parsing, tracking, annotation) and the JPEG encode done for
+streaming. Results are printed and optionally written as JSON for diffing.
+
+    python benchmarks/pipeline.py --frames 300 --model yolov8n.onnx --json run.json
+    python benchmarks/pipeline.py --tracker-only --objects 64 --frames 5000
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from ai_engine.detector import LitterMonitor
+
+
+def summarize(seconds):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    if not len(seconds):
+        return {'count': 0}
+    ms = np.asarray(seconds, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'count': int(len(ms)),
+        'mean': round(float(ms.mean()), 3),
+        'p50': round(float(p50), 3),
+        'p95': round(float(p95), 3),
+        'p99': round(float(p99), 3),
+        'max': round(float(ms.max()), 3),
+    }
+
+
+def peak_rss_bytes():
+    """Process memory high-water mark."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def bench_pipeline(videos, frames, inference, motion_gate=True, jpeg_quality=80):
+    """
+    Run the full per-frame pipeline over the videos (one after another).
+
+    Returns:
+        dict: Throughput, per-stage latency summaries and memory figures
+    """
+    from ai_engine.backends import create_backend
+
+    backend = create_backend(inference)
+    monitor = LitterMonitor(detector=lambda frame: backend.predict([frame])[0],
+                            motion_options={'enabled': motion_gate})
+    jpeg_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+
+    stages = {name: [] for name in ('decode',) + LitterMonitor.STAGES + ('jpeg_encode',)}
+    totals = []
+    processed = 0
+    offset = 0.0  # keeps PTS increasing across files
+    started = time.perf_counter()
+
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        last_pts = 0.0
+        while processed < frames:
+            t0 = time.perf_counter()
+            ok, frame = cap.read()
+            decode = time.perf_counter() - t0
+            if not ok:
+                break
+            last_pts = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+            annotated, _ = monitor.detect_frame(frame, offset + last_pts)
+
+            t1 = time.perf_counter()
+            cv2.imencode('.jpg', annotated, jpeg_params)
+            encode = time.perf_counter() - t1
+
+            stages['decode'].append(decode)
+            for name, value in monitor.timings.items():
+                if name != 'inference' or monitor.last_inferred:
+                    stages[name].append(value)
+            stages['jpeg_encode'].append(encode)
+            totals.append(time.perf_counter() - t0)
+            processed += 1
+        cap.release()
+        offset += last_pts + 1.0
+        if processed >= frames:
+            break
+
+    elapsed = time.perf_counter() - started
+    return {
+        'benchmark': 'pipeline',
+        'backend': backend.describe(),
+        'videos': [os.path.relpath(v, PROJECT_ROOT) for v in videos],
+        'motion_gate': motion_gate,
+        'frames': processed,
+        'seconds': round(elapsed, 3),
+        'fps': round(processed / elapsed, 2) if elapsed else 0.0,
+        'inferred_frames': monitor.motion_gate.frames_inferred,
+        'latency_ms': summarize(totals),
+        'stages_ms': {name: summarize(values) for name, values in stages.items()},
+        'memory': {
+            'peak_rss_bytes': peak_rss_bytes(),
+            'frame_buffer_bytes': monitor.frame_buffer.nbytes,
+            'frame_buffer_capacity': monitor.frame_buffer.capacity,
+            'live_tracks': len(monitor.tracker),
+        },
+    }
+
+
+def synthetic_detections(frames, objects, width=1280, height=720, fps=30.0, seed=0):
+    """
+    Yield (timestamp, detections) for synthetic scenes: a few walking people
+    and `objects` litter items, half of them static and half drifting, with
+    some of them dropping out for a frame now and then.
+    """
+    rng = np.random.default_rng(seed)
+    people = max(1, objects // 8)
+    pos = rng.uniform([0, 0], [width, height], size=(people + objects, 2)).astype(np.float32)
+    vel = rng.normal(0, 3, size=pos.shape).astype(np.float32)
+    vel[people:people + objects // 2] = 0  # static litter
+    size = np.where(np.arange(len(pos))[:, None] < people, [60, 160], [20, 30]).astype(np.float32)
+    cls = np.concatenate([np.zeros(people), np.full(objects, 39)]).astype(np.float32)
+    conf = np.full(len(pos), 0.9, dtype=np.float32)
+
+    for i in range(frames):
+        pos += vel
+        np.clip(pos, 0, [width, height], out=pos)
+        jitter = rng.normal(0, 0.5, size=pos.shape).astype(np.float32)
+        centers = pos + jitter
+        dets = np.column_stack([centers - size / 2, centers + size / 2, conf, cls])
+        visible = rng.random(len(dets)) > 0.05
+        yield i / fps, dets[visible]
+
+
+def bench_tracker(frames, objects):
+    """Benchmark tracking + state machine alone on synthetic detections."""
+    monitor = LitterMonitor(detector=lambda frame: None)
+    data = list(synthetic_detections(frames, objects))
+
+    parse, tracking, totals = [], [], []
+    started = time.perf_counter()
+    for ts, dets in data:
+        t0 = time.perf_counter()
+        monitor.update(dets, ts)
+        totals.append(time.perf_counter() - t0)
+        parse.append(monitor.timings['parse'])
+        tracking.append(monitor.timings['tracking'])
+    elapsed = time.perf_counter() - started
+
+    return {
+        'benchmark': 'tracker',
+        'objects': objects,
+        'frames': frames,
+        'seconds': round(elapsed, 3),
+        'fps': round(frames / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': summarize(totals),
+        'stages_ms': {'parse': summarize(parse), 'tracking': summarize(tracking)},
+        'memory': {
+            'peak_rss_bytes': peak_rss_bytes(),
+            'live_tracks': len(monitor.tracker),
+            'tracks_created': monitor.tracker.tracks_created,
+        },
+    }
+
+
+def print_report(result):
+    print(f"\n📊 {result['benchmark']}: {result['frames']} frames, {result['fps']} FPS")
+    print(f"{'stage':<12} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    rows = list(result['stages_ms'].items()) + [('total', result['latency_ms'])]
+    for name, s in rows:
+        if not s['count']:
+            continue
+        print(f"{name:<12} {s['count']:>6} {s['mean']:>9.3f} {s['p50']:>9.3f} "
+              f"{s['p95']:>9.3f} {s['p99']:>9.3f} {s['max']:>9.3f}")
+    for key, value in result['memory'].items():
+        if key.endswith('bytes'):
+            value = f"{value / 1024 / 1024:.1f} MB"
+        print(f"   {key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CivicEye detection pipeline")
+    parser.add_argument('--videos', nargs='*',
+                        default=sorted(glob.glob(os.path.join(PROJECT_ROOT, 'assets', 'demo_footage*.mp4'))))
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--model', default='yolov8n.pt')
+    parser.add_argument('--backend', help="ultralytics | onnxruntime | openvino (default: from model)")
+    parser.add_argument('--imgsz', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--no-motion-gate', action='store_true', help="Run the model on every frame")
+    parser.add_argument('--tracker-only', action='store_true',
+                        help="Benchmark tracking on synthetic detections (no video, no model)")
+    parser.add_argument('--objects', type=int, default=32, help="Synthetic litter objects per frame")
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.tracker_only:
+        result = bench_tracker(args.frames, args.objects)
+    else:
+        if not args.videos:
+            print("❌ No input videos")
+            return 1
+        inference = {'model': args.model, 'backend': args.backend,
+                     'imgsz': args.imgsz, 'threads': args.threads}
+        result = bench_pipeline(args.videos, args.frames, inference,
+                                motion_gate=not args.no_motion_gate)
+    result['environment'] = environment()
+
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,8 +9,9 @@
 
 const CONFIG = {
     API_BASE: 'http://localhost:5000',
-    POLL_INTERVAL: 500,  // ms
-    LOG_REFRESH_INTERVAL: 5000  // ms
+    POLL_INTERVAL: 500,  // ms (fallback when the event stream is unavailable)
+    LOG_REFRESH_INTERVAL: 5000,  // ms
+    LOG_PAGE_SIZE: 100  // incidents loaded on first fetch
 };
 
 // =============================================================================
@@ -19,7 +20,16 @@ const CONFIG = {
 
 let currentState = null;
 let pollInterval = null;
+let eventSource = null;
+let lastStatus = {};
+let alertDeadline = null;  // ms timestamp when the active alert auto-resets
 let logRefreshInterval = null;
+let incidentLog = [];    // loaded incidents, newest first
+let logCursor = null;    // id of the newest loaded incident (next `since`)
+let logLoaded = false;
+let logDay = null;       // local date the "today" count was loaded for
+let logTotal = 0;
+let logToday = 0;
 let currentTab = 'monitoring';
 
 // =============================================================================
@@ -106,11 +116,13 @@ function init() {
 
     // Start clock
     updateClock();
-    setInterval(updateClock, 1000);
+    setInterval(() => {
+        updateClock();
+        updateTimeoutDisplay();
+    }, 1000);
 
-    // Start status polling
-    pollInterval = setInterval(fetchStatus, CONFIG.POLL_INTERVAL);
-    fetchStatus();
+    // Subscribe to pushed status events (polling only as a fallback)
+    startStatusUpdates();
 
     // Start log refresh
     logRefreshInterval = setInterval(fetchLogs, CONFIG.LOG_REFRESH_INTERVAL);
@@ -242,56 +254,168 @@ function updateClock() {
 // API COMMUNICATION
 // =============================================================================
 
+function startStatusUpdates() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    // The browser reconnects by itself and resumes with Last-Event-ID
+    eventSource = new EventSource(`${CONFIG.API_BASE}/events`);
+    const onEvent = (event) => applyStatus(JSON.parse(event.data));
+    eventSource.addEventListener('snapshot', onEvent);
+    eventSource.addEventListener('state', onEvent);
+    eventSource.addEventListener('config', onEvent);
+    eventSource.addEventListener('incident', fetchLogs);
+
+    eventSource.onopen = () => stopPolling();
+    eventSource.onerror = () => {
+        // Poll while the stream is down
+        showConnectionError();
+        startPolling();
+    };
+}
+
+function startPolling() {
+    if (pollInterval) return;
+    pollInterval = setInterval(fetchStatus, CONFIG.POLL_INTERVAL);
+    fetchStatus();
+}
+
+function stopPolling() {
+    if (pollInterval) {
+        clearInterval(pollInterval);
+        pollInterval = null;
+    }
+}
+
 async function fetchStatus() {
     try {
         const response = await fetch(`${CONFIG.API_BASE}/status`);
-        const data = await response.json();
+        applyStatus(await response.json());
+    } catch (error) {
+        console.error('Status fetch error:', error);
+        showConnectionError();
+    }
+}
 
-        updateStatusDisplay(data);
-        updateDisplayPreview(data);
+function showConnectionError() {
+    elements.statusText.textContent = 'CONNECTION ERROR';
+    elements.statusIndicator.className = 'status-dot';
+    elements.statusIndicator.style.background = '#ff3366';
+}
 
-        if (data.state !== currentState) {
-            handleStateChange(data.state, data.offender_details);
-        }
+function applyStatus(update) {
+    // Events carry only the fields that changed; merge into the last full status
+    const data = { ...lastStatus, ...update };
+    lastStatus = data;
 
-        // Update timeout display
-        if (data.timeout_remaining !== null) {
-            elements.alertTimeout.textContent = `${Math.ceil(data.timeout_remaining)}s`;
-            if (elements.previewCountdown) {
-                elements.previewCountdown.textContent = Math.ceil(data.timeout_remaining);
-            }
-        }
+    updateStatusDisplay(data);
+    updateDisplayPreview(data);
 
-        // Update custom messages in textareas
-        if (data.custom_messages) {
-            if (elements.messageWarning.value === '' || !elements.messageWarning.dataset.edited) {
-                elements.messageWarning.value = data.custom_messages.warning;
-            }
-            if (elements.messageShaming.value === '' || !elements.messageShaming.dataset.edited) {
-                elements.messageShaming.value = data.custom_messages.shaming;
-            }
-            if (elements.messageFine.value === '' || !elements.messageFine.dataset.edited) {
-                elements.messageFine.value = data.custom_messages.fine;
-            }
+    if (data.state !== currentState) {
+        handleStateChange(data.state, data.offender_details);
+    } else if (update.offender_details && currentState !== 'IDLE') {
+        // Same alert, new details (e.g. the evidence photo has been saved)
+        showSuspect(update.offender_details);
+    }
+
+    // Track the alert deadline locally so the countdown ticks between events
+    if ('timeout_remaining' in update) {
+        alertDeadline = update.timeout_remaining !== null
+            ? Date.now() + update.timeout_remaining * 1000
+            : null;
+        updateTimeoutDisplay();
+    }
+
+    // Update custom messages in textareas
+    if (data.custom_messages) {
+        if (elements.messageWarning.value === '' || !elements.messageWarning.dataset.edited) {
+            elements.messageWarning.value = data.custom_messages.warning;
+        }
+        if (elements.messageShaming.value === '' || !elements.messageShaming.dataset.edited) {
+            elements.messageShaming.value = data.custom_messages.shaming;
         }
+        if (elements.messageFine.value === '' || !elements.messageFine.dataset.edited) {
+            elements.messageFine.value = data.custom_messages.fine;
+        }
+    }
+}
 
-    } catch (error) {
-        console.error('Status fetch error:', error);
-        elements.statusText.textContent = 'CONNECTION ERROR';
-        elements.statusIndicator.className = 'status-dot';
-        elements.statusIndicator.style.background = '#ff3366';
+function updateTimeoutDisplay() {
+    if (alertDeadline === null) return;
+    const remaining = Math.max(0, Math.ceil((alertDeadline - Date.now()) / 1000));
+    elements.alertTimeout.textContent = `${remaining}s`;
+    if (elements.previewCountdown) {
+        elements.previewCountdown.textContent = remaining;
+    }
+}
+
+function localMidnight() {
+    const d = new Date();
+    const pad = (n) => String(n).padStart(2, '0');
+    return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}T00:00:00`;
+}
+
+async function getLogs(params) {
+    // no-cache: the browser revalidates with If-None-Match, so unchanged pages cost a 304
+    const response = await fetch(`${CONFIG.API_BASE}/get_logs?${new URLSearchParams(params)}`,
+        { cache: 'no-cache' });
+    if (!response.ok) {
+        const error = new Error(`get_logs failed: ${response.status}`);
+        error.status = response.status;
+        throw error;
     }
+    return response.json();
+}
+
+async function loadLogs() {
+    // Latest page plus today's count; older history is not re-downloaded
+    const [page, today] = await Promise.all([
+        getLogs({ limit: CONFIG.LOG_PAGE_SIZE }),
+        getLogs({ start: localMidnight(), limit: 0 })
+    ]);
+    incidentLog = page.incidents;
+    logCursor = page.cursor;
+    logTotal = page.total;
+    logToday = today.total;
+    logDay = new Date().toDateString();
+    logLoaded = true;
+}
+
+async function fetchNewLogs() {
+    // Follow the cursor until caught up; only incidents newer than it are sent
+    const today = new Date().toDateString();
+    const known = new Set(incidentLog.map(inc => inc.id));
+    let page;
+    do {
+        page = await getLogs(logCursor ? { since: logCursor } : { order: 'asc' });
+        const fresh = page.incidents.filter(inc => !known.has(inc.id));
+        fresh.forEach(inc => known.add(inc.id));
+        incidentLog = fresh.reverse().concat(incidentLog).slice(0, CONFIG.LOG_PAGE_SIZE);
+        logTotal += fresh.length;
+        logToday += fresh.filter(inc => new Date(inc.timestamp).toDateString() === today).length;
+        logCursor = page.cursor;
+    } while (page.has_more);
 }
 
 async function fetchLogs() {
     try {
-        const response = await fetch(`${CONFIG.API_BASE}/get_logs`);
-        const data = await response.json();
+        if (!logLoaded || logDay !== new Date().toDateString()) {
+            await loadLogs();
+        } else {
+            try {
+                await fetchNewLogs();
+            } catch (error) {
+                if (error.status !== 404) throw error;
+                await loadLogs();  // cursor no longer exists (log was reset)
+            }
+        }
 
-        updateLogDisplay(data.incidents);
-        updateRecentAlerts(data.incidents);
-        updateSentMessages(data.incidents);
-        updateStats(data.incidents);
+        updateLogDisplay(incidentLog);
+        updateRecentAlerts(incidentLog);
+        updateSentMessages(incidentLog);
+        updateStats(incidentLog);
 
     } catch (error) {
         console.error('Log fetch error:', error);
@@ -450,6 +574,15 @@ async function toggleSurveillance() {
 // STATE HANDLING
 // =============================================================================
 
+/**
+ * Ask the server for a thumbnail of captured evidence images
+ * (other photo URLs are returned unchanged).
+ */
+function thumbnailUrl(url, width) {
+    if (!url || !url.includes('/database/captured/')) return url;
+    return `${url}${url.includes('?') ? '&' : '?'}w=${width}`;
+}
+
 function handleStateChange(newState, offenderDetails) {
     console.log(`State change: ${currentState} -> ${newState}`);
     currentState = newState;
@@ -502,9 +635,7 @@ function showAlert(offenderDetails) {
 
     // Update suspect info
     if (offenderDetails) {
-        elements.suspectPhoto.src = offenderDetails.photo_url || 'https://via.placeholder.com/70?text=?';
-        elements.suspectId.textContent = offenderDetails.id || 'UNKNOWN';
-        elements.suspectName.textContent = offenderDetails.name || 'Unknown Citizen';
+        showSuspect(offenderDetails);
     }
 
     // Update pending count
@@ -514,6 +645,15 @@ function showAlert(offenderDetails) {
     playAlertSound();
 }
 
+function showSuspect(offenderDetails) {
+    const photoUrl = thumbnailUrl(offenderDetails.photo_url, 160) || 'https://via.placeholder.com/70?text=?';
+    if (elements.suspectPhoto.getAttribute('src') !== photoUrl) {
+        elements.suspectPhoto.src = photoUrl;
+    }
+    elements.suspectId.textContent = offenderDetails.id || 'UNKNOWN';
+    elements.suspectName.textContent = offenderDetails.match?.name || offenderDetails.name || 'Unknown Citizen';
+}
+
 function hideAlert() {
     elements.alertPanel.classList.remove('has-alert');
     elements.noAlerts.classList.remove('hidden');
@@ -566,7 +706,7 @@ function updateDisplayPreview(data) {
         case 'SHAMING':
             elements.displayShaming.classList.add('active');
             if (data.offender_details) {
-                elements.previewOffenderPhoto.src = data.offender_details.photo_url || 'https://via.placeholder.com/150?text=?';
+                elements.previewOffenderPhoto.src = thumbnailUrl(data.offender_details.photo_url, 320) || 'https://via.placeholder.com/150?text=?';
             }
             if (data.custom_messages) {
                 elements.previewShamingText.textContent = data.custom_messages.shaming;
@@ -594,8 +734,11 @@ function updateRecentAlerts(incidents) {
     let html = '';
     for (const incident of sorted) {
         const time = new Date(incident.timestamp).toLocaleTimeString();
-        const citizenId = incident.offender?.id || 'UNKNOWN';
-        const photoUrl = incident.offender?.photo_url || 'https://via.placeholder.com/60?text=?';
+        const citizenId = incident.offender?.match?.id || incident.offender?.id || 'UNKNOWN';
+        const photoUrl = thumbnailUrl(incident.offender?.photo_url, 160) || 'https://via.placeholder.com/60?text=?';
+        const clipLink = incident.offender?.clip_url
+            ? ` · <a href="${incident.offender.clip_url}" target="_blank">▶ Clip</a>`
+            : '';
 
         html += `
             <div class="alert-card">
@@ -605,7 +748,7 @@ function updateRecentAlerts(incidents) {
                         <span class="alert-card-id">${citizenId}</span>
                         <span class="alert-card-time">${time}</span>
                     </div>
-                    <div class="alert-card-type">Littering Incident</div>
+                    <div class="alert-card-type">Littering Incident${clipLink}</div>
                 </div>
             </div>
         `;
@@ -633,7 +776,7 @@ function updateSentMessages(incidents) {
     confirmed.forEach(incident => {
         const time = new Date(incident.timestamp).toLocaleTimeString();
         const date = new Date(incident.timestamp).toDateString();
-        const photoUrl = incident.offender?.photo_url || 'https://via.placeholder.com/60';
+        const photoUrl = thumbnailUrl(incident.offender?.photo_url, 160) || 'https://via.placeholder.com/60';
         const location = "Sector 7-G (Main Gate)"; // Hardcoded for now as per context
 
         html += `
@@ -711,7 +854,7 @@ function updateLogDisplay(incidents) {
     let html = '';
     for (const incident of sortedIncidents.slice(0, 10)) {
         const time = new Date(incident.timestamp).toLocaleTimeString();
-        const citizenId = incident.offender?.id || 'UNKNOWN';
+        const citizenId = incident.offender?.match?.id || incident.offender?.id || 'UNKNOWN';
         const status = incident.status || 'CONFIRMED';
 
         html += `
@@ -730,15 +873,9 @@ function updateLogDisplay(incidents) {
 function updateStats(incidents) {
     if (!incidents) return;
 
-    // Count today's incidents
-    const today = new Date().toDateString();
-    const todayIncidents = incidents.filter(inc => {
-        const incDate = new Date(inc.timestamp).toDateString();
-        return incDate === today;
-    });
-
-    elements.alertsToday.textContent = todayIncidents.length;
-    elements.confirmedViolations.textContent = incidents.length;
+    // Counts come from the server totals, not just the loaded page
+    elements.alertsToday.textContent = logToday;
+    elements.confirmedViolations.textContent = logTotal;
 }
 
 // =============================================================================
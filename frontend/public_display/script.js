@@ -1,6 +1,6 @@
 /**
  * CivicEye Public Display - JavaScript Controller
- * Handles state polling, audio management, and UI updates
+ * Handles pushed state events (polling fallback), audio management, and UI updates
  */
 
 // =============================================================================
@@ -9,7 +9,7 @@
 
 const CONFIG = {
     API_BASE: 'http://localhost:5000',
-    POLL_INTERVAL: 500,  // ms
+    POLL_INTERVAL: 500,  // ms (fallback when the event stream is unavailable)
     WARNING_DURATION: 30  // seconds
 };
 
@@ -21,6 +21,8 @@ let currentState = 'IDLE';
 let audioContext = null;
 let sirenAudio = null;
 let pollInterval = null;
+let eventSource = null;
+let warningDeadline = null;  // ms timestamp when the warning auto-resets
 let warningCountdown = CONFIG.WARNING_DURATION;
 let countdownInterval = null;
 
@@ -55,7 +57,10 @@ function init() {
 
     // Start clock
     updateClock();
-    setInterval(updateClock, 1000);
+    setInterval(() => {
+        updateClock();
+        updateWarningCountdown();
+    }, 1000);
 }
 
 function initializeSystem() {
@@ -85,8 +90,8 @@ function initializeSystem() {
     elements.initOverlay.classList.add('hidden');
     elements.mainDisplay.classList.remove('hidden');
 
-    // Start polling for status
-    startPolling();
+    // Subscribe to pushed status events (polling only as a fallback)
+    startStatusUpdates();
 
     console.log('CivicEye Public Display initialized');
 }
@@ -114,39 +119,84 @@ function updateClock() {
 }
 
 // =============================================================================
-// Status Polling
+// Status Updates
 // =============================================================================
 
+function startStatusUpdates() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    // The browser reconnects by itself and resumes with Last-Event-ID
+    eventSource = new EventSource(`${CONFIG.API_BASE}/events`);
+    const onEvent = (event) => applyStatus(JSON.parse(event.data));
+    eventSource.addEventListener('snapshot', onEvent);
+    eventSource.addEventListener('state', onEvent);
+
+    eventSource.onopen = () => stopPolling();
+    eventSource.onerror = () => startPolling();  // Poll while the stream is down
+}
+
 function startPolling() {
+    if (pollInterval) return;
     pollInterval = setInterval(fetchStatus, CONFIG.POLL_INTERVAL);
     fetchStatus(); // Initial fetch
 }
 
+function stopPolling() {
+    if (pollInterval) {
+        clearInterval(pollInterval);
+        pollInterval = null;
+    }
+}
+
 async function fetchStatus() {
     try {
         const response = await fetch(`${CONFIG.API_BASE}/status`);
-        const data = await response.json();
-
-        if (data.state !== currentState) {
-            handleStateChange(data.state, data.offender_details);
-        }
-
-        // Update timeout countdown if in WARNING
-        if (data.state === 'WARNING' && data.timeout_remaining !== null) {
-            warningCountdown = Math.ceil(data.timeout_remaining);
-            elements.warningCountdown.textContent = warningCountdown;
-        }
-
+        applyStatus(await response.json());
     } catch (error) {
         console.error('Status fetch error:', error);
         // Continue polling even on error
     }
 }
 
+function applyStatus(data) {
+    if (data.state !== currentState) {
+        handleStateChange(data.state, data.offender_details);
+    } else if (data.state === 'SHAMING' && data.offender_details) {
+        // Same violation, new details (e.g. the evidence photo has been saved)
+        showOffender(data.offender_details);
+    }
+
+    // Track the warning deadline locally so the countdown ticks between events
+    if (data.state === 'WARNING' && data.timeout_remaining !== null) {
+        warningDeadline = Date.now() + data.timeout_remaining * 1000;
+        updateWarningCountdown();
+    } else if (data.state) {
+        warningDeadline = null;
+    }
+}
+
+function updateWarningCountdown() {
+    if (warningDeadline === null) return;
+    warningCountdown = Math.max(0, Math.ceil((warningDeadline - Date.now()) / 1000));
+    elements.warningCountdown.textContent = warningCountdown;
+}
+
 // =============================================================================
 // State Handling
 // =============================================================================
 
+/**
+ * Ask the server for a thumbnail of captured evidence images
+ * (other photo URLs are returned unchanged).
+ */
+function thumbnailUrl(url, width) {
+    if (!url || !url.includes('/database/captured/')) return url;
+    return `${url}${url.includes('?') ? '&' : '?'}w=${width}`;
+}
+
 function handleStateChange(newState, offenderDetails) {
     console.log(`State change: ${currentState} -> ${newState}`);
 
@@ -229,8 +279,7 @@ function activateShamingMode(offenderDetails) {
 
     // Update offender details
     if (offenderDetails) {
-        elements.offenderPhoto.src = offenderDetails.photo_url || 'https://via.placeholder.com/150?text=OFFENDER';
-        elements.offenderId.textContent = offenderDetails.id || 'CIV-XXX';
+        showOffender(offenderDetails);
     }
 
     // Show shaming content
@@ -242,6 +291,14 @@ function activateShamingMode(offenderDetails) {
     console.log('SHAMING mode activated', offenderDetails);
 }
 
+function showOffender(offenderDetails) {
+    const photoUrl = thumbnailUrl(offenderDetails.photo_url, 320) || 'https://via.placeholder.com/150?text=OFFENDER';
+    if (elements.offenderPhoto.getAttribute('src') !== photoUrl) {
+        elements.offenderPhoto.src = photoUrl;
+    }
+    elements.offenderId.textContent = offenderDetails.id || 'CIV-XXX';
+}
+
 // =============================================================================
 // Audio Management
 // =============================================================================
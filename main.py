@@ -5,6 +5,7 @@ Single script to run the entire surveillance system
 
 import os
 import sys
+import json
 import time
 import threading
 import webbrowser
@@ -89,27 +90,78 @@ def get_video_source():
     return None
 
 
-def run_server(video_source):
+def load_config(config_path=None):
+    """
+    Load optional multi-camera / inference configuration from cameras.json
+    in the project root.
+    
+    Args:
+        config_path: Config file to read instead of PROJECT_ROOT/cameras.json
+    
+    Returns:
+        dict: {"cameras": [{"id", "source", "name", "location"}, ...],
+               "inference": {...}, "storage": {...}} or an empty dict if there is no config file
+    """
+    config_path = config_path or os.path.join(PROJECT_ROOT, 'cameras.json')
+    if not os.path.exists(config_path):
+        return {}
+    
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    
+    cameras = []
+    for entry in config.get('cameras', []):
+        source = entry.get('source')
+        # Relative file paths are relative to the project root
+        if isinstance(source, str) and not os.path.isabs(source) and '://' not in source:
+            source = os.path.join(PROJECT_ROOT, source)
+        cameras.append({**entry, 'source': source})
+    config['cameras'] = cameras
+    
+    # Relative model paths are relative to the project root too
+    inference = config.get('inference') or {}
+    model = inference.get('model')
+    if model and not os.path.isabs(model) and os.path.exists(os.path.join(PROJECT_ROOT, model)):
+        inference['model'] = os.path.join(PROJECT_ROOT, model)
+    config['inference'] = inference
+    
+    print(f"📹 Loaded {len(cameras)} camera(s) from {config_path}")
+    return config
+
+
+def run_server(video_source, cameras=None, inference=None, storage=None):
     """Run the Flask server."""
-    from backend.app import app, init_detector, set_video_source
+    from backend.app import (app, init_detector, set_video_source, configure_cameras,
+                             configure_storage, start_cameras)
+    
+    # Register cameras before loading the model so batching knows the stream count
+    if cameras:
+        configure_cameras(cameras)
+    else:
+        set_video_source(video_source)
     
     # Initialize detector
     print("🔧 Loading YOLOv8 model...")
     try:
-        init_detector()
+        init_detector(backend_config=inference)
         print("✅ AI detector initialized")
     except Exception as e:
         print(f"⚠️  Detector init warning: {e}")
         print("   (System will run with placeholder detection)")
     
-    # Set video source
-    set_video_source(video_source)
+    # Evidence retention sweeper
+    configure_storage(storage)
+    
+    # Monitor every camera from startup, not only the ones being viewed
+    start_cameras()
     
     # Run Flask
     print("\n🚀 Starting CivicEye server...")
     print("=" * 60)
     print(f"   API Server:        http://localhost:5000")
     print(f"   Video Feed:        http://localhost:5000/video_feed")
+    print(f"   Snapshot:          http://localhost:5000/snapshot")
+    print(f"   Cameras:           http://localhost:5000/cameras")
     print(f"   Status Endpoint:   http://localhost:5000/status")
     print("=" * 60)
     print("\n📂 Frontend Files:")
@@ -152,8 +204,10 @@ def main():
         sys.exit(1)
     print("✅ All dependencies found\n")
     
-    # Get video source
-    video_source = get_video_source()
+    # Get video source(s)
+    config = load_config()
+    cameras = config.get('cameras')
+    video_source = None if cameras else get_video_source()
     
     # Option to auto-open browsers
     auto_open = input("\n🌐 Auto-open frontend in browser? [Y/n]: ").strip().lower()
@@ -163,7 +217,7 @@ def main():
     
     # Run server
     try:
-        run_server(video_source)
+        run_server(video_source, cameras, config.get('inference'), config.get('storage'))
     except KeyboardInterrupt:
         print("\n\n👋 CivicEye shutting down. Goodbye!")
         sys.exit(0)
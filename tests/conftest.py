@@ -0,0 +1,10 @@
+"""
+CivicEye - Test Configuration
+Makes the project packages (ai_engine, backend) importable from tests/.
+"""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
@@ -0,0 +1,52 @@
+"""
+CivicEye Tests - Event Bus
+Last-Event-ID resolution for Server-Sent Events resume.
+"""
+
+from backend.events import EventBus
+
+
+def test_resolve_resumes_after_a_known_event():
+    bus = EventBus(history=8)
+    first = bus.publish("state", {"n": 1})
+    bus.publish("state", {"n": 2})
+    assert bus.resolve(first.id) == first.seq
+    assert [e.data["n"] for e in bus.wait(bus.resolve(first.id), timeout=0)] == [2]
+
+
+def test_resolve_accepts_the_latest_event():
+    bus = EventBus(history=8)
+    last = bus.publish("state", {})
+    assert bus.resolve(last.id) == last.seq
+    assert bus.wait(last.seq, timeout=0) == []
+
+
+def test_resolve_rejects_missing_or_malformed_ids():
+    bus = EventBus()
+    bus.publish("state", {})
+    assert bus.resolve(None) is None
+    assert bus.resolve("") is None
+    assert bus.resolve(f"{bus.boot}-abc") is None
+    assert bus.resolve(f"{bus.boot}-99") is None  # from the future
+
+
+def test_resolve_rejects_ids_from_another_run():
+    bus = EventBus()
+    bus.publish("state", {})
+    assert bus.resolve("0-1") is None
+
+
+def test_resolve_rejects_ids_that_left_the_ring():
+    bus = EventBus(history=3)
+    events = [bus.publish("state", {"n": i}) for i in range(6)]
+    assert bus.resolve(events[0].id) is None
+    # The event just before the oldest kept one can still resume without gaps
+    assert bus.resolve(events[2].id) == events[2].seq
+
+
+def test_snapshot_is_positioned_at_the_current_sequence():
+    bus = EventBus()
+    bus.publish("state", {})
+    snapshot = bus.snapshot("snapshot", lambda: {"ok": True})
+    assert snapshot.seq == bus.last_seq
+    assert bus.resolve(snapshot.id) == snapshot.seq
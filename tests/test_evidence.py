@@ -0,0 +1,55 @@
+"""
+CivicEye Tests - Evidence Writer
+Background writes, thumbnails, the saved handoff and queue back-pressure.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from backend.evidence import EvidenceJob, EvidenceWriter, thumbnail_path
+
+
+def frame(width=800, height=600):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+def test_writes_image_thumbnails_and_calls_handoff(tmp_path):
+    path = str(tmp_path / "captured" / "violator.jpg")
+    saved = []
+    writer = EvidenceWriter(thumbnail_widths=(160, 320, 1000), fsync='never').start()
+    try:
+        assert writer.submit(EvidenceJob(frame(), path, 'cam0',
+                                         on_saved=lambda job, paths: saved.append(paths)))
+        writer.flush()
+    finally:
+        writer.stop()
+
+    assert os.path.isfile(path)
+    assert not os.path.exists(f"{path}.tmp")
+    assert os.path.isfile(thumbnail_path(path, 160))
+    assert os.path.isfile(thumbnail_path(path, 320))
+    assert not os.path.exists(thumbnail_path(path, 1000))  # never upscaled
+    assert saved == [{'image': path, 160: thumbnail_path(path, 160), 320: thumbnail_path(path, 320)}]
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    release = threading.Event()
+    writer = EvidenceWriter(max_queue=1, fsync='never').start()
+    try:
+        blocker = EvidenceJob(frame(), str(tmp_path / "a.jpg"), on_saved=lambda *_: release.wait(5))
+        assert writer.submit(blocker)
+        # Wait until the worker holds the blocker, so the queue itself is empty
+        while writer.pending:
+            pass
+        assert writer.submit(EvidenceJob(frame(), str(tmp_path / "b.jpg")))
+        assert not writer.submit(EvidenceJob(frame(), str(tmp_path / "c.jpg")))
+        release.set()
+        writer.flush()
+    finally:
+        release.set()
+        writer.stop()
+
+    assert os.path.isfile(tmp_path / "b.jpg")
+    assert not os.path.exists(tmp_path / "c.jpg")
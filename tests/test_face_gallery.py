@@ -0,0 +1,94 @@
+"""
+CivicEye Tests - Face Gallery
+Save/load round trip, incremental rebuilds and top-k cosine search.
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from ai_engine.face_recog import FaceGallery
+
+
+class FakeEmbedder:
+    """Embeds a photo by its pixel value; values without a vector have no face."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    def embed(self, image, max_faces=None):
+        value = int(image[0, 0, 0])
+        self.calls.append(value)
+        if value not in self.vectors:
+            return np.empty((0, 15), np.float32), np.empty((0, 0), np.float32)
+        return np.zeros((1, 15), np.float32), self.vectors[value][None, :]
+
+
+def unit(*values):
+    v = np.asarray(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+@pytest.fixture
+def photos(tmp_path):
+    entries = []
+    for value, name in ((1, "a"), (2, "b"), (3, "no_face")):
+        path = str(tmp_path / f"{name}.jpg")
+        cv2.imwrite(path, np.full((8, 8, 3), value, dtype=np.uint8))
+        entries.append((f"CIV-{name}", path))
+    return entries
+
+
+@pytest.fixture
+def embedder():
+    return FakeEmbedder({1: unit(1, 0, 0, 0), 2: unit(0, 1, 0, 0)})
+
+
+def test_save_load_round_trip(tmp_path, photos, embedder):
+    gallery, embedded = FaceGallery.build(photos, embedder)
+    assert embedded == 2
+    assert gallery.ids == ["CIV-a", "CIV-b"]
+    assert list(gallery.failed) == ["CIV-no_face"]
+
+    prefix = str(tmp_path / "gallery")
+    gallery.save(prefix)
+    loaded = FaceGallery.load(prefix)
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert loaded.ids == gallery.ids
+    assert loaded.sources == gallery.sources
+    assert loaded.failed == gallery.failed
+    np.testing.assert_allclose(loaded.embeddings, gallery.embeddings)
+
+
+def test_load_missing_gallery_returns_none(tmp_path):
+    assert FaceGallery.load(str(tmp_path / "missing")) is None
+
+
+def test_rebuild_only_embeds_changed_photos(tmp_path, photos, embedder):
+    gallery, _ = FaceGallery.build(photos, embedder)
+    gallery.save(str(tmp_path / "gallery"))
+    previous = FaceGallery.load(str(tmp_path / "gallery"))
+
+    embedder.calls.clear()
+    _, embedded = FaceGallery.build(photos, embedder, previous=previous)
+    assert embedded == 0
+    assert embedder.calls == []  # not even the photo without a face
+
+    path = photos[1][1]
+    os.utime(path, (os.path.getatime(path), os.path.getmtime(path) + 10))
+    _, embedded = FaceGallery.build(photos, embedder, previous=previous)
+    assert embedded == 1
+    assert embedder.calls == [2]
+
+
+def test_search_returns_top_k_above_threshold(photos, embedder):
+    gallery, _ = FaceGallery.build(photos, embedder)
+    [matches] = gallery.search(unit(1, 0.2, 0, 0), k=2, threshold=0.1)
+    assert [cid for cid, _ in matches] == ["CIV-a", "CIV-b"]
+    assert matches[0][1] > matches[1][1]
+
+    [matches] = gallery.search(unit(0, 0, 1, 0), k=2, threshold=0.5)
+    assert matches == []
@@ -0,0 +1,66 @@
+"""
+CivicEye Tests - Frame History
+Sampling rate and time lookups of the pre-event ring buffer.
+"""
+
+import numpy as np
+
+from ai_engine.history import FrameHistory
+
+
+def frame(value=0, shape=(24, 32, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_exact_interval_steps_are_all_kept():
+    history = FrameHistory(duration=10.0, sample_fps=10.0)
+    stored = sum(history.append(i * 0.1, frame()) for i in range(50))
+    assert stored == 50
+
+
+def test_faster_source_is_decimated_to_sample_fps():
+    history = FrameHistory(duration=30.0, sample_fps=10.0)
+    stored = sum(history.append(i / 30.0, frame()) for i in range(300))
+    assert stored == 100
+
+
+def test_ring_keeps_only_the_last_duration():
+    history = FrameHistory(duration=2.0, sample_fps=10.0)
+    for i in range(100):
+        history.append(i * 0.1, frame())
+    oldest, newest = history.time_span
+    assert newest == 9.9
+    assert newest - oldest <= 2.0 + 1e-9
+    assert len(history) == history.capacity
+
+
+def test_get_range_includes_both_endpoints():
+    history = FrameHistory(duration=10.0, sample_fps=10.0)
+    for i in range(50):
+        history.append(i * 0.1, frame(i))
+    times = [round(t, 3) for t, _ in history.get_range(3.0, 3.5)]
+    assert times == [3.0, 3.1, 3.2, 3.3, 3.4, 3.5]
+
+
+def test_get_closest_picks_the_nearest_frame():
+    history = FrameHistory(duration=10.0, sample_fps=10.0)
+    for i in range(10):
+        history.append(i * 0.1, frame(i))
+    assert history.get_closest(0.34)[0, 0, 0] == 3
+    assert history.get_closest(0.36)[0, 0, 0] == 4
+    assert history.get_closest(-5.0)[0, 0, 0] == 0
+    assert history.get_closest(50.0)[0, 0, 0] == 9
+
+
+def test_clock_going_backwards_restarts_the_history():
+    history = FrameHistory(duration=10.0, sample_fps=10.0)
+    for i in range(10):
+        history.append(5.0 + i * 0.1, frame())
+    assert history.append(0.0, frame())
+    assert history.time_span == (0.0, 0.0)
+
+
+def test_wide_frames_are_downscaled():
+    history = FrameHistory(duration=1.0, sample_fps=10.0, max_width=16)
+    history.append(0.0, frame(shape=(24, 32, 3)))
+    assert history.latest().shape == (12, 16, 3)
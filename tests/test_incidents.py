@@ -0,0 +1,71 @@
+"""
+CivicEye Tests - Incident Store
+Unique ids, filtered/paginated queries, since-cursors and JSON migration.
+"""
+
+import json
+
+import pytest
+
+from backend.incidents import IncidentStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IncidentStore(str(tmp_path / "incidents.db"))
+
+
+def incident(incident_id, timestamp="2026-01-01T10:00:00", camera_id="cam0", status="CONFIRMED"):
+    return {"id": incident_id, "timestamp": timestamp, "camera_id": camera_id, "status": status}
+
+
+def test_duplicate_ids_get_a_numeric_suffix(store):
+    ids = [store.add(incident("INC-1"))["id"] for _ in range(3)]
+    assert ids == ["INC-1", "INC-1-2", "INC-1-3"]
+    assert store.count() == 3
+
+
+def test_query_filters_and_paginates_newest_first(store):
+    for i in range(10):
+        store.add(incident(f"INC-{i}", timestamp=f"2026-01-01T10:00:{i:02d}",
+                           camera_id="cam0" if i % 2 else "cam1"))
+
+    page, total = store.query(camera_id="cam0", limit=2, offset=1, newest_first=True)
+    assert total == 5
+    assert [i["id"] for i in page] == ["INC-7", "INC-5"]
+
+    page, total = store.query(start="2026-01-01T10:00:03", end="2026-01-01T10:00:06")
+    assert total == 3
+    assert [i["id"] for i in page] == ["INC-3", "INC-4", "INC-5"]
+
+    _, total = store.query(status="DISMISSED")
+    assert total == 0
+
+
+def test_since_cursor_returns_only_newer_incidents(store):
+    for i in range(5):
+        store.add(incident(f"INC-{i}"))
+    after = store.seq_of("INC-2")
+    page, total = store.query(after_seq=after)
+    assert total == 2
+    assert [i["id"] for i in page] == ["INC-3", "INC-4"]
+    assert store.seq_of("INC-missing") is None
+
+
+def test_revision_changes_on_add_and_update(store):
+    before = store.revision()
+    store.add(incident("INC-1"))
+    added = store.revision()
+    store.update("INC-1", lambda i: {**i, "status": "REVIEWED"})
+    updated = store.revision()
+    assert len({before, added, updated}) == 3
+    assert store.query(status="REVIEWED")[1] == 1
+    assert store.update("INC-missing", lambda i: i) is None
+
+
+def test_json_migration_runs_once(store, tmp_path):
+    legacy = tmp_path / "incident_log.json"
+    legacy.write_text(json.dumps([incident("INC-a"), incident("INC-b")]))
+    assert store.migrate_json(str(legacy)) == 2
+    assert store.migrate_json(str(legacy)) == 0
+    assert [i["id"] for i in store.all()] == ["INC-a", "INC-b"]
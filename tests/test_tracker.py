@@ -0,0 +1,68 @@
+"""
+CivicEye Tests - Track Assignment
+The NumPy Hungarian fallback against brute force, and assign() gating.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from ai_engine import tracker
+from ai_engine.tracker import CentroidTracker, _hungarian, assign
+
+
+def brute_force_cost(cost):
+    """Minimum total cost of a full one-to-one assignment (small matrices only)."""
+    n, m = cost.shape
+    if n > m:
+        return brute_force_cost(cost.T)
+    return min(sum(cost[i, cols[i]] for i in range(n))
+               for cols in itertools.permutations(range(m), n))
+
+
+@pytest.fixture
+def no_scipy(monkeypatch):
+    """Force assign() onto the NumPy solver."""
+    monkeypatch.setattr(tracker, 'linear_sum_assignment', None)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_hungarian_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n, m = rng.integers(1, 7, size=2)
+    cost = rng.random((n, m)) * 100
+
+    rows, cols = _hungarian(cost)
+
+    assert len(rows) == min(n, m)
+    assert len(set(rows.tolist())) == len(rows)
+    assert len(set(cols.tolist())) == len(cols)
+    assert list(rows) == sorted(rows)
+    assert cost[rows, cols].sum() == pytest.approx(brute_force_cost(cost))
+
+
+def test_assign_prefers_more_matches(no_scipy):
+    # Greedy would take (0, 0) at cost 1 and leave row 1 unmatched
+    rows, cols = assign([[1, 2], [1, 100]], 50)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 1), (1, 0)]
+
+
+def test_assign_drops_pairs_outside_the_gate(no_scipy):
+    rows, cols = assign([[10, 80], [90, 95]], 50)
+    assert rows.tolist() == [0]
+    assert cols.tolist() == [0]
+
+
+def test_assign_empty(no_scipy):
+    rows, cols = assign(np.empty((0, 3)), 50)
+    assert len(rows) == 0 and len(cols) == 0
+
+
+def test_tracker_follows_nearby_detections():
+    t = CentroidTracker(match_threshold=50)
+    first = t.update([(0.0, 0.0), (200.0, 0.0)], 0.0)
+    second = t.update([(205.0, 3.0), (4.0, 1.0)], 0.1)
+    assert second[0] is first[1]
+    assert second[1] is first[0]
+    assert t.tracks_created == 2